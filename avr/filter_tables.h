@@ -0,0 +1,351 @@
+// Generated by filter/generate_hardware_parameter.py --header;
+// do not edit.
+//
+// calculateFilterParameters for every ADC code, packed 10 bit
+// values: see readPotTable in noisEE.c. 5120 bytes.
+
+#include <avr/pgmspace.h>
+
+const uint8_t filter0016Low[1024] PROGMEM = {
+        0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3, 3,
+        4, 4, 4, 4, 5, 5, 5, 5, 6, 6, 6, 6, 7, 7, 7, 7,
+        8, 8, 8, 9, 9, 9, 9, 10, 10, 10, 10, 11, 11, 11, 11, 12,
+        12, 12, 12, 13, 13, 13, 13, 14, 14, 14, 14, 15, 15, 15, 15, 16,
+        16, 16, 17, 17, 17, 17, 18, 18, 18, 18, 19, 19, 19, 19, 20, 20,
+        20, 20, 21, 21, 21, 21, 22, 22, 22, 22, 23, 23, 23, 23, 24, 24,
+        24, 25, 25, 25, 25, 26, 26, 26, 26, 27, 27, 27, 27, 28, 28, 28,
+        28, 29, 29, 29, 29, 30, 30, 30, 30, 31, 31, 31, 31, 32, 32, 32,
+        32, 33, 33, 33, 34, 34, 34, 34, 35, 35, 35, 35, 36, 36, 36, 36,
+        37, 37, 37, 37, 38, 38, 38, 38, 39, 39, 39, 39, 40, 40, 40, 40,
+        41, 41, 41, 42, 42, 42, 42, 43, 43, 43, 43, 44, 44, 44, 44, 45,
+        45, 45, 45, 46, 46, 47, 48, 49, 50, 51, 52, 52, 53, 54, 55, 56,
+        57, 58, 58, 59, 60, 61, 62, 63, 64, 64, 65, 66, 67, 68, 69, 69,
+        70, 71, 72, 73, 74, 75, 75, 76, 77, 78, 79, 80, 81, 81, 82, 83,
+        84, 85, 86, 87, 87, 88, 89, 90, 91, 92, 93, 93, 94, 95, 96, 97,
+        98, 99, 99, 100, 101, 102, 103, 104, 105, 105, 106, 107, 108, 109, 110, 111,
+        111, 112, 113, 114, 115, 116, 117, 117, 118, 119, 120, 121, 122, 123, 123, 124,
+        125, 126, 127, 128, 129, 129, 130, 131, 132, 133, 134, 135, 135, 136, 137, 138,
+        139, 140, 141, 141, 142, 143, 144, 145, 146, 147, 147, 148, 149, 150, 151, 152,
+        153, 153, 154, 155, 156, 157, 158, 159, 159, 160, 161, 162, 163, 164, 165, 165,
+        166, 167, 168, 169, 170, 171, 171, 172, 173, 174, 175, 176, 176, 177, 178, 179,
+        180, 181, 182, 182, 183, 184, 185, 186, 187, 188, 188, 189, 190, 191, 192, 193,
+        194, 194, 195, 196, 197, 198, 199, 200, 200, 201, 202, 203, 204, 205, 206, 207,
+        209, 211, 212, 214, 215, 217, 218, 220, 221, 223, 224, 226, 227, 229, 230, 232,
+        233, 235, 236, 238, 239, 241, 242, 244, 245, 247, 248, 250, 251, 253, 254, 0,
+        1, 3, 4, 6, 7, 9, 10, 12, 13, 15, 16, 18, 19, 21, 22, 24,
+        25, 27, 28, 30, 31, 33, 34, 36, 37, 39, 40, 42, 43, 45, 46, 48,
+        49, 51, 52, 54, 55, 57, 58, 60, 61, 63, 64, 66, 67, 69, 70, 72,
+        73, 75, 77, 78, 80, 81, 83, 84, 86, 87, 89, 90, 92, 93, 95, 96,
+        98, 99, 101, 102, 104, 105, 107, 108, 110, 111, 113, 114, 116, 117, 119, 120,
+        122, 123, 125, 126, 128, 129, 131, 132, 134, 135, 137, 138, 140, 141, 143, 144,
+        146, 147, 149, 150, 152, 153, 156, 159, 163, 166, 169, 172, 175, 178, 181, 184,
+        187, 190, 193, 196, 199, 202, 205, 208, 211, 214, 217, 220, 223, 226, 229, 232,
+        235, 238, 241, 245, 248, 251, 254, 1, 4, 7, 10, 13, 16, 19, 22, 25,
+        28, 31, 34, 37, 40, 43, 46, 49, 52, 55, 58, 61, 64, 67, 70, 74,
+        77, 80, 83, 86, 89, 92, 95, 98, 101, 104, 107, 110, 113, 116, 119, 122,
+        125, 128, 131, 134, 137, 140, 143, 146, 149, 152, 156, 159, 162, 165, 168, 171,
+        174, 177, 180, 183, 186, 189, 192, 195, 198, 201, 204, 206, 208, 209, 211, 212,
+        214, 216, 217, 219, 220, 222, 224, 225, 227, 228, 230, 231, 233, 235, 236, 238,
+        239, 241, 242, 244, 246, 247, 249, 250, 252, 253, 255, 1, 2, 4, 5, 7,
+        9, 10, 12, 13, 15, 16, 18, 20, 21, 23, 24, 26, 27, 29, 31, 32,
+        34, 35, 37, 38, 40, 42, 43, 45, 46, 48, 50, 51, 53, 54, 56, 57,
+        59, 61, 62, 64, 65, 67, 68, 68, 69, 69, 70, 70, 71, 71, 71, 72,
+        72, 73, 73, 73, 74, 74, 75, 75, 75, 76, 76, 77, 77, 78, 78, 78,
+        79, 79, 80, 80, 80, 81, 81, 82, 82, 83, 83, 83, 84, 84, 85, 85,
+        85, 86, 86, 87, 87, 88, 88, 88, 89, 89, 90, 90, 90, 91, 91, 92,
+        92, 93, 93, 93, 94, 94, 95, 95, 95, 96, 96, 97, 97, 97, 98, 98,
+        99, 99, 100, 100, 100, 101, 101, 102, 102, 102, 103, 103, 104, 104, 105, 105,
+        105, 106, 106, 107, 107, 107, 108, 108, 109, 109, 110, 110, 110, 111, 111, 112,
+        112, 112, 113, 113, 114, 114, 115, 115, 115, 116, 116, 117, 117, 117, 118, 118,
+        119, 119, 119, 120, 120, 121, 121, 122, 122, 122, 123, 123, 124, 124, 124, 125,
+        125, 126, 126, 127, 127, 127, 128, 128, 129, 129, 129, 130, 130, 131, 131, 132,
+        132, 132, 133, 133, 134, 134, 134, 135, 135, 136, 136, 136, 137, 137, 138, 138,
+        139, 139, 139, 140, 140, 141, 141, 141, 142, 142, 143, 143, 144, 144, 144, 145,
+        145, 146, 146, 146, 147, 147, 148, 148, 149, 149, 149, 150, 150, 151, 151, 151,
+        152, 152, 153, 153, 154, 154, 154, 155, 155, 156, 156, 156, 157, 157, 158, 158,
+        158, 159, 159, 160, 160, 161, 161, 161, 162, 162, 163, 163, 163, 164, 164, 165,
+        166, 167, 167, 168, 169, 170, 171, 171, 172, 173, 174, 175, 175, 176, 177, 178,
+        179, 179, 180, 181, 182, 183, 183, 184, 185, 186, 187, 187, 188, 189, 190, 191,
+        191, 192, 193, 194, 195, 195, 196, 197, 198, 199, 199, 200, 201, 202, 203, 203,
+        204, 205, 206, 207, 207, 208, 209, 210, 211, 211, 212, 213, 214, 215, 215, 216,
+        217, 218, 219, 219, 220, 221, 222, 223, 223, 224, 225, 226, 227, 227, 228, 229,
+        230, 231, 231, 232, 233, 234, 235, 235, 236, 237, 238, 239, 239, 240, 241, 242,
+        243, 243, 244, 245, 246, 247, 247, 248, 249, 250, 251, 251, 252, 253, 254, 255
+};
+
+const uint8_t filter0016High[256] PROGMEM = {
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 64, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85,
+        85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85,
+        85, 85, 85, 85, 85, 149, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170,
+        170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 234, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255
+};
+
+const uint8_t filter0270Low[1024] PROGMEM = {
+        50, 51, 53, 54, 55, 57, 58, 59, 61, 62, 63, 64, 66, 67, 68, 70,
+        71, 72, 74, 75, 76, 78, 79, 80, 82, 83, 84, 86, 87, 88, 90, 91,
+        92, 94, 95, 96, 98, 99, 100, 102, 103, 104, 106, 107, 108, 110, 111, 112,
+        114, 115, 116, 118, 119, 120, 122, 123, 124, 126, 127, 128, 130, 131, 132, 134,
+        135, 136, 138, 139, 140, 142, 143, 144, 146, 147, 148, 150, 151, 152, 154, 155,
+        156, 158, 159, 160, 162, 163, 164, 166, 167, 168, 170, 171, 172, 174, 175, 176,
+        177, 179, 180, 181, 183, 184, 185, 187, 188, 189, 191, 193, 196, 198, 201, 203,
+        206, 208, 211, 213, 216, 218, 221, 224, 226, 229, 231, 234, 236, 239, 241, 244,
+        246, 249, 251, 254, 1, 3, 6, 8, 11, 13, 16, 18, 21, 23, 26, 29,
+        31, 34, 36, 39, 41, 44, 46, 49, 51, 54, 56, 59, 62, 64, 67, 69,
+        72, 74, 77, 79, 82, 84, 87, 89, 92, 95, 97, 100, 102, 105, 107, 110,
+        112, 115, 117, 120, 123, 125, 128, 130, 133, 135, 138, 140, 143, 145, 148, 150,
+        153, 156, 158, 161, 163, 166, 168, 171, 173, 176, 178, 181, 184, 186, 189, 191,
+        194, 196, 199, 201, 204, 206, 209, 211, 214, 217, 219, 222, 224, 227, 229, 232,
+        234, 237, 239, 242, 244, 247, 250, 252, 255, 1, 4, 6, 9, 11, 14, 16,
+        19, 22, 24, 27, 29, 32, 34, 37, 39, 42, 44, 47, 49, 52, 55, 57,
+        60, 62, 65, 67, 70, 72, 75, 77, 80, 82, 85, 88, 90, 93, 95, 98,
+        100, 103, 105, 108, 110, 113, 116, 118, 121, 123, 126, 128, 131, 133, 136, 138,
+        141, 143, 146, 149, 151, 154, 156, 159, 161, 164, 166, 169, 171, 174, 177, 179,
+        182, 183, 185, 186, 188, 190, 191, 193, 194, 196, 198, 199, 201, 202, 204, 206,
+        207, 209, 210, 212, 214, 215, 217, 218, 220, 222, 223, 225, 226, 228, 230, 231,
+        233, 234, 236, 238, 239, 241, 242, 244, 245, 247, 249, 250, 252, 253, 255, 1,
+        2, 4, 5, 7, 9, 10, 12, 13, 15, 17, 18, 20, 21, 23, 25, 26,
+        28, 29, 31, 33, 34, 36, 37, 39, 41, 42, 44, 45, 47, 49, 50, 52,
+        53, 55, 57, 58, 60, 61, 63, 65, 66, 68, 69, 71, 73, 74, 76, 77,
+        79, 81, 82, 84, 85, 87, 89, 90, 92, 93, 95, 97, 98, 100, 101, 103,
+        105, 106, 108, 109, 111, 113, 114, 116, 117, 119, 121, 122, 124, 125, 127, 129,
+        130, 132, 133, 135, 137, 138, 140, 141, 143, 145, 146, 148, 149, 151, 153, 154,
+        156, 157, 159, 161, 162, 164, 165, 167, 169, 170, 172, 173, 175, 177, 178, 180,
+        181, 183, 185, 186, 188, 189, 191, 193, 194, 196, 197, 199, 201, 202, 204, 205,
+        207, 209, 210, 212, 213, 215, 217, 218, 220, 221, 223, 225, 226, 228, 229, 231,
+        233, 234, 236, 237, 239, 241, 242, 244, 245, 247, 249, 250, 252, 253, 255, 251,
+        245, 238, 232, 225, 219, 213, 206, 200, 193, 187, 180, 174, 167, 161, 155, 148,
+        142, 135, 129, 122, 116, 109, 103, 96, 90, 84, 77, 71, 64, 58, 51, 45,
+        38, 32, 26, 19, 13, 6, 0, 249, 243, 236, 230, 223, 217, 211, 204, 198,
+        191, 185, 178, 172, 165, 159, 152, 146, 140, 133, 127, 120, 114, 107, 101, 94,
+        88, 82, 75, 69, 62, 56, 49, 43, 36, 30, 23, 17, 11, 4, 254, 247,
+        241, 234, 228, 221, 215, 209, 202, 196, 189, 183, 176, 170, 163, 157, 150, 147,
+        144, 140, 137, 134, 131, 128, 124, 121, 118, 115, 111, 108, 105, 102, 99, 95,
+        92, 89, 86, 82, 79, 76, 73, 69, 66, 63, 60, 57, 53, 50, 47, 44,
+        40, 37, 34, 31, 28, 24, 21, 18, 15, 11, 8, 5, 2, 254, 251, 248,
+        245, 242, 238, 235, 232, 229, 225, 222, 219, 216, 212, 209, 206, 203, 200, 196,
+        193, 190, 187, 183, 180, 177, 174, 171, 167, 164, 161, 158, 154, 151, 148, 145,
+        141, 138, 135, 134, 133, 132, 131, 130, 129, 128, 127, 126, 125, 124, 122, 121,
+        120, 119, 118, 117, 116, 115, 114, 113, 112, 111, 110, 109, 108, 107, 106, 104,
+        103, 102, 101, 100, 99, 98, 97, 96, 95, 94, 93, 92, 91, 90, 89, 87,
+        86, 85, 84, 83, 82, 81, 80, 79, 78, 77, 76, 75, 74, 73, 72, 71,
+        69, 68, 67, 66, 65, 64, 63, 62, 61, 60, 59, 58, 57, 56, 55, 54,
+        53, 51, 50, 49, 48, 47, 46, 45, 44, 43, 42, 41, 40, 39, 38, 37,
+        36, 35, 33, 32, 31, 30, 29, 28, 27, 26, 25, 25, 25, 24, 24, 24,
+        24, 24, 24, 24, 24, 24, 23, 23, 23, 23, 23, 23, 23, 23, 23, 22,
+        22, 22, 22, 22, 22, 22, 22, 22, 21, 21, 21, 21, 21, 21, 21, 21,
+        21, 20, 20, 20, 20, 20, 20, 20, 20, 20, 20, 19, 19, 19, 19, 19,
+        19, 19, 19, 19, 18, 18, 18, 18, 18, 18, 18, 18, 18, 17, 17, 17,
+        17, 17, 17, 17, 17, 17, 16, 16, 16, 16, 16, 16, 16, 16, 16, 15,
+        15, 15, 15, 15, 15, 15, 15, 15, 14, 14, 14, 14, 14, 14, 14, 14,
+        14, 13, 13, 13, 13, 13, 13, 13, 13, 13, 12, 12, 12, 12, 12, 12,
+        12, 12, 12, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 10, 10, 10,
+        10, 10, 10, 10, 10, 10, 9, 9, 9, 9, 9, 9, 9, 9, 9, 8,
+        8, 8, 8, 8, 8, 8, 8, 8, 7, 7, 7, 7, 7, 7, 7, 7,
+        7, 6, 6, 6, 6, 6, 6, 6, 6, 6, 5, 5, 5, 5, 5, 5,
+        5, 5, 5, 4, 4, 4, 4, 4, 4, 4, 4, 4, 3, 3, 3, 3,
+        3, 3, 3, 3, 3, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1,
+        1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0
+};
+
+const uint8_t filter0270High[256] PROGMEM = {
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85,
+        85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 169, 170, 170, 170, 170, 170,
+        170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170,
+        170, 170, 170, 170, 170, 170, 170, 234, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 191, 170, 170, 170, 170, 170, 170,
+        170, 170, 170, 90, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85,
+        85, 85, 85, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0
+};
+
+const uint8_t filter5300Low[1024] PROGMEM = {
+        164, 166, 169, 171, 174, 176, 179, 181, 184, 186, 189, 191, 194, 196, 199, 201,
+        204, 206, 209, 211, 214, 216, 218, 221, 223, 226, 228, 231, 233, 236, 238, 241,
+        243, 246, 248, 251, 253, 0, 2, 5, 7, 9, 12, 14, 17, 19, 22, 24,
+        27, 29, 32, 34, 37, 39, 42, 44, 47, 49, 52, 54, 57, 59, 61, 64,
+        66, 69, 71, 74, 76, 79, 82, 85, 89, 92, 96, 99, 103, 106, 109, 113,
+        116, 120, 123, 127, 130, 134, 137, 140, 144, 147, 151, 154, 158, 161, 165, 168,
+        171, 175, 178, 182, 185, 189, 192, 196, 199, 202, 206, 209, 213, 216, 220, 223,
+        227, 230, 233, 237, 240, 244, 247, 251, 254, 2, 5, 8, 12, 15, 19, 22,
+        26, 29, 33, 36, 39, 43, 46, 50, 53, 57, 60, 64, 67, 70, 74, 77,
+        81, 84, 88, 91, 94, 98, 101, 105, 108, 112, 115, 119, 122, 125, 129, 132,
+        136, 139, 143, 146, 150, 153, 156, 160, 163, 167, 170, 174, 177, 181, 184, 187,
+        191, 194, 198, 201, 205, 208, 212, 215, 218, 222, 225, 229, 232, 236, 239, 243,
+        246, 249, 253, 0, 4, 7, 11, 14, 18, 21, 24, 28, 31, 35, 38, 42,
+        45, 49, 52, 55, 59, 62, 66, 69, 73, 76, 80, 83, 86, 90, 93, 97,
+        100, 104, 107, 111, 114, 117, 121, 124, 127, 129, 130, 131, 132, 134, 135, 136,
+        137, 139, 140, 141, 142, 144, 145, 146, 147, 149, 150, 151, 152, 154, 155, 156,
+        157, 159, 160, 161, 162, 164, 165, 166, 167, 169, 170, 171, 172, 174, 175, 176,
+        177, 179, 180, 181, 182, 184, 185, 186, 187, 189, 190, 191, 192, 194, 195, 196,
+        197, 199, 200, 201, 202, 204, 205, 206, 207, 209, 210, 211, 212, 214, 215, 216,
+        217, 219, 220, 221, 222, 224, 225, 226, 227, 229, 230, 231, 232, 234, 235, 236,
+        237, 239, 240, 241, 242, 244, 245, 246, 247, 249, 250, 251, 252, 254, 255, 255,
+        255, 254, 254, 253, 253, 252, 252, 251, 251, 250, 250, 249, 248, 248, 247, 247,
+        246, 246, 245, 245, 244, 244, 243, 243, 242, 242, 241, 241, 240, 240, 239, 239,
+        238, 238, 237, 237, 236, 235, 235, 234, 234, 233, 233, 232, 232, 231, 231, 230,
+        230, 229, 229, 228, 228, 227, 227, 226, 226, 225, 225, 224, 224, 223, 222, 222,
+        221, 221, 220, 220, 219, 219, 218, 218, 217, 217, 216, 216, 215, 215, 214, 214,
+        213, 213, 212, 212, 211, 211, 210, 209, 209, 208, 208, 207, 207, 206, 206, 205,
+        205, 204, 204, 203, 203, 202, 202, 201, 201, 200, 200, 199, 199, 198, 197, 197,
+        196, 196, 195, 195, 194, 194, 193, 193, 192, 192, 191, 191, 190, 190, 189, 189,
+        188, 188, 187, 187, 186, 186, 185, 184, 184, 183, 183, 182, 182, 181, 181, 180,
+        180, 179, 179, 178, 178, 177, 177, 176, 176, 175, 175, 174, 174, 173, 173, 172,
+        171, 171, 170, 170, 169, 169, 168, 168, 167, 167, 166, 166, 165, 163, 159, 154,
+        150, 145, 141, 136, 132, 127, 123, 118, 114, 109, 105, 100, 96, 91, 86, 82,
+        77, 73, 68, 64, 59, 55, 50, 46, 41, 37, 32, 28, 23, 19, 14, 10,
+        5, 1, 252, 248, 243, 239, 234, 230, 225, 221, 216, 212, 207, 203, 198, 194,
+        189, 185, 180, 176, 171, 167, 162, 158, 153, 149, 144, 140, 135, 131, 126, 122,
+        117, 113, 108, 104, 99, 95, 90, 86, 81, 77, 72, 68, 63, 59, 54, 50,
+        45, 41, 36, 32, 27, 23, 18, 14, 9, 4, 0, 251, 247, 242, 238, 233,
+        229, 224, 220, 215, 211, 206, 202, 197, 193, 188, 184, 179, 175, 170, 166, 161,
+        157, 152, 148, 143, 139, 134, 130, 125, 121, 116, 112, 107, 103, 98, 94, 89,
+        85, 80, 76, 71, 67, 62, 58, 53, 49, 44, 40, 35, 31, 26, 22, 17,
+        15, 13, 11, 10, 8, 6, 4, 2, 0, 255, 253, 251, 249, 247, 246, 244,
+        242, 240, 238, 237, 235, 233, 231, 229, 228, 226, 224, 222, 220, 219, 217, 215,
+        213, 211, 210, 208, 206, 204, 202, 201, 199, 197, 195, 193, 192, 190, 188, 186,
+        184, 183, 181, 179, 177, 175, 174, 172, 170, 168, 166, 165, 163, 161, 159, 157,
+        156, 154, 152, 150, 148, 147, 145, 143, 141, 139, 138, 136, 134, 132, 130, 129,
+        127, 125, 123, 121, 120, 118, 116, 114, 112, 111, 109, 107, 105, 103, 102, 100,
+        98, 96, 94, 93, 91, 89, 87, 85, 83, 82, 80, 78, 76, 74, 73, 71,
+        69, 67, 65, 64, 62, 60, 58, 57, 57, 56, 56, 56, 56, 56, 55, 55,
+        55, 55, 54, 54, 54, 54, 53, 53, 53, 53, 53, 52, 52, 52, 52, 51,
+        51, 51, 51, 50, 50, 50, 50, 50, 49, 49, 49, 49, 48, 48, 48, 48,
+        47, 47, 47, 47, 47, 46, 46, 46, 46, 45, 45, 45, 45, 44, 44, 44,
+        44, 44, 43, 43, 43, 43, 42, 42, 42, 42, 41, 41, 41, 41, 41, 40,
+        40, 40, 40, 39, 39, 39, 39, 38, 38, 38, 38, 38, 37, 37, 37, 37,
+        36, 36, 36, 36, 35, 35, 35, 35, 35, 34, 34, 34, 34, 33, 33, 33,
+        33, 32, 32, 32, 32, 32, 31, 31, 31, 31, 30, 30, 30, 30, 29, 29,
+        29, 29, 29, 28, 28, 28, 28, 27, 27, 27, 27, 26, 26, 26, 26, 26,
+        25, 25, 25, 25, 24, 24, 24, 24, 23, 23, 23, 23, 23, 22, 22, 22,
+        22, 21, 21, 21, 21, 20, 20, 20, 20, 20, 19, 19, 19, 19, 18, 18,
+        18, 18, 17, 17, 17, 17, 17, 16, 16, 16, 16, 15, 15, 15, 15, 15,
+        14, 14, 14, 14, 13, 13, 13, 13, 12, 12, 12, 12, 12, 11, 11, 11,
+        11, 10, 10, 10, 10, 9, 9, 9, 9, 9, 8, 8, 8, 8, 7, 7,
+        7, 7, 6, 6, 6, 6, 6, 5, 5, 5, 5, 4, 4, 4, 4, 3,
+        3, 3, 3, 3, 2, 2, 2, 2, 1, 1, 1, 1, 0, 0, 0, 0
+};
+
+const uint8_t filter5300High[256] PROGMEM = {
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 84, 85, 85, 85, 85, 85, 85,
+        85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 169, 170,
+        170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170,
+        234, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 175, 170, 170, 170, 170, 170, 170, 170,
+        170, 170, 170, 170, 170, 170, 106, 85, 85, 85, 85, 85, 85, 85, 85, 85,
+        85, 85, 85, 85, 85, 85, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0
+};
+
+const uint8_t filter0000Low[1024] PROGMEM = {
+        255, 255, 255, 255, 255, 255, 255, 254, 254, 254, 254, 254, 254, 254, 253, 253,
+        253, 253, 253, 253, 253, 252, 252, 252, 252, 252, 252, 251, 251, 251, 251, 251,
+        251, 251, 250, 250, 250, 250, 250, 250, 250, 249, 249, 249, 249, 249, 249, 248,
+        248, 248, 248, 248, 248, 248, 247, 247, 247, 247, 247, 247, 247, 246, 246, 246,
+        246, 246, 246, 245, 245, 245, 245, 245, 245, 245, 244, 244, 244, 244, 244, 244,
+        244, 243, 243, 243, 243, 243, 243, 243, 242, 242, 242, 242, 242, 242, 241, 241,
+        241, 241, 241, 241, 241, 240, 240, 240, 240, 240, 240, 240, 239, 237, 233, 230,
+        226, 223, 219, 215, 212, 208, 205, 201, 197, 194, 190, 187, 183, 179, 176, 172,
+        169, 165, 161, 158, 154, 151, 147, 143, 140, 136, 133, 129, 125, 122, 118, 114,
+        111, 107, 104, 100, 96, 93, 89, 86, 82, 78, 75, 71, 68, 64, 60, 57,
+        53, 50, 46, 42, 39, 35, 32, 28, 24, 21, 17, 14, 10, 6, 3, 255,
+        252, 248, 244, 241, 237, 234, 230, 226, 223, 219, 215, 212, 208, 205, 201, 197,
+        194, 190, 187, 183, 179, 176, 172, 169, 165, 161, 158, 154, 151, 147, 143, 140,
+        136, 133, 129, 125, 122, 118, 115, 111, 107, 104, 100, 97, 93, 89, 86, 82,
+        79, 75, 71, 68, 64, 60, 57, 53, 50, 46, 42, 39, 35, 32, 28, 24,
+        21, 17, 14, 10, 6, 3, 255, 252, 248, 244, 241, 237, 234, 230, 226, 223,
+        219, 216, 212, 208, 205, 201, 198, 194, 190, 187, 183, 180, 176, 172, 169, 165,
+        161, 158, 154, 151, 147, 143, 140, 136, 133, 129, 125, 122, 118, 115, 111, 107,
+        104, 100, 97, 93, 89, 86, 82, 79, 75, 71, 69, 66, 64, 62, 59, 57,
+        55, 53, 50, 48, 46, 44, 41, 39, 37, 35, 32, 30, 28, 26, 23, 21,
+        19, 16, 14, 12, 10, 7, 5, 3, 1, 254, 252, 250, 248, 245, 243, 241,
+        238, 236, 234, 232, 229, 227, 225, 223, 220, 218, 216, 214, 211, 209, 207, 204,
+        202, 200, 198, 195, 193, 191, 189, 186, 184, 182, 180, 177, 175, 173, 171, 168,
+        166, 164, 161, 159, 158, 157, 156, 155, 154, 153, 152, 151, 150, 149, 148, 147,
+        146, 145, 144, 143, 142, 141, 140, 138, 137, 136, 135, 134, 133, 132, 131, 130,
+        129, 128, 127, 126, 125, 124, 123, 122, 121, 120, 119, 118, 117, 116, 115, 114,
+        113, 112, 111, 110, 109, 108, 107, 106, 105, 104, 103, 102, 101, 100, 99, 98,
+        97, 96, 95, 94, 93, 92, 91, 90, 89, 88, 87, 86, 84, 83, 82, 81,
+        80, 79, 78, 77, 76, 75, 74, 73, 72, 71, 70, 69, 68, 67, 66, 65,
+        64, 63, 62, 61, 60, 59, 58, 57, 56, 55, 54, 53, 52, 51, 50, 49,
+        48, 47, 47, 47, 47, 47, 46, 46, 46, 46, 46, 46, 46, 46, 45, 45,
+        45, 45, 45, 45, 45, 45, 44, 44, 44, 44, 44, 44, 44, 44, 44, 43,
+        43, 43, 43, 43, 43, 43, 43, 42, 42, 42, 42, 42, 42, 42, 42, 42,
+        41, 41, 41, 41, 41, 41, 41, 41, 40, 40, 40, 40, 40, 40, 40, 40,
+        40, 39, 39, 39, 39, 39, 39, 39, 39, 38, 38, 38, 38, 38, 38, 38,
+        38, 38, 37, 37, 37, 37, 37, 37, 37, 37, 36, 36, 36, 36, 36, 36,
+        36, 36, 35, 35, 35, 35, 35, 35, 35, 35, 35, 34, 34, 34, 34, 34,
+        34, 34, 34, 33, 33, 33, 33, 33, 33, 33, 33, 33, 32, 32, 32, 32,
+        32, 32, 32, 32, 31, 31, 31, 31, 31, 31, 31, 31, 31, 30, 30, 30,
+        30, 30, 30, 30, 30, 29, 29, 29, 29, 29, 29, 29, 29, 29, 28, 28,
+        28, 28, 28, 28, 28, 28, 27, 27, 27, 27, 27, 27, 27, 27, 26, 26,
+        26, 26, 26, 26, 26, 26, 26, 25, 25, 25, 25, 25, 25, 25, 25, 24,
+        24, 24, 24, 24, 24, 24, 24, 24, 23, 23, 23, 23, 23, 23, 23, 23,
+        22, 22, 22, 22, 22, 22, 22, 22, 22, 21, 21, 21, 21, 21, 21, 21,
+        21, 20, 20, 20, 20, 20, 20, 20, 20, 20, 19, 19, 19, 19, 19, 19,
+        19, 19, 18, 18, 18, 18, 18, 18, 18, 18, 17, 17, 17, 17, 17, 17,
+        17, 17, 17, 16, 16, 16, 16, 16, 16, 16, 16, 15, 15, 15, 15, 15,
+        15, 15, 15, 15, 14, 14, 14, 14, 14, 14, 14, 14, 13, 13, 13, 13,
+        13, 13, 13, 13, 13, 12, 12, 12, 12, 12, 12, 12, 12, 11, 11, 11,
+        11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 10, 10, 10, 10, 10, 10,
+        10, 10, 10, 10, 10, 10, 10, 10, 10, 10, 10, 10, 10, 9, 9, 9,
+        9, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9,
+        8, 8, 8, 8, 8, 8, 8, 8, 8, 8, 8, 8, 8, 8, 8, 8,
+        8, 8, 8, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7,
+        7, 7, 7, 7, 7, 7, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6,
+        6, 6, 6, 6, 6, 6, 6, 6, 6, 5, 5, 5, 5, 5, 5, 5,
+        5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5,
+        5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 4, 4, 4, 4, 4, 4,
+        4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4,
+        4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4,
+        4, 4, 4, 4, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3,
+        3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3,
+        3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 2, 2, 2,
+        2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2
+};
+
+const uint8_t filter0000High[256] PROGMEM = {
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255,
+        255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 255, 191, 170, 170, 170, 170,
+        170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 170, 90, 85, 85,
+        85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85, 85,
+        85, 85, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0
+};
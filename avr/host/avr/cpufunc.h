@@ -0,0 +1,8 @@
+// Host stand-in for avr/cpufunc.h.
+
+#ifndef HOST_AVR_CPUFUNC_H
+#define HOST_AVR_CPUFUNC_H
+
+#define _NOP() do {} while(0)
+
+#endif
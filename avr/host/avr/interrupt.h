@@ -0,0 +1,17 @@
+// Host stand-ins for avr/interrupt.h: interrupt handlers are plain
+// functions test_noisEE.c calls to simulate the hardware.
+
+#ifndef HOST_AVR_INTERRUPT_H
+#define HOST_AVR_INTERRUPT_H
+
+#include <avr/io.h>
+
+#define ISR(vector) void vector(void)
+void ADC_vect(void);
+void TIM0_COMPA_vect(void);
+
+extern int hostInterruptsEnabled;
+#define sei() (hostInterruptsEnabled = 1)
+#define cli() (hostInterruptsEnabled = 0)
+
+#endif
@@ -0,0 +1,67 @@
+// Host stand-ins for the ATtiny84 registers noisEE.c uses, for
+// test_noisEE.c: the registers are plain variables, and the hardware
+// behind them is simulated by the hooks test_noisEE.c defines.
+
+#ifndef HOST_AVR_IO_H
+#define HOST_AVR_IO_H
+
+#include <stdint.h>
+
+volatile uint8_t PORTA, DDRA;
+volatile uint8_t ADCSRA, ADMUX;
+volatile uint16_t ADC;
+volatile uint8_t USICR, USISR;
+volatile uint8_t TCNT0, TCCR0A, TCCR0B, OCR0A, TIMSK0;
+
+// Every byte loaded into USIDR goes out over SPI: hostSPIByte logs it,
+// along with the chip select pins, and returns where to store it.
+volatile uint8_t *hostSPIByte(void);
+#define USIDR (*hostSPIByte())
+
+// Port A pins.
+#define PCINT0 0
+#define PCINT1 1
+#define PCINT2 2
+#define PCINT3 3
+#define PCINT4 4
+#define PCINT5 5
+
+// ADCSRA
+#define ADEN 7
+#define ADSC 6
+#define ADIE 3
+#define ADPS2 2
+#define ADPS1 1
+#define ADPS0 0
+
+// ADMUX
+#define REFS1 7
+#define REFS0 6
+#define MUX2 2
+#define MUX1 1
+#define MUX0 0
+
+// USICR
+#define USIWM1 5
+#define USIWM0 4
+#define USICS1 3
+#define USICS0 2
+#define USICLK 1
+#define USITC 0
+
+// USISR: writing USIOIF clears it on the hardware, but setting it here
+// finishes the transfer right away, which is all writeSPIValue needs.
+#define USIOIF 6
+
+// TCCR0A
+#define WGM01 1
+
+// TCCR0B
+#define CS02 2
+#define CS01 1
+#define CS00 0
+
+// TIMSK0
+#define OCIE0A 1
+
+#endif
@@ -0,0 +1,11 @@
+// Host stand-in for avr/pgmspace.h: program memory is ordinary memory.
+
+#ifndef HOST_AVR_PGMSPACE_H
+#define HOST_AVR_PGMSPACE_H
+
+#include <stdint.h>
+
+#define PROGMEM
+#define pgm_read_byte(address) (*(const uint8_t *) (address))
+
+#endif
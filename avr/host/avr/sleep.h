@@ -0,0 +1,21 @@
+// Host stand-ins for avr/sleep.h: sleeping runs test_noisEE.c's
+// simulation of whichever interrupt would wake the CPU.
+
+#ifndef HOST_AVR_SLEEP_H
+#define HOST_AVR_SLEEP_H
+
+#include <avr/io.h>
+
+#define SLEEP_MODE_IDLE 0
+#define SLEEP_MODE_ADC 1
+
+extern uint8_t hostSleepMode;
+extern int hostSleepEnabled;
+void hostSleep(void);
+
+#define set_sleep_mode(mode) (hostSleepMode = (mode))
+#define sleep_enable() (hostSleepEnabled = 1)
+#define sleep_disable() (hostSleepEnabled = 0)
+#define sleep_cpu() hostSleep()
+
+#endif
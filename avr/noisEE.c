@@ -17,10 +17,26 @@
 #include <avr/io.h>
 #include <avr/sleep.h>
 
+// Build with -DINTERPOLATE_FILTERS to interpolate the filter values at
+// runtime instead of looking them up in the precomputed tables.
+#ifndef INTERPOLATE_FILTERS
+#include "filter_tables.h"
+#endif
+
+// Points in each filter's piecewise linear approximation: the
+// breakpoints linear_approximation.py fits, and the 2 endpoints.
+#define FILTER_POINTS 8
+
 // Forward declares.
 
+#ifdef INTERPOLATE_FILTERS
 uint16_t interpolatePiecewiseLinearFunction(uint16_t unpaddedX,
-                                            uint16_t xs[8], uint16_t ys[8]);
+                                            uint16_t xs[FILTER_POINTS],
+                                            uint16_t ys[FILTER_POINTS]);
+#else
+uint16_t readPotTable(const uint8_t *low, const uint8_t *high,
+                      uint16_t input);
+#endif
 
 void writeDisableWriteProtect();
 
@@ -49,20 +65,53 @@ void writeSPIValue(char byte);
  * We use 2 bytes because 1 byte only covers 8 bits, and we have 10
  * bits of input and output. This way, we do not drop accuracy
  * needlessly.
+ *
+ * Unless INTERPOLATE_FILTERS is defined, these are only the source
+ * of filter_tables.h: regenerate it with
+ * `generate_hardware_parameter.py --firmware ../avr/noisEE.c --header
+ * ../avr/filter_tables.h` after changing them.
  */
-uint16_t filter0016x[8] = {0, 5734, 11693, 16030, 19274, 21684, 29121, 32767};
-uint16_t filter0016y[8] = {0, 1478, 6579, 13111, 22962, 26764, 29850, 32767};
+#ifdef INTERPOLATE_FILTERS
+uint16_t filter0016x[FILTER_POINTS] = {0, 5734, 11693, 16030, 19274, 21684, 29121, 32767};
+uint16_t filter0016y[FILTER_POINTS] = {0, 1478, 6579, 13111, 22962, 26764, 29850, 32767};
 
-uint16_t filter0270x[8] = {0, 3400, 9726, 16331, 19395, 22078, 25416, 32767};
-uint16_t filter0270y[8] = {1612, 6132, 22206, 32767, 13003, 4342, 807, 0};
+uint16_t filter0270x[FILTER_POINTS] = {0, 3400, 9726, 16331, 19395, 22078, 25416, 32767};
+uint16_t filter0270y[FILTER_POINTS] = {1612, 6132, 22206, 32767, 13003, 4342, 807, 0};
 
-uint16_t filter5300x[8] = {0, 2219, 7419, 10704, 16275, 20965, 24791, 32767};
-uint16_t filter5300y[8] = {5264, 10757, 28662, 32767, 29869, 8733, 1838, 0};
+uint16_t filter5300x[FILTER_POINTS] = {0, 2219, 7419, 10704, 16275, 20965, 24791, 32767};
+uint16_t filter5300y[FILTER_POINTS] = {5264, 10757, 28662, 32767, 29869, 8733, 1838, 0};
 
 // Plain white noise source filter parameters.
-uint16_t filter0000x[8] = {0, 3468, 9517, 11880, 15385, 25149, 28630, 32767};
-uint16_t filter0000y[8] = {32767, 32249, 10444, 5091, 1519, 363, 180, 80};
+uint16_t filter0000x[FILTER_POINTS] = {0, 3468, 9517, 11880, 15385, 25149, 28630, 32767};
+uint16_t filter0000y[FILTER_POINTS] = {32767, 32249, 10444, 5091, 1519, 363, 180, 80};
+#endif
+
+#ifndef INTERPOLATE_FILTERS
+void calculateFilterParameters(uint16_t input, uint16_t *filter0016,
+                               uint16_t *filter0270, uint16_t *filter5300,
+                               uint16_t *filter0000) {
+        // Cap the input at legal values for 10 bits of input, since
+        // the ADC maxes out at 10 bits.
+        if(input > 1023) {
+                input = 1023;
+        }
 
+        // The tables hold the interpolated and capped values for
+        // every input already.
+        *filter0016 = readPotTable(filter0016Low, filter0016High, input);
+        *filter0270 = readPotTable(filter0270Low, filter0270High, input);
+        *filter5300 = readPotTable(filter5300Low, filter5300High, input);
+        *filter0000 = readPotTable(filter0000Low, filter0000High, input);
+}
+
+uint16_t readPotTable(const uint8_t *low, const uint8_t *high,
+                      uint16_t input) {
+        // The low 8 bits of each value get a byte each; the top 2 bits
+        // are packed 4 values to a byte, lowest input in the lowest bits.
+        uint8_t highBits = pgm_read_byte(&high[input >> 2]) >> ((input & 3) << 1);
+        return pgm_read_byte(&low[input]) | ((uint16_t) (highBits & 3) << 8);
+}
+#else
 void calculateFilterParameters(uint16_t input, uint16_t *filter0016,
                                uint16_t *filter0270, uint16_t *filter5300,
                                uint16_t *filter0000) {
@@ -114,7 +163,8 @@ void calculateFilterParameters(uint16_t input, uint16_t *filter0016,
 }
 
 uint16_t interpolatePiecewiseLinearFunction(uint16_t unpaddedX,
-                                            uint16_t xs[8], uint16_t ys[8]) {
+                                            uint16_t xs[FILTER_POINTS],
+                                            uint16_t ys[FILTER_POINTS]) {
         // x is a 10-bit value, make it comparable to the 15-bit domain values.
         uint16_t x = (unpaddedX << 5);
         
@@ -123,7 +173,8 @@ uint16_t interpolatePiecewiseLinearFunction(uint16_t unpaddedX,
         // The current index represents the range that we expect the
         // value to be within.
         char minIndex = 0;
-        char maxIndex = 6; // The max index is 7, but it's just an endpoint.
+        // The max index is FILTER_POINTS - 1, but it's just an endpoint.
+        char maxIndex = FILTER_POINTS - 2;
         while(minIndex != maxIndex) {
                 char midIndex = (minIndex + maxIndex)/2;
                 if(x < xs[midIndex]) {
@@ -148,23 +199,35 @@ uint16_t interpolatePiecewiseLinearFunction(uint16_t unpaddedX,
         int16_t dy = ys[maxIndex + 1] - ys[maxIndex];
         // Theoretically possible for the intermediate value to take
         // up 15 + 15 = 30 bits, so use a signed 32 bit int.
+        // Widen dy before multiplying: with 16 bit ints, dy * t is an
+        // unsigned 16 bit multiply, which wraps.
         // The final delta should again fit into 15 bits.
-        int16_t delta = ((int32_t) (dy * t)) / dx;
+        int16_t delta = ((int32_t) dy * t) / dx;
         // Reduce back to 10 bits.
         return (ys[maxIndex] + delta) >> 5;
 }
+#endif
 
 /**
  * The previous output value of the individual filter parameters.
+ *
+ * Pot values are 10 bits, so NO_FILTER_VALUE never matches one, and
+ * the first values always get written.
  */
-uint16_t PREVIOUS_FILTER_0016 = 0;
-uint16_t PREVIOUS_FILTER_0270 = 0;
-uint16_t PREVIOUS_FILTER_5300 = 0;
-uint16_t PREVIOUS_FILTER_0000 = 0;
+#define NO_FILTER_VALUE 0xFFFF
+uint16_t PREVIOUS_FILTER_0016 = NO_FILTER_VALUE;
+uint16_t PREVIOUS_FILTER_0270 = NO_FILTER_VALUE;
+uint16_t PREVIOUS_FILTER_5300 = NO_FILTER_VALUE;
+uint16_t PREVIOUS_FILTER_0000 = NO_FILTER_VALUE;
+
+// The chip select pins (PA0/PA1/PA2/PA3 for 16,270,5300,inft
+// respectively).
+#define CHIP_SELECT_PINS ((1 << PCINT0) | (1 << PCINT1) | \
+                          (1 << PCINT2) | (1 << PCINT3))
 
 void unselect() {
         // Unselect the device, wait for RDY in max 2.4uS (default R-Perf mode).
-        PORTA |= (1 << PCINT0) | (1 << PCINT1) | (1 << PCINT2) | (1 << PCINT3);
+        PORTA |= CHIP_SELECT_PINS;
         _NOP();
         _NOP();
         _NOP();
@@ -175,6 +238,27 @@ void selectWait() {
         _NOP();
 }
 
+void selectDevice(uint8_t pin) {
+        // Note that the active pin is LOW, not HIGH.
+        PORTA = (PORTA | CHIP_SELECT_PINS) & ~(1 << pin);
+        selectWait();
+}
+
+/**
+ * Write a filter value to the pot on the given chip select pin, only
+ * if it differs from the last value written to it.
+ */
+void writeChangedFilterValue(uint8_t pin, uint16_t value,
+                             uint16_t *previous) {
+        if(value == *previous) {
+                return;
+        }
+        *previous = value;
+        selectDevice(pin);
+        writeFilterValue(value);
+        unselect();
+}
+
 void calculateAndWriteFilterValues(int input) {
         uint16_t filter0016 = 0;
         uint16_t filter0270 = 0;
@@ -188,45 +272,13 @@ void calculateAndWriteFilterValues(int input) {
                 &filter0000
                 );
 
-        // For each device, select and then write the value over SPI.
-        // Note that the active pin is LOW, not HIGH.
-        // TEST TEST TEST: ALWAYS WRITE EACH VALUE
-        /* if (filter0016 != PREVIOUS_FILTER_0016) { */
-        if (1) {
-                PREVIOUS_FILTER_0016 = filter0016;
-                PORTA = (PORTA & ~(1 << PCINT0)) |
-                        (1 << PCINT1) | (1 << PCINT2) | (1 << PCINT3);
-                selectWait();
-                writeFilterValue(filter0016);
-                unselect();
-        }
-        /* if (filter0270 != PREVIOUS_FILTER_0270) { */
-        if (1) {
-                PREVIOUS_FILTER_0270 = filter0270;
-                PORTA = (PORTA & ~(1 << PCINT1)) |
-                        (1 << PCINT0) | (1 << PCINT2) | (1 << PCINT3);
-                selectWait();
-                writeFilterValue(filter0270);
-                unselect();
-        }
-        /* if (filter5300 != PREVIOUS_FILTER_5300) { */
-        if (1) {
-                PREVIOUS_FILTER_5300 = filter5300;
-                PORTA = (PORTA & ~(1 << PCINT2)) |
-                        (1 << PCINT0) | (1 << PCINT1) | (1 << PCINT3);
-                selectWait();
-                writeFilterValue(filter5300);
-                unselect();
-        }
-        /* if (filter0000 != PREVIOUS_FILTER_0000) { */
-        if (1) {
-                PREVIOUS_FILTER_0000 = filter0000;
-                PORTA = (PORTA & ~(1 << PCINT3)) |
-                        (1 << PCINT0) | (1 << PCINT1) | (1 << PCINT2);
-                selectWait();
-                writeFilterValue(filter0000);
-                unselect();
-        }
+        // Neighboring knob positions mostly differ in only some of the
+        // filter values, so only spend SPI transfers on the pots whose
+        // values changed.
+        writeChangedFilterValue(PCINT0, filter0016, &PREVIOUS_FILTER_0016);
+        writeChangedFilterValue(PCINT1, filter0270, &PREVIOUS_FILTER_0270);
+        writeChangedFilterValue(PCINT2, filter5300, &PREVIOUS_FILTER_5300);
+        writeChangedFilterValue(PCINT3, filter0000, &PREVIOUS_FILTER_0000);
 }
 
 void enableAllDevices() {
@@ -236,33 +288,24 @@ void enableAllDevices() {
         // Start with a low USCK/SCL
         PORTA &= ~(1 << PCINT4);
 
-        // For each device, select and then write the value over SPI.
-        // Note that the active pin is LOW, not HIGH.
+        // For each device, select and then write over SPI.
         // Pin 13.
-        PORTA = (PORTA & ~(1 << PCINT0)) |
-                (1 << PCINT1) | (1 << PCINT2) | (1 << PCINT3);
-        selectWait();
+        selectDevice(PCINT0);
         writeDisableWriteProtect();
         unselect();
-        
+
         // Pin 12.
-        PORTA = (PORTA & ~(1 << PCINT1)) |
-                (1 << PCINT0) | (1 << PCINT2) | (1 << PCINT3);
-        selectWait();
+        selectDevice(PCINT1);
         writeDisableWriteProtect();
         unselect();
 
         // Pin 11.
-        PORTA = (PORTA & ~(1 << PCINT2)) |
-                (1 << PCINT0) | (1 << PCINT1) | (1 << PCINT3);
-        selectWait();
+        selectDevice(PCINT2);
         writeDisableWriteProtect();
         unselect();
 
         // Pin 10.
-        PORTA = (PORTA & ~(1 << PCINT3)) |
-                (1 << PCINT0) | (1 << PCINT1) | (1 << PCINT2);
-        selectWait();
+        selectDevice(PCINT3);
         writeDisableWriteProtect();
         unselect();
 }
@@ -309,35 +352,6 @@ void writeSPIValue(char byte) {
         }
 }
 
-/**
- * Sleep after writing to the potentiometers.
- */
-void sleepForABit() {
-        // Use the 8 bit timer.
-        // Initialize the timer register.
-        TCNT0 = 0;
-        
-        // Disconnect the timer output pins and use CTC mode.
-        TCCR0A |= (1 << WGM01);
-        
-        // Compare the timer value against the largest 8-bit value.
-        OCR0A = 255;
-        
-        // Trigger an alert when we match OCR0A.
-        TIMSK0 |= (1 << OCIE0A);
-        
-        // With a 64x prescale, 255*64 is 16ms/64Hz maximum update.
-        // This also starts the timer.
-        TCCR0B |= (1 << CS01) | (1 << CS00);
-                                
-        // Keep peripherals (like the timer) running while sleeping.
-        set_sleep_mode(SLEEP_MODE_IDLE);
-        // Enable interrupts.
-        sei();
-        // Sleep until the timer triggers.
-        sleep_mode();
-}
-
 /**
  * Handle TP-20 writes requests to the digital potentiometer (AD5292).
  *
@@ -363,6 +377,14 @@ char wroteTP20 = 0;
 
 /**
  * Global state machine
+ *
+ * The main loop does the work of the current state, and sleeps until
+ * an interrupt moves it on to the next one:
+ *  SleepingState - waiting for the timer between readings, moved on
+ *    by TIM0_COMPA_vect.
+ *  WaitingForReadState - the ADC is converting the knob position,
+ *    moved on by ADC_vect.
+ *  WriteValueState - write any new filter values.
  */
 typedef enum {
         SleepingState = 0,
@@ -370,11 +392,129 @@ typedef enum {
         WriteValueState
 } State;
 
-State GlobalState;
+// Read the knob as soon as the pots are set up.
+volatile State GlobalState = WaitingForReadState;
 uint16_t ADCValue = 0;
-uint16_t PreviousADCValue = 0;
+// The ADC reading the filter values were last written for; ADC
+// readings are 10 bits, so NO_ADC_VALUE never matches one.
+#define NO_ADC_VALUE 0xFFFF
+uint16_t PreviousADCValue = NO_ADC_VALUE;
 
-void main() {
+// How many codes the knob has to move before the filter values get
+// rewritten: the lowest bits of the ADC jitter even when the knob is
+// standing still.
+#define ADC_HYSTERESIS 2
+
+/**
+ * Whether the knob moved far enough from the reading the filter
+ * values were last written for. The ends of the range always count
+ * as a move, so they stay reachable.
+ */
+char knobMoved(uint16_t value, uint16_t previous) {
+        if(previous == NO_ADC_VALUE) {
+                return 1;
+        }
+        if(value == previous) {
+                return 0;
+        }
+        if(value == 0 || value == 1023) {
+                return 1;
+        }
+        // Add instead of subtracting, so nothing wraps below 0.
+        return value > previous + ADC_HYSTERESIS ||
+                value + ADC_HYSTERESIS < previous;
+}
+
+/**
+ * Sleep until an interrupt moves GlobalState on from the given state.
+ */
+void sleepWhile(State state, uint8_t mode) {
+        set_sleep_mode(mode);
+        // Check the state with interrupts off, so the interrupt can't
+        // land between the check and going to sleep: sei() only takes
+        // effect after the next instruction, which is the sleep.
+        cli();
+        while(GlobalState == state) {
+                sleep_enable();
+                sei();
+                sleep_cpu();
+                sleep_disable();
+                cli();
+        }
+        sei();
+}
+
+/**
+ * Sleep after writing to the potentiometers.
+ */
+void sleepForABit() {
+        // Use the 8 bit timer.
+        // Initialize the timer register.
+        TCNT0 = 0;
+        
+        // Disconnect the timer output pins and use CTC mode.
+        TCCR0A |= (1 << WGM01);
+        
+        // Compare the timer value against the largest 8-bit value.
+        OCR0A = 255;
+        
+        // Trigger an alert when we match OCR0A.
+        TIMSK0 |= (1 << OCIE0A);
+        
+        // With a 64x prescale, 255*64 is 16ms/64Hz maximum update.
+        // This also starts the timer.
+        TCCR0B |= (1 << CS01) | (1 << CS00);
+                                
+        // Keep peripherals (like the timer) running while sleeping.
+        // Sleep until the timer triggers.
+        sleepWhile(SleepingState, SLEEP_MODE_IDLE);
+}
+
+/**
+ * Sleep through an ADC conversion of the knob position.
+ */
+void sleepForADCRead() {
+        // Enable ADC complete interrupts, to wake back up.
+        ADCSRA |= (1 << ADIE);
+        // ADC noise reduction mode starts the conversion itself, and
+        // stops the CPU and IO clocks for a quieter reading.
+        sleepWhile(WaitingForReadState, SLEEP_MODE_ADC);
+}
+
+/**
+ * One pass through the state machine.
+ */
+void runStateMachine() {
+        if(GlobalTP20Setting && wroteTP20 == 0) {
+                handleTP20Request();
+                GlobalTP20Setting = 0;
+                wroteTP20 = 1;
+                return;
+        }
+        switch(GlobalState) {
+        case SleepingState:
+                sleepForABit();
+                break;
+        case WaitingForReadState:
+                sleepForADCRead();
+                break;
+        case WriteValueState:
+                // Read from the ADC, and write to the potentiometers.
+                ADCValue = ADC;
+                if(knobMoved(ADCValue, PreviousADCValue)) {
+                        calculateAndWriteFilterValues(ADCValue);
+                        // Only move the reference when writing, so
+                        // a slow turn still adds up to a move.
+                        PreviousADCValue = ADCValue;
+                }
+
+                // Go to sleep for a while.
+                GlobalState = SleepingState;
+                break;
+        }
+}
+
+void setup() {
         /* -- Initial Configuration ----------------------------------------- */
         // By default, the internal 8MHz oscillator is used, and the
         // clock prescaler runs at 1/8 f_clk.
@@ -383,9 +523,9 @@ void main() {
         // With 1Mhz default internal clock, 32x prescale gives the ADC a 30kHz
         // clock (50-200kHz needed for 10 bit resolution).
         // By default, the ADC7 pin is configured as input.
+        // The ADC complete interrupts get enabled for each reading.
         ADCSRA |=
                 (1 << ADEN) | // Enable the ADC.
-                // (1 << ADIE) | // Enable ADC complete interrupts.
                 (1 << ADPS2) | (1 << ADPS0); // Set the ADC prescaler to 32x.
         ADMUX |=
                 // Use Vcc as the reference.
@@ -395,10 +535,8 @@ void main() {
         
         // Set up the SPI communications channels.
         DDRA |=
-                // Set the direction for the chip select pins
-                // (PA0/PA1/PA2/PA3 for 16,270,5300,inft
-                // respectively).
-                (1 << PCINT0) | (1 << PCINT1) | (1 << PCINT2) | (1 << PCINT3)
+                // Set the direction for the chip select pins.
+                CHIP_SELECT_PINS
                 // Set the direction for the SPI pins SCL and MOSI
                 // (MISO is default input).
                 // NOTE: ATTiny84 marks MOSI/MISO, but this is the
@@ -427,84 +565,19 @@ void main() {
         // Configure each pot to not be read-only.
         enableAllDevices();
 
+        sei();
+}
+
+void main() {
+        setup();
+
         /* -- Main Loop ----------------------------------------------------- */
-        // THIS IS A TEST LOOP.
-        uint16_t j = 0;
-        uint16_t k = 0;
-        while (1) {
-                for (k = 0; k < 6543; k++) {
-                        _NOP();
-                }
-                /* j += 1; */
-                /* j %= 1024; */
-                /* calculateAndWriteFilterValues(j); */
-
-                PORTA = (PORTA & ~(1 << PCINT0)) |
-                        (1 << PCINT1) | (1 << PCINT2) | (1 << PCINT3);
-                selectWait();
-                writeFilterValue(1023);
-                unselect();
-
-                PORTA = (PORTA & ~(1 << PCINT1)) |
-                        (1 << PCINT0) | (1 << PCINT2) | (1 << PCINT3);
-                selectWait();
-                writeFilterValue(1023);
-                unselect();
-
-                PORTA = (PORTA & ~(1 << PCINT2)) |
-                        (1 << PCINT0) | (1 << PCINT1) | (1 << PCINT3);
-                selectWait();
-                writeFilterValue(1023);
-                unselect();
-
-                PORTA = (PORTA & ~(1 << PCINT3)) |
-                        (1 << PCINT0) | (1 << PCINT1) | (1 << PCINT2);
-                selectWait();
-                writeFilterValue(1023);
-                unselect();
+        // Everything after setup is interrupt driven: the CPU sleeps
+        // except for a pass through the state machine after each timer
+        // and ADC interrupt.
+        while(1) {
+                runStateMachine();
         }
-
-        // THIS IS THE REAL LOOP.
-        /* while(1) { */
-        /*         if(GlobalTP20Setting && wroteTP20 == 0) { */
-        /*                 handleTP20Request(); */
-        /*                 GlobalTP20Setting = 0; */
-        /*                 wroteTP20 = 1; */
-        /*         } else { */
-        /*                 switch(GlobalState) { */
-        /*                 case SleepingState: */
-        /*                         GlobalState = WaitingForReadState; */
-
-        /*                         // Sleep until the ADC value is ready. */
-        /*                         // Keep peripherals running. */
-        /*                         set_sleep_mode(SLEEP_MODE_IDLE); */
-
-        /*                         // Enable interrupts. */
-        /*                         sei(); */
-        /*                         // Start a read from the ADC. */
-        /*                         ADCSRA |= (1 << ADSC) | (1 << ADIE); */
-                                
-        /*                         // Sleep until the ADC is done. */
-        /*                         sleep_mode(); */
-        /*                         // while () ; */
-        /*                         break; */
-        /*                 case WriteValueState: */
-        /*                         // Read from the ADC, and write to the */
-        /*                         // potentiometers. */
-        /*                         ADCValue = ADC; */
-        /*                         if(PreviousADCValue < ADCValue - 2 || */
-        /*                            PreviousADCValue > ADCValue + 2) { */
-        /*                                 calculateAndWriteFilterValues(ADCValue); */
-        /*                         } */
-        /*                         PreviousADCValue = ADCValue; */
-                                
-        /*                         // Go to sleep for a while. */
-        /*                         GlobalState = SleepingState; */
-        /*                         sleepForABit(); */
-        /*                         break; */
-        /*                 } */
-        /*         } */
-        /* } */
 }
 
 // Handle the ADC conversion finishing.
@@ -518,6 +591,7 @@ ISR(ADC_vect) {
 ISR(TIM0_COMPA_vect) {
         // Wipe the prescale settings to stop the timer.
         TCCR0B &= ~((1 << CS02) | (1 << CS01) | (1 << CS00));
+        GlobalState = WaitingForReadState;
 }
 
 /**
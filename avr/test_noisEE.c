@@ -0,0 +1,296 @@
+// Copyright 2017 "Nathan Hwang" <thenoviceoof>
+//
+// Licensed under the Apache License, Version 2.0 (the "License");
+// you may not use this file except in compliance with the License.
+// You may obtain a copy of the License at
+//
+//     http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing, software
+// distributed under the License is distributed on an "AS IS" BASIS,
+// WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+// See the License for the specific language governing permissions and
+// limitations under the License.
+
+// Host build of noisEE.c, to check its main loop without a board.
+//
+// The registers are plain variables (see host/avr/io.h), and sleeping
+// runs the interrupt that would wake the CPU: a timer match, or an ADC
+// conversion reading the next simulated knob position. Every SPI byte
+// gets logged and decoded back into the value each AD5292 would hold.
+//
+// For each knob scenario, checks that the pots end up with the filter
+// values for the knob position, and counts wakeups and SPI bytes
+// against rewriting every pot on every reading, like the old main
+// loop, and against only writing the changed pots without hysteresis.
+//
+// Build and run with `make test`.
+
+#include <stdio.h>
+#include <stdlib.h>
+
+#define main firmwareMain
+#include "noisEE.c"
+#undef main
+
+#define POTS 4
+#define MAX_SPI_BYTES 65536
+// Each AD5292 write is a command byte and a data byte.
+#define BYTES_PER_WRITE 2
+
+int hostInterruptsEnabled = 0;
+uint8_t hostSleepMode = SLEEP_MODE_IDLE;
+int hostSleepEnabled = 0;
+
+int failures = 0;
+
+void fail(const char *message) {
+        printf("FAILED: %s\n", message);
+        failures++;
+}
+
+/* -- Simulated hardware ------------------------------------------------- */
+
+// The knob position for each ADC conversion.
+uint16_t (*knobPosition)(long reading) = 0;
+long readings = 0;
+long wakeups = 0;
+// Simulated time, in timer ticks of 64 cycles of the 1MHz clock.
+long timerTicks = 0;
+
+uint8_t spiBytes[MAX_SPI_BYTES];
+uint8_t spiSelect[MAX_SPI_BYTES];
+long spiCount = 0;
+
+volatile uint8_t *hostSPIByte(void) {
+        if(spiCount == MAX_SPI_BYTES) {
+                printf("FAILED: more than %d SPI bytes\n", MAX_SPI_BYTES);
+                exit(1);
+        }
+        spiSelect[spiCount] = PORTA & CHIP_SELECT_PINS;
+        return &spiBytes[spiCount++];
+}
+
+void hostSleep(void) {
+        if(!hostSleepEnabled || !hostInterruptsEnabled) {
+                printf("FAILED: sleeping with interrupts off never wakes\n");
+                exit(1);
+        }
+        wakeups++;
+        if(hostSleepMode == SLEEP_MODE_ADC) {
+                // Entering ADC noise reduction mode starts a conversion;
+                // the timer's clock is stopped.
+                if(!(ADCSRA & (1 << ADEN)) || !(ADCSRA & (1 << ADIE))) {
+                        printf("FAILED: ADC sleep with no ADC interrupt\n");
+                        exit(1);
+                }
+                ADC = knobPosition(readings++);
+                ADC_vect();
+        } else if((TCCR0B & ((1 << CS02) | (1 << CS01) | (1 << CS00))) &&
+                  (TIMSK0 & (1 << OCIE0A))) {
+                timerTicks += OCR0A + 1;
+                TIM0_COMPA_vect();
+        } else {
+                printf("FAILED: sleeping with nothing to wake up\n");
+                exit(1);
+        }
+}
+
+/* -- Decode the SPI log ------------------------------------------------- */
+
+// The value each pot holds, by chip select pin.
+int potValues[POTS];
+
+int selectedPot(uint8_t select) {
+        int pin;
+        int selected = -1;
+        for(pin = 0; pin < POTS; pin++) {
+                if(!(select & (1 << pin))) {
+                        if(selected != -1) {
+                                return -1;
+                        }
+                        selected = pin;
+                }
+        }
+        return selected;
+}
+
+void decodeSPI(long start) {
+        long i;
+        for(i = start; i < spiCount; i += BYTES_PER_WRITE) {
+                int pot = selectedPot(spiSelect[i]);
+                if(pot == -1 || i + 1 == spiCount ||
+                   spiSelect[i + 1] != spiSelect[i]) {
+                        fail("SPI write without exactly one pot selected");
+                        return;
+                }
+                uint8_t command = spiBytes[i] >> 2;
+                if(command == 1) {
+                        // Write RDAC: the wiper value is inverted.
+                        potValues[pot] = 1023 - (((spiBytes[i] & 3) << 8) |
+                                                 spiBytes[i + 1]);
+                } else if(command != 6) {
+                        // Anything but a write protect control.
+                        fail("unexpected AD5292 command");
+                }
+        }
+}
+
+/* -- Scenarios ---------------------------------------------------------- */
+
+uint16_t clampKnob(long value) {
+        return value < 0 ? 0 : value > 1023 ? 1023 : value;
+}
+
+// +-1 code of ADC noise, from a fixed LCG.
+int noise(long reading) {
+        uint32_t state = 2654435761u * (uint32_t) (reading + 1);
+        return (int) ((state >> 16) % 3) - 1;
+}
+
+uint16_t knobAt512(long reading) {
+        return 512;
+}
+
+uint16_t knobStillWithNoise(long reading) {
+        return 512 + noise(reading);
+}
+
+uint16_t slowTurn(long reading) {
+        return clampKnob(512 + (reading % 300));
+}
+
+uint16_t fastSweep(long reading) {
+        return clampKnob(((reading % 61) * 1023) / 60);
+}
+
+uint16_t knobMove(long reading) {
+        long step = reading % 66;
+        if(step < 5) {
+                return 300 + 8 * step + noise(reading);
+        }
+        return clampKnob(340 + noise(reading));
+}
+
+uint16_t knobToTop(long reading) {
+        return 1023 - (reading % 61 < 2 ? 2 : 0);
+}
+
+uint16_t knobToBottom(long reading) {
+        return reading % 61 < 2 ? 2 : 0;
+}
+
+// Pot values in chip select order, like calculateAndWriteFilterValues.
+void filterValues(uint16_t input, uint16_t values[POTS]) {
+        calculateFilterParameters(input, &values[0], &values[1],
+                                  &values[2], &values[3]);
+}
+
+/**
+ * Run the main loop over count knob readings; returns the SPI bytes
+ * written.
+ */
+long runScenario(const char *name, uint16_t (*knob)(long reading),
+                 long count, int exactEnd) {
+        long startSPI = spiCount;
+        long startWakeups = wakeups;
+        long startTicks = timerTicks;
+        // A timer and an ADC wakeup per reading, unless the first
+        // reading doesn't wait for the timer.
+        long expectedWakeups = 2 * count -
+                (GlobalState == WaitingForReadState);
+        long changedBytes = 0;
+        uint16_t previous[POTS];
+        uint16_t current[POTS];
+        long i;
+        int pot;
+
+        // Writing only changed pots, but on every reading.
+        filterValues(PreviousADCValue == NO_ADC_VALUE ? 0 : PreviousADCValue,
+                     previous);
+        for(i = 0; i < count; i++) {
+                filterValues(knob(i), current);
+                for(pot = 0; pot < POTS; pot++) {
+                        if(current[pot] != previous[pot] ||
+                           (i == 0 && PreviousADCValue == NO_ADC_VALUE)) {
+                                changedBytes += BYTES_PER_WRITE;
+                        }
+                        previous[pot] = current[pot];
+                }
+        }
+
+        knobPosition = knob;
+        readings = 0;
+        while(readings < count || GlobalState != SleepingState) {
+                runStateMachine();
+        }
+        decodeSPI(startSPI);
+
+        long bytes = spiCount - startSPI;
+        printf("%-30s %4ld readings %5.2fs %5ld wakeups  SPI bytes: %5ld "
+               "every pot, %5ld changed pots, %5ld now\n",
+               name, count, (timerTicks - startTicks) * 64e-6,
+               wakeups - startWakeups, count * POTS * BYTES_PER_WRITE,
+               changedBytes, bytes);
+
+        // The pots hold the values for the last reading written for...
+        filterValues(PreviousADCValue, current);
+        for(pot = 0; pot < POTS; pot++) {
+                if(potValues[pot] != current[pot]) {
+                        fail("a pot is out of date");
+                }
+        }
+        // ...which is within the hysteresis of the knob.
+        int last = knob(count - 1);
+        int difference = last - (int) PreviousADCValue;
+        if(difference > ADC_HYSTERESIS || difference < -ADC_HYSTERESIS ||
+           (exactEnd && difference != 0)) {
+                fail("the pots don't follow the knob");
+        }
+        if(wakeups - startWakeups != expectedWakeups) {
+                fail("woke up more than once per timer and ADC reading");
+        }
+        if(bytes > changedBytes) {
+                fail("wrote more than the changed pots");
+        }
+        return bytes;
+}
+
+void testKnobMoved() {
+        if(!knobMoved(512, NO_ADC_VALUE) || !knobMoved(0, NO_ADC_VALUE)) {
+                fail("the first reading has to be written");
+        }
+        if(knobMoved(512, 512) || knobMoved(514, 512) ||
+           knobMoved(510, 512) || knobMoved(1, 3)) {
+                fail("moves within the hysteresis count");
+        }
+        if(!knobMoved(515, 512) || !knobMoved(509, 512) ||
+           !knobMoved(0, 2) || !knobMoved(1023, 1022)) {
+                fail("moves past the hysteresis, or to the ends, are missed");
+        }
+}
+
+int main() {
+        testKnobMoved();
+
+        setup();
+        decodeSPI(0);
+        printf("Setup: %ld SPI bytes\n", spiCount);
+
+        runScenario("boot at 512", knobAt512, 1, 1);
+        // The knob noise never gets written.
+        if(runScenario("still, +-1 code of noise", knobStillWithNoise,
+                       610, 0)) {
+                fail("a still knob keeps writing");
+        }
+        runScenario("slow turn, 1 code/reading", slowTurn, 300, 0);
+        runScenario("sweep 0-1023 in a second", fastSweep, 61, 0);
+        runScenario("move 300-340, then rest", knobMove, 66, 0);
+        runScenario("to the top", knobToTop, 61, 1);
+        runScenario("to the bottom", knobToBottom, 61, 1);
+
+        printf("The old main loop never slept, and wrote %d SPI bytes on "
+               "every pass.\n", POTS * BYTES_PER_WRITE);
+        printf("%s\n", failures ? "FAILED" : "ok");
+        return failures ? 1 : 0;
+}
@@ -0,0 +1,143 @@
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Precompute the filter coefficients for every potentiometer step.
+#
+# The gains coming out of linear_parameters.csv get snapped to one of
+# 1024 potentiometer steps, so there are only 1024 possible coefficient
+# pairs per filter. Build them all once, and turn a slope into
+# coefficients with an interpolation plus an array gather.
+
+from collections import namedtuple
+import csv
+import math
+import os
+
+import numpy
+
+SAMPLE_RATE = 44100.0
+POT_STEPS = 1024
+
+# Filters in coefficient order, and their cutoff frequencies.
+FILTER_NAMES = ['constant', 'low', 'medium', 'high']
+CUTOFFS = [2000000, 16.5, 270.0, 5300.0]
+
+# The slope domain, as seen by the firmware: slopes (-20, 0) map to
+# the 15 bit fixed-point range (2**15-1, 0), and a 10 bit ADC code is
+# padded into that range with << 5.
+MIN_SLOPE = -20.0
+MAX_FIXED_POINT = (2**15)-1
+ADC_CODES = 1024
+
+# xs/ys: (filters x breakpoints) piecewise linear slope => gain functions.
+# max_gains: (filters,) full scale gain of each potentiometer.
+# coefficients: (steps x filters x 2) (A, gain*(1-A)) one-pole coefficients.
+# adc_pot_steps: optional (ADC codes x filters) pot steps; when set,
+#   slopes go through the ADC codes instead of the xs/ys functions.
+CoefficientTable = namedtuple('CoefficientTable',
+                              ['xs', 'ys', 'max_gains', 'coefficients',
+                               'adc_pot_steps'])
+CoefficientTable.__new__.__defaults__ = (None,)
+
+################################################################################
+# Read in the functions.
+
+def read_linear_parameters(path='linear_parameters.csv'):
+    params = {}
+    with open(path) as file:
+        csv_file = csv.reader(file, delimiter=',')
+        for row in csv_file:
+            if row[0] == '':
+                continue
+            name = row[0].split(' ')[0].lower()
+            values = [float(v) for v in row[1:]]
+            # All the xs, then all the ys.
+            assert len(values) % 2 == 0, \
+                'Uneven x and y counts for {}'.format(name)
+            points = len(values) // 2
+            paired_values = list(zip(values[:points], values[points:]))
+            params[name] = paired_values
+    return params
+
+################################################################################
+# Build the table.
+
+def one_pole_coefficient(f_c, sample_rate=SAMPLE_RATE):
+    return 1-(1/sample_rate)/(1/(2*math.pi*f_c) + 1/sample_rate)
+
+def build_coefficient_table(params, sample_rate=SAMPLE_RATE, steps=POT_STEPS):
+    xs = numpy.array([[x for x,_ in params[name]] for name in FILTER_NAMES])
+    ys = numpy.array([[y for _,y in params[name]] for name in FILTER_NAMES])
+    max_gains = ys.max(axis=1)
+
+    A = numpy.array([one_pole_coefficient(fc, sample_rate) for fc in CUTOFFS])
+    gains = numpy.arange(steps)[:, None] / float(steps) * max_gains
+    coefficients = numpy.empty((steps, len(FILTER_NAMES), 2))
+    coefficients[:, :, 0] = A
+    coefficients[:, :, 1] = gains * (1 - A)
+    return CoefficientTable(xs, ys, max_gains, coefficients)
+
+_TABLE_CACHE = {}
+
+def load_coefficient_table(path='linear_parameters.csv',
+                           sample_rate=SAMPLE_RATE):
+    '''Build the table for a CSV, reusing it until the file changes.'''
+    key = (os.path.abspath(path), os.path.getmtime(path), sample_rate)
+    if key not in _TABLE_CACHE:
+        params = read_linear_parameters(path)
+        _TABLE_CACHE[key] = build_coefficient_table(params, sample_rate)
+    return _TABLE_CACHE[key]
+
+################################################################################
+# Look up slopes.
+
+def adc_codes_to_slopes(adc_codes):
+    adc_codes = numpy.asarray(adc_codes)
+    return MIN_SLOPE * (adc_codes << 5) / float(MAX_FIXED_POINT)
+
+def slopes_to_adc_codes(slopes):
+    '''Returns the ADC code the knob would read for each slope.'''
+    fixed_point = numpy.asarray(slopes) / MIN_SLOPE * MAX_FIXED_POINT
+    adc_codes = numpy.round(fixed_point / 2**5).astype(numpy.intp)
+    return numpy.clip(adc_codes, 0, ADC_CODES - 1)
+
+def slopes_to_pot_steps(table, slopes):
+    '''Returns the (filters x slopes) potentiometer step for each slope.
+
+    Gains snap down to the nearest step, and a full scale gain lands on
+    the top step (1023/1024 of max), like the real 10 bit pot.
+    '''
+    slopes = numpy.atleast_1d(numpy.asarray(slopes, dtype=numpy.float64))
+    if table.adc_pot_steps is not None:
+        return table.adc_pot_steps[slopes_to_adc_codes(slopes)].T
+    steps = table.coefficients.shape[0]
+    pot_steps = numpy.empty((len(FILTER_NAMES), len(slopes)), dtype=numpy.intp)
+    for i in range(len(FILTER_NAMES)):
+        gains = numpy.interp(slopes, table.xs[i], table.ys[i])
+        pot_steps[i] = numpy.floor(steps * gains / table.max_gains[i])
+    return numpy.clip(pot_steps, 0, steps - 1)
+
+def slopes_to_gains(table, slopes):
+    '''Returns the (filters x slopes) snapped gain for each slope.'''
+    pot_steps = slopes_to_pot_steps(table, slopes)
+    steps = table.coefficients.shape[0]
+    return pot_steps / float(steps) * table.max_gains[:, None]
+
+def slopes_to_coefficients(table, slopes):
+    '''Returns the (filters x slopes x 2) (A, B) coefficients for each slope.'''
+    pot_steps = slopes_to_pot_steps(table, slopes)
+    filter_index = numpy.arange(len(FILTER_NAMES))[:, None]
+    return table.coefficients[pot_steps, filter_index]
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Emulate the firmware's ADC => potentiometer path, bit for bit.
+#
+# Mirrors calculateFilterParameters and interpolatePiecewiseLinearFunction
+# in avr/noisEE.c for a whole array of ADC codes at once, or for a stack
+# of tables at once. avr-gcc has 16 bit ints, which matters:
+#
+# - uint16_t is an unsigned int, so uint16_t - uint16_t wraps mod 2**16
+#   instead of going negative.
+# - (int32_t) dy * t widens dy first, so the multiply is 32 bit. Left
+#   as dy * t, the usual arithmetic conversions would make it an
+#   unsigned 16 bit multiply, wrapping mod 2**16 before any cast.
+# - ys[i] + delta is again unsigned 16 bit math, and >> 5 is a logical
+#   shift.
+
+import argparse
+import os
+import re
+
+import numpy
+
+from coefficient_table import ADC_CODES, FILTER_NAMES, adc_codes_to_slopes
+from coefficient_table import load_coefficient_table, slopes_to_pot_steps
+
+FIRMWARE_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               '..', 'avr', 'noisEE.c')
+
+# Table names in noisEE.c, in calculateFilterParameters order.
+FIRMWARE_TABLES = [
+    ('low', 'filter0016'),
+    ('medium', 'filter0270'),
+    ('high', 'filter5300'),
+    ('constant', 'filter0000'),
+]
+
+
+################################################################################
+# Read in the tables.
+
+def read_firmware_tables(path=FIRMWARE_SOURCE):
+    '''Returns {name: (xs, ys)} parsed out of the uint16_t arrays in noisEE.c.'''
+    with open(path) as file:
+        source = file.read()
+    arrays = dict(re.findall(
+        r'uint16_t\s+(filter\d{4}[xy])\s*\[\w+\]\s*=\s*\{([^}]*)\}',
+        source))
+    tables = {}
+    for name, c_name in FIRMWARE_TABLES:
+        tables[name] = tuple([int(v) for v in arrays[c_name + axis].split(',')]
+                             for axis in 'xy')
+    points = re.search(r'#define\s+FILTER_POINTS\s+(\d+)', source)
+    for name, (xs, ys) in tables.items():
+        assert points is None or len(xs) == len(ys) == int(points.group(1)), \
+            '{} table in {} is not FILTER_POINTS long'.format(name, path)
+    return tables
+
+################################################################################
+# Integer helpers.
+
+def as_uint16(values):
+    return numpy.asarray(values, dtype=numpy.int64) & 0xFFFF
+
+def as_int16(values):
+    return ((numpy.asarray(values, dtype=numpy.int64) + 2**15) & 0xFFFF) - 2**15
+
+def as_int32(values):
+    return ((numpy.asarray(values, dtype=numpy.int64) + 2**31) &
+            0xFFFFFFFF) - 2**31
+
+def c_divide(numerator, denominator):
+    '''C integer division, truncating toward zero.'''
+    quotient = numpy.abs(numerator) // numpy.abs(denominator)
+    return numpy.where((numerator < 0) != (denominator < 0), -quotient, quotient)
+
+def gather(table, index):
+    '''table[index], row by row if table is a (... x breakpoints) stack
+    and index a matching (... x n) array.'''
+    if table.ndim == 1:
+        return table[index]
+    return numpy.take_along_axis(table, index, axis=-1)
+
+################################################################################
+# Emulate.
+
+def binary_search_segments(x, xs):
+    '''Run the firmware's binary search for every x at once.
+
+    xs is either one table, or a (tables x breakpoints) stack with x
+    (tables x n). Returns (segment, valid): the maxIndex the loop ends
+    with, and whether the search terminated without indexing outside xs.
+    '''
+    xs = numpy.asarray(xs, dtype=numpy.int64)
+    points = xs.shape[-1]
+    x = numpy.asarray(x, dtype=numpy.int64)
+    min_index = numpy.zeros(x.shape, dtype=numpy.int64)
+    # The max index is points - 1, but it's just an endpoint.
+    max_index = numpy.full(x.shape, points - 2, dtype=numpy.int64)
+    active = min_index != max_index
+    valid = numpy.ones(x.shape, dtype=bool)
+    # Every pass either ends the search or narrows its range, so a
+    # search still running after this many passes never terminates.
+    for _ in range(points):
+        if not active.any():
+            break
+        # char arithmetic: the division truncates toward zero.
+        mid_index = c_divide(min_index + max_index, 2)
+        valid &= ~active | ((mid_index >= 0) & (mid_index + 1 < points))
+        mid = numpy.clip(mid_index, 0, points - 2)
+        below = active & (x < gather(xs, mid))
+        above = active & ~below & (x > gather(xs, mid + 1))
+        found = active & ~below & ~above
+        max_index = numpy.where(below, mid_index - 1, max_index)
+        min_index = numpy.where(above, mid_index + 1, min_index)
+        max_index = numpy.where(found, mid_index, max_index)
+        active &= ~found & (min_index != max_index)
+    valid &= ~active & (max_index >= 0) & (max_index + 1 < points)
+    return numpy.clip(max_index, 0, points - 2), valid
+
+def interpolate_piecewise_linear(unpadded_x, xs, ys):
+    '''interpolatePiecewiseLinearFunction for an array of 10 bit inputs.
+
+    Returns (values, valid); see binary_search_segments for stacks of
+    tables and valid.
+    '''
+    xs = numpy.asarray(xs, dtype=numpy.int64)
+    ys = numpy.asarray(ys, dtype=numpy.int64)
+    x = as_uint16(numpy.asarray(unpadded_x, dtype=numpy.int64) << 5)
+    segment, valid = binary_search_segments(x, xs)
+
+    lower, upper = gather(xs, segment), gather(xs, segment + 1)
+    t = as_uint16(x - lower)
+    dx = as_int16(as_uint16(upper - lower))
+    dy = as_int16(as_uint16(gather(ys, segment + 1) - gather(ys, segment)))
+    product = as_int32(dy * t)
+    # A zero width segment divides by zero; that's invalid too.
+    valid &= dx != 0
+    delta = as_int16(c_divide(product, numpy.where(dx != 0, dx, 1)))
+    return as_uint16(gather(ys, segment) + delta) >> 5, valid
+
+def calculate_filter_parameters(adc_codes, tables):
+    '''calculateFilterParameters for an array of ADC codes.
+
+    Returns ({name: pot values}, valid), with pot values in the
+    firmware's bigger-louder 0-1023 sense, before writeFilterValue
+    inverts them for the wiper.
+    '''
+    adc_codes = numpy.minimum(as_uint16(adc_codes), 1023)
+    values = {}
+    valid = numpy.ones(adc_codes.shape, dtype=bool)
+    for name, _ in FIRMWARE_TABLES:
+        xs, ys = tables[name]
+        value, filter_valid = interpolate_piecewise_linear(adc_codes, xs, ys)
+        values[name] = numpy.minimum(value, 1023)
+        valid &= filter_valid
+    return values, valid
+
+def wiper_codes(values):
+    '''writeFilterValue's inversion: 0 is full resistance.'''
+    return 1023 - numpy.asarray(values)
+
+def spi_frames(values):
+    '''The two bytes writeFilterValue sends for each value.'''
+    wiper = wiper_codes(values)
+    return numpy.stack([(1 << 2) | (wiper >> 8), wiper & 255], axis=-1)
+
+def emulate_all_codes(tables):
+    '''Returns the (ADC codes x filters) pot values, in FILTER_NAMES order.'''
+    values, valid = calculate_filter_parameters(numpy.arange(ADC_CODES),
+                                                tables)
+    assert valid.all(), 'The binary search breaks for some ADC codes'
+    return numpy.stack([values[name] for name in FILTER_NAMES], axis=1)
+
+def firmware_coefficient_table(table, tables):
+    '''Route a coefficient table's slopes through the firmware's pot values.'''
+    return table._replace(adc_pot_steps=emulate_all_codes(tables))
+
+################################################################################
+# Compare against the float model.
+
+def compare_to_float_model(table, tables):
+    '''Returns {name: pot value errors} of the firmware vs. the CSV model.'''
+    adc_codes = numpy.arange(ADC_CODES)
+    float_steps = slopes_to_pot_steps(table, adc_codes_to_slopes(adc_codes))
+    firmware_steps = emulate_all_codes(tables).T
+    return dict((name, firmware_steps[i] - float_steps[i])
+                for i, name in enumerate(FILTER_NAMES))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compare the firmware pot values with the float model.')
+    parser.add_argument('--firmware', default=FIRMWARE_SOURCE)
+    parser.add_argument('--parameters', default='linear_parameters.csv')
+    args = parser.parse_args()
+
+    tables = read_firmware_tables(args.firmware)
+    errors = compare_to_float_model(load_coefficient_table(args.parameters),
+                                    tables)
+    for name in FILTER_NAMES:
+        error = errors[name]
+        print('{:>8}: max |error| {:4d} steps, mean {:+7.2f}, '
+              'worst at ADC code {}'.format(
+                  name, int(numpy.abs(error).max()), error.mean(),
+                  int(numpy.abs(error).argmax())))
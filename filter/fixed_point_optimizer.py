@@ -0,0 +1,380 @@
+#!/usr/bin/env python
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Search the integer breakpoint tables of noisEE.c directly.
+#
+# generate_hardware_parameter.py rounds each float breakpoint to 15
+# bits on its own, and the >> 5 and the 1024 pot steps lose more on
+# top. Here the score is what the hardware ends up doing: a candidate
+# set of four tables runs through the firmware's integer interpolation
+# for all 1024 ADC codes, the pot values turn into gains, and the
+# slope of the summed response gets compared with the slope each code
+# stands for. Candidates are scored a population at a time, as
+# (candidates x filters x codes) integer arrays.
+#
+# The search is a hill climb over the integers: each candidate moves
+# one inner x or one y of one filter, the best move is kept, and the
+# move size halves whenever a few generations in a row don't improve.
+
+from collections import namedtuple
+import argparse
+import multiprocessing
+import os
+import re
+import time
+
+import numpy
+
+from coefficient_table import ADC_CODES, CUTOFFS, FILTER_NAMES, MAX_FIXED_POINT
+from coefficient_table import POT_STEPS, adc_codes_to_slopes
+from coefficient_table import load_coefficient_table, read_linear_parameters
+from firmware_emulator import FIRMWARE_SOURCE, FIRMWARE_TABLES
+from firmware_emulator import calculate_filter_parameters, read_firmware_tables
+from generate_hardware_parameter import fixed_point_parameters, pack_pot_table
+from generate_hardware_parameter import pot_tables, verify_pot_tables
+from generate_hardware_parameter import write_pot_table_header
+from spectrum import even_log_frequencies, response_basis
+
+# The search scores on a coarser grid than ideal_parameters.py's 200
+# points; final tables are reported on both.
+SEARCH_POINTS = 64
+REPORT_POINTS = 200
+
+POPULATION = 64
+INITIAL_STEP = 1024
+# Generations without an improvement before the move size halves.
+PATIENCE = 8
+MAX_GENERATIONS = 2000
+
+# xs, ys: (filters x points) integer tables, in FIRMWARE_TABLES order.
+SearchResult = namedtuple('SearchResult', [
+    'xs', 'ys', 'loss', 'generations', 'evaluations', 'elapsed'])
+
+################################################################################
+# Evaluate tables.
+
+def stack_tables(tables):
+    '''{name: (xs, ys)} => (filters x points) xs and ys, in firmware order.'''
+    xs = numpy.array([tables[name][0] for name, _ in FIRMWARE_TABLES])
+    ys = numpy.array([tables[name][1] for name, _ in FIRMWARE_TABLES])
+    return xs, ys
+
+def unstack_tables(xs, ys):
+    return dict((name, ([int(v) for v in xs[i]], [int(v) for v in ys[i]]))
+                for i, (name, _) in enumerate(FIRMWARE_TABLES))
+
+def pot_values(xs, ys):
+    '''The firmware's pot values for every ADC code.
+
+    Takes any (... x points) stack of tables. Returns (... x codes) values,
+    and which tables are valid: xs strictly increasing from 0 to 32767,
+    ys within 15 bits. For valid tables nothing in the interpolation wraps (see
+    test_firmware_tables.py), so this skips the 16 bit emulation:
+
+    - the segment is the number of inner xs below x, instead of the
+      binary search. Any segment containing x interpolates to the same
+      value, and with ordered xs the search finds one. The codes are
+      all the ADC codes in order, so each inner x bumps the segment
+      from code xs[k]/32 + 1 on: a cumulative sum over the codes.
+    - dy * t / dx truncates in float64, which is exact: the product
+      fits in 31 bits and the quotient can't round across an integer.
+    '''
+    xs = numpy.asarray(xs, dtype=numpy.int32)
+    ys = numpy.asarray(ys, dtype=numpy.int32)
+    valid = (numpy.diff(xs, axis=-1) > 0).all(axis=-1) & \
+        (xs[..., 0] == 0) & (xs[..., -1] == MAX_FIXED_POINT) & \
+        (ys >= 0).all(axis=-1) & (ys <= MAX_FIXED_POINT).all(axis=-1)
+    x = numpy.arange(ADC_CODES, dtype=numpy.int32) << 5
+    tables = xs.shape[:-1]
+    rows = numpy.arange(numpy.prod(tables)).reshape(tables + (1,))
+    # Clip out of range xs, so each table's bumps stay in its own bins.
+    starts = numpy.clip(xs[..., 1:-1] // 32 + 1, 0, ADC_CODES)
+    bumps = numpy.bincount((rows * (ADC_CODES + 1) + starts).ravel(),
+                           minlength=rows.size * (ADC_CODES + 1))
+    segment = numpy.cumsum(bumps.reshape(tables + (ADC_CODES + 1,)),
+                           axis=-1)[..., :-1]
+    # Unordered tables can count past the last segment.
+    segment = numpy.minimum(segment, xs.shape[-1] - 2)
+
+    def at(table, index):
+        return numpy.take_along_axis(table, index, axis=-1)
+    lower, upper = at(xs, segment), at(xs, segment + 1)
+    low_y = at(ys, segment)
+    dy = at(ys, segment + 1) - low_y
+    # Leave invalid tables' empty segments to give garbage, not errors.
+    dx = numpy.maximum(upper - lower, 1).astype(numpy.float64)
+    delta = numpy.trunc((dy * (x - lower)).astype(numpy.float64) / dx)
+    values = (low_y + delta.astype(numpy.int32)) >> 5
+    return numpy.clip(values, 0, POT_STEPS - 1), valid
+
+class SlopeScorer(object):
+    '''Scores tables by the slope error of the response they produce.
+
+    max_gains: (filters,) full scale gains, in firmware order.
+
+    Calling it scores whole (candidates x filters x points) tables. The
+    search instead scores moves of one filter against an incumbent,
+    only redoing the codes whose pot value the move changes.
+    '''
+    def __init__(self, max_gains, points=SEARCH_POINTS, dtype=numpy.float32):
+        order = [FILTER_NAMES.index(name) for name, _ in FIRMWARE_TABLES]
+        self.targets = adc_codes_to_slopes(numpy.arange(ADC_CODES))
+        self.scales = (numpy.asarray(max_gains, dtype=numpy.float64) /
+                       POT_STEPS).astype(dtype)
+        self.basis = response_basis(CUTOFFS, points)[order].astype(dtype)
+        log_frequencies = numpy.log10(even_log_frequencies(points))
+        self.centered = (log_frequencies - log_frequencies.mean()).astype(dtype)
+        self.projection = self.centered / (self.centered**2).sum()
+
+    def responses(self, values):
+        '''(... x codes x frequencies) summed response of (... x filters x
+        codes) pot values.'''
+        gains = numpy.swapaxes(values, -1, -2).astype(self.scales.dtype) * \
+            self.scales
+        return numpy.matmul(gains, self.basis)
+
+    def decibels(self, responses):
+        # Keep the response positive, to be able to take the log.
+        return 20*numpy.log10(numpy.maximum(responses, 1e-10))
+
+    def fit(self, values):
+        '''Returns (slopes, RMS residuals in dB), (... x codes), of (... x
+        filters x codes) pot values.'''
+        decibels = self.decibels(self.responses(values))
+        slopes = numpy.matmul(decibels, self.projection)
+        residuals = decibels - decibels.mean(axis=-1)[..., None] - \
+            slopes[..., None] * self.centered
+        return slopes, numpy.sqrt((residuals**2).mean(axis=-1))
+
+    def __call__(self, xs, ys):
+        '''RMS slope error in dB/decade of each candidate; inf if invalid.'''
+        values, valid = pot_values(xs, ys)
+        slopes = numpy.matmul(self.decibels(self.responses(values)),
+                              self.projection)
+        errors = numpy.sqrt(((slopes - self.targets)**2).mean(axis=-1))
+        return numpy.where(valid.all(axis=-1), errors, numpy.inf)
+
+    def set_incumbent(self, xs, ys):
+        '''Score moves against the (filters x points) tables from now on.
+
+        Returns their RMS slope error.
+        '''
+        self.values, _ = pot_values(xs, ys)
+        self.response = self.responses(self.values)
+        slopes = numpy.dot(self.decibels(self.response), self.projection)
+        self.squared_errors = (slopes - self.targets)**2
+        self.total = self.squared_errors.sum()
+        return numpy.sqrt(self.total / ADC_CODES)
+
+    def score_moves(self, which, xs, ys):
+        '''RMS slope errors of the incumbent with filter which[i]'s table
+        replaced by (xs[i], ys[i]), for (moves x points) xs and ys.'''
+        values, valid = pot_values(xs, ys)
+        previous = self.values[which]
+        moves, codes = numpy.nonzero(values != previous)
+        filters = which[moves]
+        changes = (values[moves, codes] - previous[moves, codes]).astype(
+            self.scales.dtype) * self.scales[filters]
+        response = self.response[codes] + changes[:, None] * self.basis[filters]
+        slopes = numpy.dot(self.decibels(response), self.projection)
+        totals = self.total + numpy.bincount(
+            moves, (slopes - self.targets[codes])**2 - self.squared_errors[codes],
+            minlength=len(which))
+        return numpy.where(valid, numpy.sqrt(numpy.maximum(totals, 0) /
+                                             ADC_CODES), numpy.inf)
+
+def score_chunk(task):
+    scorer, which, xs, ys = task
+    return scorer.score_moves(which, xs, ys)
+
+################################################################################
+# Search.
+
+def mutate(xs, ys, step, population, random_state):
+    '''population moves of the (filters x points) tables, each moving one
+    inner x or one y of one filter by 1 to step.
+
+    Returns the filter each move changes, and its moved (population x
+    points) xs and ys.
+    '''
+    filters, points = xs.shape
+    which = random_state.randint(0, filters, population)
+    xs, ys = xs[which], ys[which]
+    rows = numpy.arange(population)
+    # 0..points-3 are the inner xs, the rest the ys.
+    coordinate = random_state.randint(0, 2 * points - 2, population)
+    moves = random_state.randint(1, step + 1, population) * \
+        random_state.choice([-1, 1], population)
+    on_x = coordinate < points - 2
+    xs[rows[on_x], coordinate[on_x] + 1] += moves[on_x]
+    ys[rows[~on_x], coordinate[~on_x] - (points - 2)] += moves[~on_x]
+    return which, numpy.clip(xs, 0, MAX_FIXED_POINT), \
+        numpy.clip(ys, 0, MAX_FIXED_POINT)
+
+def search(scorer, xs, ys, population=POPULATION, step=INITIAL_STEP,
+           max_generations=MAX_GENERATIONS, time_budget=None,
+           random_state=numpy.random, pool=None, processes=1):
+    '''Hill climb the integer tables from (xs, ys). Returns a SearchResult.'''
+    start_time = time.time()
+    xs = numpy.array(xs, dtype=numpy.int64)
+    ys = numpy.array(ys, dtype=numpy.int64)
+    loss = scorer.set_incumbent(xs, ys)
+    evaluations = 1
+    stalled = 0
+    for generation in range(1, max_generations + 1):
+        which, move_xs, move_ys = mutate(xs, ys, step, population,
+                                         random_state)
+        if pool is None:
+            losses = scorer.score_moves(which, move_xs, move_ys)
+        else:
+            chunks = numpy.array_split(numpy.arange(population), processes)
+            losses = numpy.concatenate(pool.map(score_chunk, [
+                (scorer, which[chunk], move_xs[chunk], move_ys[chunk])
+                for chunk in chunks]))
+        evaluations += population
+        best = losses.argmin()
+        # Ignore float32 noise-level "improvements".
+        if losses[best] < loss - 1e-6:
+            xs[which[best]], ys[which[best]] = move_xs[best], move_ys[best]
+            loss = scorer.set_incumbent(xs, ys)
+            stalled = 0
+        else:
+            stalled += 1
+        if stalled >= PATIENCE:
+            if step == 1:
+                break
+            step //= 2
+            stalled = 0
+        if time_budget is not None and time.time() - start_time > time_budget:
+            break
+    return SearchResult(xs, ys, float(loss), generation, evaluations,
+                        time.time() - start_time)
+
+################################################################################
+# Write out the tables.
+
+def format_tables(tables):
+    '''The tables as noisEE.c declares them.'''
+    lines = []
+    for name, c_name in FIRMWARE_TABLES:
+        if name == 'constant':
+            lines.append('// Plain white noise source filter parameters.')
+        for axis, values in zip('xy', tables[name]):
+            lines.append('uint16_t {}{}[FILTER_POINTS] = {{{}}};'.format(
+                c_name, axis, ', '.join(str(v) for v in values)))
+        lines.append('')
+    return '\n'.join(lines[:-1]) + '\n'
+
+def update_firmware(tables, path=FIRMWARE_SOURCE):
+    '''Replace the table constants in noisEE.c.'''
+    with open(path) as file:
+        source = file.read()
+    for name, c_name in FIRMWARE_TABLES:
+        for axis, values in zip('xy', tables[name]):
+            source, count = re.subn(
+                r'(uint16_t\s+{}{}\s*\[\w+\]\s*=\s*\{{)[^}}]*(\}})'.format(
+                    c_name, axis),
+                r'\g<1>{}\g<2>'.format(', '.join(str(v) for v in values)),
+                source)
+            assert count == 1, 'no {}{} in {}'.format(c_name, axis, path)
+    source, count = re.subn(r'(#define\s+FILTER_POINTS\s+)\d+',
+                            r'\g<1>{}'.format(len(tables[name][0])), source)
+    assert count == 1, 'no FILTER_POINTS in {}'.format(path)
+    with open(path, 'w') as file:
+        file.write(source)
+
+def report(name, scorers, xs, ys):
+    values, _ = pot_values(xs[None], ys[None])
+    columns = []
+    for scorer in scorers:
+        slopes, residuals = scorer.fit(values)
+        errors = slopes[0] - scorer.targets
+        columns.append('{:3d} points: RMS {:.3f}, max {:.3f} dB/decade, '
+                       'linearity {:.3f} dB'.format(
+                           len(scorer.projection),
+                           numpy.sqrt((errors**2).mean()),
+                           numpy.abs(errors).max(), residuals.mean()))
+    print('{:>9}: {}'.format(name, '; '.join(columns)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Optimize the integer breakpoint tables for the slope '
+        'error of the emulated hardware.')
+    parser.add_argument('--parameters', default='linear_parameters.csv',
+                        help='the fit the tables start from, and the pot '
+                        'full scale gains')
+    parser.add_argument('--firmware', default=None,
+                        help='start from the tables in this noisEE.c instead')
+    parser.add_argument('--population', type=int, default=POPULATION)
+    parser.add_argument('--generations', type=int, default=MAX_GENERATIONS)
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help='stop after this many seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=1,
+                        help='score candidates in parallel; 0 uses every core')
+    parser.add_argument('--update', default=None,
+                        help='write the tables into this noisEE.c, and '
+                        'regenerate filter_tables.h next to it')
+    args = parser.parse_args()
+
+    table = load_coefficient_table(args.parameters)
+    order = [FILTER_NAMES.index(name) for name, _ in FIRMWARE_TABLES]
+    if args.firmware:
+        start = read_firmware_tables(args.firmware)
+    else:
+        start = fixed_point_parameters(read_linear_parameters(args.parameters))
+    xs, ys = stack_tables(start)
+    scorer = SlopeScorer(table.max_gains[order])
+    scorers = [scorer, SlopeScorer(table.max_gains[order], REPORT_POINTS)]
+
+    processes = args.processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes) if processes > 1 else None
+    try:
+        result = search(scorer, xs, ys, args.population,
+                        max_generations=args.generations,
+                        time_budget=args.time_budget,
+                        random_state=numpy.random.RandomState(args.seed),
+                        pool=pool, processes=processes)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    tables = unstack_tables(result.xs, result.ys)
+    # The fast evaluator has to agree with the bit-exact emulation.
+    values, valid = calculate_filter_parameters(numpy.arange(ADC_CODES),
+                                                tables)
+    assert valid.all()
+    fast, _ = pot_values(result.xs[None], result.ys[None])
+    assert all((fast[0, i] == values[name]).all()
+               for i, (name, _) in enumerate(FIRMWARE_TABLES))
+
+    report('start', scorers, xs, ys)
+    report('optimized', scorers, result.xs, result.ys)
+    print('{} generations, {} tables scored in {:.2f}s ({:.0f} '
+          'tables/sec)'.format(result.generations, result.evaluations,
+                               result.elapsed,
+                               result.evaluations / result.elapsed))
+    print('')
+    print(format_tables(tables))
+    if args.update:
+        update_firmware(tables, args.update)
+        header = os.path.join(os.path.dirname(args.update), 'filter_tables.h')
+        packed = dict((name, pack_pot_table(values))
+                      for name, values in pot_tables(tables).items())
+        verify_pot_tables(tables, packed)
+        write_pot_table_header(packed, header)
+        print('Updated {} and {}'.format(args.update, header))
@@ -17,47 +17,79 @@
 
 # Generate audio from changing gain parameters.
 
-import array
-import csv
+import argparse
 import math
+import multiprocessing
+import time
 import wave
 
+import numpy
+
+from coefficient_table import load_coefficient_table, read_linear_parameters
+from coefficient_table import slopes_to_coefficients
+from firmware_emulator import firmware_coefficient_table, read_firmware_tables
+from noise_source import DISTRIBUTIONS, SAMPLE_FORMATS, white_noise_chunks
+from slope_automation import envelope_duration, evaluate_envelope
+from slope_automation import parse_envelope
 from pprint import pprint
 
 SAMPLE_RATE = 44100.0
 
 ################################################################################
-# Read in the functions.
-params = {}
-with open('linear_parameters.csv') as file:
-    csv_file = csv.reader(file, delimiter=',')
-    for row in csv_file:
-        if row[0] == '':
-            continue
-        name = row[0].split(' ')[0].lower()
-        values = [float(v) for v in row[1:]]
-        paired_values = zip(values[:8], values[8:])
-        params[name] = paired_values
+# Read the noise.
 
-################################################################################
-# Generate noise.
+CHUNK_SIZE = 65536
 
-def read_wav(path):
+def read_wav_chunks(path, chunk_size=CHUNK_SIZE, start=0, stop=None):
+    '''Yields the WAV's samples as int16 arrays of up to chunk_size frames.
+
+    Only frames [start, stop) are read.
+    '''
     wav_file = wave.open(path)
 
     assert wav_file.getnchannels() == 1, 'Expect monochannel audio'
     assert wav_file.getframerate() == SAMPLE_RATE, 'Expect 44.1k audio'
     assert wav_file.getsampwidth() == 2, 'Expected signed 16 bit audio'
 
-    data_string = wav_file.readframes(wav_file.getnframes())
+    if stop is None:
+        stop = wav_file.getnframes()
+    try:
+        wav_file.setpos(start)
+        position = start
+        while position < stop:
+            data_string = wav_file.readframes(min(chunk_size, stop - position))
+            position += chunk_size
+            if not data_string:
+                break
+            # Convert the data from string to an int16 array.
+            yield numpy.frombuffer(data_string, dtype='<i2')
+    finally:
+        wav_file.close()
+
+def wav_length(path):
+    wav_file = wave.open(path)
+    n = wav_file.getnframes()
+    wav_file.close()
+    return n
 
-    # Convert the data from string to byte(s) array
-    data = array.array('h')
-    data.fromstring(data_string)
+def read_wav(path):
+    return numpy.concatenate(list(read_wav_chunks(path)))
 
-    return list(data)
+def noise_chunks(noise_spec, start, stop):
+    '''Yields samples [start, stop) of the noise described by noise_spec.
 
-data = read_wav('white_noise.wav')
+    noise_spec is a dict, either {'input': path} for a WAV file, or the
+    keyword arguments for noise_source.white_noise_chunks. Either way the
+    samples are on the 16 bit scale the filters expect: float noise
+    comes out of noise_source within +-1, so it gets scaled up, without
+    rounding to int16 first.
+    '''
+    if 'input' in noise_spec:
+        return read_wav_chunks(noise_spec['input'], start=start, stop=stop)
+    chunks = white_noise_chunks(stop - start, offset=start, **noise_spec)
+    if noise_spec.get('sample_format', 'int16') == 'int16':
+        return chunks
+    return (chunk.astype(numpy.float64) * 2**15 for chunk in chunks)
 
 ################################################################################
 # Filter the noise.
@@ -72,7 +104,7 @@ def slope_to_coefficients(params, slope):
     }
 
     # Convert the slope to a target gain.
-    for name, linear_fn in params.iteritems():
+    for name, linear_fn in params.items():
         max_gain = max([g for _,g in linear_fn])
         gain = None
         for i in range(len(linear_fn)-1):
@@ -95,15 +127,8 @@ def slope_to_coefficients(params, slope):
     coefs = [(A, gain*(1-A)) for A, gain in tmp_coefs]
     return coefs
 
-def apply_continuous_filter(params, slope_spec, data):
-    # Prep coefficients
-    fc_gain = [[2000000, None], [16.5, None], [270.0, None], [5300.0, None]]
-    index_dict = {
-        'constant': 0,
-        'low': 1,
-        'medium': 2,
-        'high': 3,
-    }
+def apply_continuous_filter_per_sample(params, slope_spec, data):
+    '''Reference implementation: recompute the coefficients every sample.'''
     max_slope, min_slope = slope_spec
 
     # Apply to the data.
@@ -118,20 +143,443 @@ def apply_continuous_filter(params, slope_spec, data):
         output_data.append(trim_output)
     return output_data
 
-output_data = apply_continuous_filter(params, [-20, 0], data)
+BLOCK_SIZE = 1024
+
+def run_one_pole_block(a, b, x, state):
+    '''Run y[n] = a[n]*y[n-1] + b[n]*x[n] for all filters over one block.
+
+    a, b are (... x samples) coefficient arrays, usually (filters x
+    samples), x is the input block (broadcast against a and b), and
+    state is the last output of each filter from the previous block.
+    The recursion is evaluated as a log-depth prefix scan (each pass
+    composes neighboring affine steps), so there is no per-sample
+    Python loop, and since |a| < 1 nothing blows up.
+    '''
+    y = b * x
+    y[..., 0] += a[..., 0] * state
+    a = a.copy()
+    shift = 1
+    while shift < y.shape[-1]:
+        y[..., shift:] += a[..., shift:] * y[..., :-shift]
+        a[..., shift:] = a[..., shift:] * a[..., :-shift]
+        shift *= 2
+    return y
+
+def sweep_slopes(slope_spec, indexes, n):
+    '''Returns the slope at each sample index of an n sample render.
+
+    slope_spec is either a (max_slope, min_slope) pair, swept linearly
+    from min_slope to max_slope over the n samples, or a
+    slope_automation.Envelope.
+    '''
+    if hasattr(slope_spec, 'shapes'):
+        return evaluate_envelope(slope_spec,
+                                 numpy.asarray(indexes) / SAMPLE_RATE)
+    max_slope, min_slope = slope_spec
+    return (float(max_slope - min_slope) *
+            (numpy.asarray(indexes) / float(n)) + min_slope)
+
+def block_coefficients(table, slope_spec, start, stop, n,
+                       block_size=BLOCK_SIZE, mode='sample', control_size=None):
+    '''Returns (filters x samples x (A, B)) coefficients for [start, stop).
+
+    With mode='sample' every sample gets its own coefficients, gathered
+    from the precomputed coefficient table. Otherwise coefficients are
+    only derived at control block boundaries, every control_size samples
+    (by default, every block): mode='ramp' linearly interpolates them
+    across the control block, and mode='hold' holds the control block's
+    starting value.
+    '''
+    if mode == 'sample':
+        slopes = sweep_slopes(slope_spec, numpy.arange(start, stop), n)
+        return slopes_to_coefficients(table, slopes)
+
+    control_size = control_size or block_size
+    first = start - start % control_size
+    boundaries = numpy.minimum(
+        numpy.arange(first, stop + control_size, control_size), n)
+    slopes = sweep_slopes(slope_spec, boundaries, n)
+    # (filters x boundaries x (A, B)) coefficients at each boundary.
+    boundary_coefs = slopes_to_coefficients(table, slopes)
+    if mode == 'hold':
+        # Repeat rather than gather: it is what makes low control rates
+        # cheaper than per-sample coefficients.
+        counts = numpy.diff(numpy.clip(boundaries, start, stop))
+        return numpy.repeat(boundary_coefs[:, :-1], counts, axis=1)
+    # Ramp from each boundary's coefficients to the next's. The full
+    # control blocks share a single row of fractions; only the partial
+    # first and last ones get sliced. Samples go last while ramping, so
+    # numpy loops over them rather than over (A, B) pairs.
+    boundary_coefs = boundary_coefs.transpose(0, 2, 1)
+    starts = boundary_coefs[..., :-1]
+    deltas = numpy.diff(boundary_coefs, axis=-1)
+    # The sweep's last control block can end early, at n.
+    deltas[..., -1] *= control_size / float(boundaries[-1] - boundaries[-2])
+    def ramp(blocks, low, high):
+        frac = numpy.arange(low, high) / float(control_size)
+        ramps = starts[..., blocks, None] + deltas[..., blocks, None] * frac
+        return ramps.reshape(ramps.shape[:2] + (-1,))
+    head, tail = start - first, stop - boundaries[-2]
+    if starts.shape[-1] == 1:
+        ramps = ramp(slice(0, 1), head, tail)
+    else:
+        ramps = numpy.concatenate([ramp(slice(0, 1), head, control_size),
+                                   ramp(slice(1, -1), 0, control_size),
+                                   ramp(slice(-1, None), 0, tail)], axis=-1)
+    return ramps.transpose(0, 2, 1)
+
+def coefficient_blocks(table, slope_spec, chunks, n, block_size=BLOCK_SIZE,
+                       mode='sample', position=0, control_size=None):
+    '''Split a stream of chunks along block boundaries.
+
+    The chunks start at sample position of an n sample sweep. Yields
+    (coefs, data, end_of_chunk) for each piece, so blocks stay aligned
+    to absolute sample positions however the input is chunked.
+    '''
+    for chunk in chunks:
+        chunk = numpy.asarray(chunk, dtype=numpy.float64)
+        offset = 0
+        while offset < len(chunk):
+            start = position + offset
+            stop = min(start - start % block_size + block_size,
+                       position + len(chunk))
+            coefs = block_coefficients(table, slope_spec, start, stop, n,
+                                       block_size=block_size, mode=mode,
+                                       control_size=control_size)
+            offset = stop - position
+            yield coefs, chunk[start - position:offset], offset == len(chunk)
+        position += len(chunk)
+
+def to_samples(raw_output):
+    '''Truncate and clip the summed filter outputs to int16 samples.'''
+    return numpy.clip(numpy.trunc(raw_output), -2**15,
+                      2**15 - 1).astype(numpy.int16)
+
+def filter_block(coefs, data, state):
+    '''Run the filters over one block and sum them to int16 samples.
+
+    coefs are (... x filters x samples x (A, B)), data the input block
+    and state the filters' last outputs, as for run_one_pole_block.
+    Returns (samples, the filters' new state).
+    '''
+    filtered = run_one_pole_block(coefs[..., 0], coefs[..., 1], data, state)
+    return to_samples(filtered.sum(axis=-2)), filtered[..., -1]
+
+def filter_chunks(table, slope_spec, chunks, n, block_size=BLOCK_SIZE,
+                  mode='sample', position=0, state=None, control_size=None):
+    '''Filter a stream of chunks with a slope sweep over n total samples.
+
+    Yields an int16 array for every input chunk. The filter state and
+    the position in the sweep carry across chunk boundaries, and blocks
+    are aligned to absolute sample positions, so the output does not
+    depend on how the input was chunked. To render only part of the
+    sweep, pass the position of the first chunk and the filter state
+    just before it.
+
+    See block_coefficients for the modes and control_size; the control
+    blocks are aligned to absolute sample positions too. mode='sample' matches
+    apply_continuous_filter_per_sample (up to float rounding, and a
+    full scale gain snapping to the top pot step). mode='ramp' and
+    mode='hold' only approximate it: the pot steps land on different
+    samples, so the error depends on the coefficient table and grows
+    with the control block size, hold more than ramp. Running
+    slope_automation.py measures it for a table.
+    '''
+    if state is None:
+        state = numpy.zeros(4)
+    output_data = []
+    for coefs, data, end_of_chunk in coefficient_blocks(
+            table, slope_spec, chunks, n, block_size=block_size, mode=mode,
+            position=position, control_size=control_size):
+        samples, state = filter_block(coefs, data, state)
+        output_data.append(samples)
+        if end_of_chunk:
+            yield numpy.concatenate(output_data)
+            output_data = []
+
+def apply_continuous_filter(table, slope_spec, data, block_size=BLOCK_SIZE,
+                            mode='sample', control_size=None):
+    '''Filter in-memory data with a slope sweep; see filter_chunks.'''
+    return next(filter_chunks(table, slope_spec, [data], len(data),
+                              block_size=block_size, mode=mode,
+                              control_size=control_size))
+
+################################################################################
+# Filter the noise in parallel.
+#
+# The filters are linear recurrences, so the output of a segment
+# starting from state s is its output starting from zero, plus each
+# filter's running product of A coefficients times s. Workers render
+# their segments from zero in a single pass, keeping the raw output
+# and the running products until every product is negligible, and
+# the segment's (P, y) summary: its final state is P*s + y. Chaining
+# the summaries gives each segment its exact starting state, and
+# correcting the head of the segment finishes it.
+
+SEGMENT_SIZE = 2**20
+
+# The state going into a segment stops mattering once every filter's
+# running product of A coefficients drops below this.
+NEGLIGIBLE_PRODUCT = 1e-18
+
+def render_segment(task):
+    '''Render one segment of the sweep, starting from a zero state.
+
+    Returns (P, y, head, products, tail): the segment's summary, its raw
+    output and (filters x samples) running products while they matter,
+    and the int16 output of the rest, which the starting state doesn't
+    change.
+    '''
+    table, slope_spec, noise_spec, start, stop, n, options = task
+    product = numpy.ones(4)
+    state = numpy.zeros(4)
+    head, products, tail = [], [], []
+    for coefs, data, _ in coefficient_blocks(
+            table, slope_spec, noise_chunks(noise_spec, start, stop), n,
+            position=start, **options):
+        a = coefs[:, :, 0]
+        filtered = run_one_pole_block(a, coefs[:, :, 1], data, state)
+        state = filtered[:, -1]
+        if product.max() >= NEGLIGIBLE_PRODUCT:
+            running = product[:, None] * numpy.cumprod(a, axis=1)
+            head.append(filtered.sum(axis=0))
+            products.append(running)
+            product = running[:, -1]
+        else:
+            tail.append(to_samples(filtered.sum(axis=0)))
+            product = product * a.prod(axis=1)
+    return (product, state, numpy.concatenate(head),
+            numpy.concatenate(products, axis=1), tail)
+
+def filter_parallel(table, slope_spec, noise_spec, n, processes=None,
+                    block_size=BLOCK_SIZE, mode='sample', control_size=None,
+                    segment_size=SEGMENT_SIZE):
+    '''Filter n samples of noise_spec over a process pool.
+
+    Yields the rendered segments in order. The output matches the
+    serial filter_chunks render, except for the last-bit float rounding
+    of the handed-off states, which can very rarely flip an output
+    sample by 1 LSB.
+    '''
+    processes = processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes)
+    try:
+        # Use at least a segment per process, aligned to blocks.
+        segment_size = min(segment_size, -(-n // processes))
+        segment_size = max(block_size,
+                           -(-segment_size // block_size) * block_size)
+        options = {'block_size': block_size, 'mode': mode,
+                   'control_size': control_size}
+        tasks = [(table, slope_spec, noise_spec, start,
+                  min(start + segment_size, n), n, options)
+                 for start in range(0, n, segment_size)]
+
+        state = numpy.zeros(4)
+        for product, final, head, products, tail in pool.imap(render_segment,
+                                                              tasks):
+            head = to_samples(head + (products * state[:, None]).sum(axis=0))
+            yield numpy.concatenate([head] + tail)
+            state = product * state + final
+    finally:
+        pool.terminate()
+
+################################################################################
+# Filter many channels at once.
+#
+# Each channel gets its own slope sweep and noise, but all of them go
+# through the filters as a single (channels x filters x samples) array.
+
+def filter_channels(table, slope_specs, noise_specs, n,
+                    block_size=BLOCK_SIZE):
+    '''Yields (channels x samples) int16 chunks of n samples in total.
+
+    Channel i sweeps slope_specs[i] (see sweep_slopes) over
+    noise_specs[i] (see noise_chunks); every sample gets its own coefficients, as with
+    filter_chunks' mode='sample'.
+    '''
+    assert len(slope_specs) == len(noise_specs), 'Need a sweep per channel'
+    channels = len(slope_specs)
+    sources = [noise_chunks(spec, 0, n) for spec in noise_specs]
+    state = numpy.zeros((channels, 4))
+    position = 0
+    while position < n:
+        chunk = numpy.array([next(source) for source in sources],
+                            dtype=numpy.float64)
+        output_data = numpy.empty(chunk.shape, dtype=numpy.int16)
+        for offset in range(0, chunk.shape[1], block_size):
+            stop = min(offset + block_size, chunk.shape[1])
+            indexes = numpy.arange(position + offset, position + stop)
+            slopes = numpy.array([sweep_slopes(slope_spec, indexes, n)
+                                  for slope_spec in slope_specs])
+            # (filters x channels*samples x (A, B)) =>
+            # (channels x filters x samples x (A, B))
+            coefs = slopes_to_coefficients(table, slopes.ravel())
+            coefs = coefs.reshape(4, channels, -1, 2).transpose(1, 0, 2, 3)
+            output_data[:, offset:stop], state = filter_block(
+                coefs, chunk[:, None, offset:stop], state)
+        position += chunk.shape[1]
+        yield output_data
 
 ################################################################################
 # Write the noise to a WAV.
 
-def write_wav(data):
-    wav_file = wave.open('filtered_noise.wav', 'w')
-    wav_file.setnchannels(1)
+def write_wav_chunks(path, chunks, channels=1):
+    '''Write each chunk out as soon as it arrives; returns the frame count.
+
+    With more than one channel, chunks are (channels x samples) arrays.
+    '''
+    wav_file = wave.open(path, 'w')
+    wav_file.setnchannels(channels)
     wav_file.setframerate(SAMPLE_RATE)
     wav_file.setsampwidth(2)
 
-    # Convert from byte(s) array to string
-    arr = array.array('h')
-    arr.fromlist(data)
-    wav_file.writeframes(arr.tostring())
+    n = 0
+    try:
+        for chunk in chunks:
+            # Interleave the channels, and convert from int16 array to string
+            chunk = numpy.asarray(chunk, dtype='<i2')
+            wav_file.writeframes(chunk.T.tobytes())
+            n += chunk.shape[-1]
+    finally:
+        wav_file.close()
+    return n
+
+def write_wav_channel_chunks(paths, chunks):
+    '''Write each channel of (channels x samples) chunks to its own WAV.'''
+    wav_files = []
+    for path in paths:
+        wav_file = wave.open(path, 'w')
+        wav_file.setnchannels(1)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.setsampwidth(2)
+        wav_files.append(wav_file)
+
+    n = 0
+    try:
+        for chunk in chunks:
+            chunk = numpy.asarray(chunk, dtype='<i2')
+            for wav_file, channel in zip(wav_files, chunk):
+                wav_file.writeframes(channel.tobytes())
+            n += chunk.shape[-1]
+    finally:
+        for wav_file in wav_files:
+            wav_file.close()
+    return n
+
+def write_wav(data, path='filtered_noise.wav'):
+    write_wav_chunks(path, [data])
+
+################################################################################
+# Stream the noise through the filters, a chunk at a time.
+
+def parse_channel_slopes(spec):
+    '''Parse "start:end,slope,..." into one slope_spec per channel.'''
+    slope_specs = []
+    for channel in spec.split(','):
+        slopes = [float(v) for v in channel.split(':')]
+        start, end = slopes[0], slopes[-1]
+        # slope_specs run from their second slope to their first.
+        slope_specs.append([end, start])
+    return slope_specs
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Render a white to red noise sweep to filtered_noise.wav.')
+    parser.add_argument('--input', default=None,
+                        help='filter this WAV (44.1k mono 16 bit) instead of '
+                        'generating white noise')
+    parser.add_argument('--duration', type=float, default=20.0,
+                        help='seconds of generated noise to render')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS,
+                        default='uniform')
+    parser.add_argument('--sample-format', choices=SAMPLE_FORMATS,
+                        default='int16',
+                        help='generate the noise as 16 bit samples, or as '
+                        'floats that skip the rounding to 16 bits')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='render segments of the sweep in parallel; '
+                        '0 uses every core')
+    parser.add_argument('--firmware', action='store_true',
+                        help='use the pot values the AVR firmware computes')
+    parser.add_argument('--channel-slopes', default=None,
+                        help='render decorrelated channels in one pass, one '
+                        'per comma separated "start:end" sweep or constant '
+                        'slope; channel i uses seed + i')
+    parser.add_argument('--separate', action='store_true',
+                        help='write each channel to filtered_noise_<i>.wav '
+                        'instead of one multichannel WAV')
+    parser.add_argument('--envelope', default=None,
+                        help='automate the slope with a CSV file or a '
+                        '"time:slope[:shape],..." envelope instead of the '
+                        'white to red sweep; sets the generated duration')
+    parser.add_argument('--control-rate', type=float, default=None,
+                        help='update the coefficients this many times a '
+                        'second instead of every sample')
+    parser.add_argument('--ramp', action='store_true',
+                        help='ramp the coefficients between control updates '
+                        'instead of holding them')
+    args = parser.parse_args()
+    if args.channel_slopes:
+        # Each channel sweeps its own slopes, with per-sample
+        # coefficients, over its own generated noise, in one process.
+        for flag, value in [('--envelope', args.envelope),
+                            ('--control-rate', args.control_rate),
+                            ('--ramp', args.ramp),
+                            ('--input', args.input),
+                            ('--processes', args.processes != 1)]:
+            if value:
+                parser.error('{} does not apply to --channel-slopes'.format(
+                    flag))
+
+    table = load_coefficient_table('linear_parameters.csv', SAMPLE_RATE)
+    if args.firmware:
+        table = firmware_coefficient_table(table, read_firmware_tables())
+    slope_spec = [-20, 0]
+    if args.envelope:
+        slope_spec = parse_envelope(args.envelope)
+        args.duration = envelope_duration(slope_spec)
+    options = {}
+    if args.control_rate:
+        options = {'mode': 'ramp' if args.ramp else 'hold',
+                   'control_size': int(round(SAMPLE_RATE / args.control_rate))}
+
+    start_time = time.time()
+    if args.channel_slopes:
+        slope_specs = parse_channel_slopes(args.channel_slopes)
+        channels = len(slope_specs)
+        n = int(args.duration * SAMPLE_RATE)
+        noise_specs = [{'seed': args.seed + i,
+                        'distribution': args.distribution,
+                        'sample_format': args.sample_format}
+                       for i in range(channels)]
+        chunks = filter_channels(table, slope_specs, noise_specs, n)
+        if args.separate:
+            paths = ['filtered_noise_{}.wav'.format(i)
+                     for i in range(channels)]
+            n = write_wav_channel_chunks(paths, chunks)
+        else:
+            n = write_wav_chunks('filtered_noise.wav', chunks, channels)
+    else:
+        channels = 1
+        if args.input:
+            n = wav_length(args.input)
+            noise_spec = {'input': args.input}
+        else:
+            n = int(args.duration * SAMPLE_RATE)
+            noise_spec = {'seed': args.seed,
+                          'distribution': args.distribution,
+                          'sample_format': args.sample_format}
 
-write_wav(output_data)
+        if args.processes == 1:
+            chunks = filter_chunks(table, slope_spec,
+                                   noise_chunks(noise_spec, 0, n), n,
+                                   **options)
+        else:
+            chunks = filter_parallel(table, slope_spec, noise_spec, n,
+                                     processes=args.processes or None,
+                                     **options)
+        n = write_wav_chunks('filtered_noise.wav', chunks)
+    elapsed = time.time() - start_time
+    print('Filtered {} x {} samples in {:.2f}s ({:.0f} samples/sec)'.format(
+        channels, n, elapsed, channels * n / elapsed))
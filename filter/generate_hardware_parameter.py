@@ -16,37 +16,32 @@
 ################################################################################
 # Create the fixed-point int array representation of the piece-wise
 # linear approximations.
+#
+# With --header, also run every ADC code through the firmware's
+# interpolation (see firmware_emulator.py) and write the resulting pot
+# values out as tables for program memory, so the firmware can look
+# them up instead of interpolating. The 10 bit values are packed: a
+# byte array of the low 8 bits, and a byte array holding the top 2
+# bits of 4 codes each, 1280 bytes a filter instead of 2048.
 
-import array
-import csv
-import math
+import argparse
 
-################################################################################
-# Read in the functions.
-
-params = {}
-with open('linear_parameters.csv') as file:
-    csv_file = csv.reader(file, delimiter=',')
-    for row in csv_file:
-        if row[0] == '':
-            continue
-        name = row[0].split(' ')[0].lower()
-        values = [float(v) for v in row[1:]]
-        paired_values = zip(values[:8], values[8:])
-        params[name] = paired_values
+import numpy
+
+from coefficient_table import ADC_CODES, read_linear_parameters
+from firmware_emulator import FIRMWARE_TABLES, calculate_filter_parameters
+from firmware_emulator import read_firmware_tables
+
+# ATtiny84 program memory.
+FLASH_SIZE = 8192
 
 ################################################################################
 # Output the parameters.
 
 def fixed_point_parameters(params):
-    index_dict = {
-        'constant': 0,
-        'low': 1,
-        'medium': 2,
-        'high': 3,
-    }
-
-    for name, linear_fn in params.iteritems():
+    '''Returns {name: (xs, ys)} 15 bit fixed-point breakpoints.'''
+    tables = {}
+    for name, linear_fn in params.items():
         max_gain = max([g for _,g in linear_fn])
         max_value = (2**15)-1
         x_array = []
@@ -57,14 +52,110 @@ def fixed_point_parameters(params):
             # x: (-20, 0) => (2**16-1, 0)
             x_value = int(round((linear_fn[i][0]/-20.0)*max_value))
             assert x_value >= 0 and x_value <= max_value
-            x_array.append(str(x_value))
+            x_array.append(x_value)
             # y: (0, max_gain) => (0, 2**16-1)
             y_value = int(round((linear_fn[i][1]/max_gain)*max_value))
             assert y_value >= 0 and x_value <= max_value
-            y_array.append(str(y_value))
+            y_array.append(y_value)
+        tables[name] = (x_array, y_array)
+    return tables
+
+def print_fixed_point_parameters(tables):
+    for name, (x_array, y_array) in tables.items():
+        print(name)
+        print(', '.join(str(x) for x in x_array))
+        print(', '.join(str(y) for y in y_array))
+
+################################################################################
+# Precompute the pot tables.
+
+def pot_tables(tables):
+    '''Returns {name: pot values} for every ADC code, as the firmware
+    would interpolate them.'''
+    values, valid = calculate_filter_parameters(numpy.arange(ADC_CODES),
+                                                tables)
+    assert valid.all(), 'The binary search breaks for some ADC codes'
+    return values
+
+def pack_pot_table(values):
+    '''Returns the (low bytes, high bits) packing of 10 bit values; the
+    high bits of code i are bits 2*(i%4) and up of byte i/4.'''
+    values = numpy.asarray(values, dtype=numpy.int64)
+    assert values.min() >= 0 and values.max() <= 1023
+    low = (values & 255).astype(numpy.uint8)
+    shifts = 2 * numpy.arange(4)
+    high = ((values >> 8).reshape(-1, 4) << shifts).sum(axis=1)
+    return low, high.astype(numpy.uint8)
+
+def unpack_pot_table(low, high):
+    '''readPotTable in noisEE.c, for every code at once.'''
+    codes = numpy.arange(len(low))
+    high_bits = (high[codes >> 2].astype(numpy.int64) >> (2 * (codes & 3))) & 3
+    return low.astype(numpy.int64) | (high_bits << 8)
+
+def verify_pot_tables(tables, packed):
+    '''Check the packed tables give exactly the interpolated values.'''
+    interpolated = pot_tables(tables)
+    for name, _ in FIRMWARE_TABLES:
+        mismatches = numpy.nonzero(unpack_pot_table(*packed[name]) !=
+                                   interpolated[name])[0]
+        assert not len(mismatches), \
+            '{} table differs at ADC codes {}'.format(name, mismatches[:8])
+
+def table_size(packed):
+    return sum(low.nbytes + high.nbytes for low, high in packed.values())
+
+################################################################################
+# Write out the header.
+
+def c_array(c_name, values, per_line=16):
+    lines = [', '.join(str(int(v)) for v in values[i:i + per_line])
+             for i in range(0, len(values), per_line)]
+    return 'const uint8_t {}[{}] PROGMEM = {{\n        {}\n}};\n'.format(
+        c_name, len(values), ',\n        '.join(lines))
+
+def write_pot_table_header(packed, path):
+    sections = [
+        '// Generated by filter/generate_hardware_parameter.py --header;\n'
+        '// do not edit.\n'
+        '//\n'
+        '// calculateFilterParameters for every ADC code, packed 10 bit\n'
+        '// values: see readPotTable in noisEE.c. {} bytes.\n'
+        '\n'
+        '#include <avr/pgmspace.h>\n'.format(table_size(packed))]
+    for name, c_name in FIRMWARE_TABLES:
+        low, high = packed[name]
+        sections.append(c_array(c_name + 'Low', low))
+        sections.append(c_array(c_name + 'High', high))
+    with open(path, 'w') as file:
+        file.write('\n'.join(sections))
 
-        print name
-        print ', '.join(x_array)
-        print ', '.join(y_array)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Print the fixed-point breakpoints for noisEE.c, and '
+        'optionally write the precomputed pot tables.')
+    parser.add_argument('--parameters', default='linear_parameters.csv')
+    parser.add_argument('--firmware', default=None,
+                        help='take the breakpoints from the tables in this '
+                        'noisEE.c instead')
+    parser.add_argument('--header', default=None,
+                        help='write the pot tables to this C header, e.g. '
+                        '../avr/filter_tables.h')
+    args = parser.parse_args()
 
-fixed_point_parameters(params)
+    if args.firmware:
+        tables = read_firmware_tables(args.firmware)
+    else:
+        tables = fixed_point_parameters(
+            read_linear_parameters(args.parameters))
+        print_fixed_point_parameters(tables)
+    if args.header:
+        packed = dict((name, pack_pot_table(values))
+                      for name, values in pot_tables(tables).items())
+        verify_pot_tables(tables, packed)
+        write_pot_table_header(packed, args.header)
+        size = table_size(packed)
+        print('Wrote {}: {} bytes of pot tables, {:.1f}% of the {} byte '
+              'flash (unpacked 16 bit tables would take {})'.format(
+                  args.header, size, 100. * size / FLASH_SIZE, FLASH_SIZE,
+                  2 * ADC_CODES * len(packed)))
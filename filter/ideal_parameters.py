@@ -14,34 +14,31 @@
 ## limitations under the License.
 ################################################################################
 
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+import argparse
+import csv
+import hashlib
+import json
 import math
-import matplotlib.pyplot as plt
+import multiprocessing
 import numpy
-import random
+import os
+import sys
+import time
+import zlib
 
 from pprint import pprint
 
-# Constants
-SAMPLING_FREQUENCY = 44100.0
-SAMPLING_PERIOD = 1.0/SAMPLING_FREQUENCY
+from coefficient_table import CUTOFFS
+from spectrum import even_log_frequencies, response_basis, response_matrix
+from spectrum import magnitude_gain as gain_function
 
 ################################################################################
 # Utility functions to generate data.
 
-def even_log_frequencies(n=200, low_frequency=20, high_frequency=20000):
-    high_log = math.log(high_frequency, 10)
-    low_log = math.log(low_frequency, 10)
-    logs = [(high_log - low_log)*(float(i)/n)+low_log for i in range(n)]
-    return [10**l for l in logs]
-
 FREQUENCIES = even_log_frequencies()
 FREQUENCIES_LOG10 =  numpy.log10(FREQUENCIES)
 
-def gain_function(f_c, gain, frequencies, sampling_period=SAMPLING_PERIOD):
-    gains = [gain/(f/f_c + 1) for f in frequencies]
-    return gains
-
 ################################################################################
 # Starting parameters
 WHITE_PARAMS = [
@@ -88,26 +85,312 @@ def get_loss_from_parameters(parameters, target_m, target_b):
     decibel_gains = [10*math.log10(sum(gs)**2) for gs in zip(*gains)]
     return get_loss_from_data(decibel_gains, target_m, target_b)
 
-def explore(parameters, target_m, target_b):
-    min_loss =  get_loss_from_parameters(parameters, target_m, target_b)
+################################################################################
+# Batched versions: score a whole population of candidate gains at once.
+
+RESPONSES = response_basis(CUTOFFS)
+
+# The line fit is against the same log frequencies every time, so the
+# least squares pieces only depend on them.
+FREQUENCIES_LOG10_MEAN = FREQUENCIES_LOG10.mean()
+FREQUENCIES_LOG10_CENTERED = FREQUENCIES_LOG10 - FREQUENCIES_LOG10_MEAN
+FREQUENCIES_LOG10_SS = (FREQUENCIES_LOG10_CENTERED**2).sum()
+
+def get_batch_loss_from_data(decibels, target_m, target_b):
+    '''get_loss_from_data for (candidates x frequencies) decibels.'''
+    m = numpy.dot(decibels, FREQUENCIES_LOG10_CENTERED) / FREQUENCIES_LOG10_SS
+    b = decibels.mean(axis=1) - m * FREQUENCIES_LOG10_MEAN
+    residuals = decibels - (m[:, None] * FREQUENCIES_LOG10 + b[:, None])
+    error = (residuals**2).sum(axis=1)
+    return loss_function(m, b, target_m, target_b, error**0.5)
+
+def get_batch_loss_from_gains(gains, target_m, target_b, responses=RESPONSES):
+    '''Returns the loss of each row of (candidates x filters) gains.'''
+    # 10*log10(x**2) == 20*log10(x) for the positive summed gains.
+    decibels = 20*numpy.log10(numpy.dot(gains, responses))
+    return get_batch_loss_from_data(decibels, target_m, target_b)
+
+def get_batch_loss_and_gradient(log_gains, target_m, target_b,
+                                responses=RESPONSES, smoothing=0):
+    '''Returns the loss and its analytic gradient with respect to
+    log10(gains), for each row of (candidates x filters) log gains.
+
+    With S = sum_i g_i*R_i, d = 20*log10(S), and u_i = log10(g_i):
+    dd/du_i = 20*g_i*R_i/S. The slope, intercept and residual are all
+    linear in d, so the chain rule finishes the job.
+
+    The |.| in the slope and intercept terms have kinks right at the
+    targets, where gradients zig-zag; a non-zero smoothing swaps |z|
+    for sqrt(z**2 + smoothing**2) - smoothing, which is smooth and
+    still within smoothing of the real loss.
+    '''
+    log_gains = numpy.atleast_2d(log_gains)
+    gains = 10**log_gains
+    totals = numpy.dot(gains, responses)
+    decibels = 20*numpy.log10(totals)
+    # (candidates x frequencies x filters)
+    jacobian = 20 * gains[:, None, :] * responses.T[None, :, :] / \
+        totals[:, :, None]
+
+    m = numpy.dot(decibels, FREQUENCIES_LOG10_CENTERED) / FREQUENCIES_LOG10_SS
+    b = decibels.mean(axis=1) - m * FREQUENCIES_LOG10_MEAN
+    residuals = decibels - (m[:, None] * FREQUENCIES_LOG10 + b[:, None])
+    error = numpy.maximum((residuals**2).sum(axis=1)**0.5, 1e-12)
+    fake_b = b + m * math.log10(20)
+
+    dm = numpy.einsum('k,pki->pi', FREQUENCIES_LOG10_CENTERED,
+                      jacobian) / FREQUENCIES_LOG10_SS
+    db = jacobian.mean(axis=1) - dm * FREQUENCIES_LOG10_MEAN
+    dfake_b = db + dm * math.log10(20)
+    # The residuals are orthogonal to the fit, so d|r|/dd = r/|r|.
+    derror = numpy.einsum('pk,pki->pi', residuals, jacobian) / error[:, None]
+
+    m_error, b_error = m - target_m, fake_b - target_b
+    if smoothing:
+        m_abs = numpy.sqrt(m_error**2 + smoothing**2)
+        b_abs = numpy.sqrt(b_error**2 + smoothing**2)
+        m_sign, b_sign = m_error / m_abs, b_error / b_abs
+        m_abs, b_abs = m_abs - smoothing, b_abs - smoothing
+    else:
+        m_abs, b_abs = numpy.abs(m_error), numpy.abs(b_error)
+        m_sign, b_sign = numpy.sign(m_error), numpy.sign(b_error)
+
+    loss = 0.1 * error + 5 * m_abs + b_abs
+    gradient = (0.1 * derror +
+                5 * m_sign[:, None] * dm +
+                b_sign[:, None] * dfake_b)
+    return loss, gradient
+
+################################################################################
+# Optimizers.
+#
+# Every optimizer minimizes the loss over log10(gains), starting from
+# x0, and stops once an iteration improves the loss by less than
+# tolerance (the hill climb only with a patience), or it runs out of
+# iterations or wall time (time_budget seconds). objective maps
+# (candidates x filters) log gains to losses, and
+# loss_and_gradient(log_gains, smoothing) to the smoothed losses and
+# their (candidates x filters) gradients.
+
+OptimizeResult = namedtuple('OptimizeResult', [
+    'log_gains', 'loss', 'iterations', 'evaluations', 'converged', 'elapsed'])
+
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 5000
+
+POPULATION = 100
+# The original search's budget: 20000 evaluations.
+HILL_CLIMB_ITERATIONS = 20000 // POPULATION
+
+def hill_climb(objective, loss_and_gradient, x0, tolerance=TOLERANCE,
+               time_budget=None, max_iterations=HILL_CLIMB_ITERATIONS,
+               population=POPULATION, random_state=numpy.random,
+               patience=None):
+    '''The original random hill climb, trying a population of moves a step.
+
+    Like before, a move scales all the gains by the same random log
+    step, the step size shrinks as the loss does, and the search runs
+    for the whole budget. Given a patience, it stops early once that
+    many generations in a row improve the loss by less than tolerance.
+    The moves are drawn from random_state.
+    '''
+    start_time = time.time()
+    min_log_gains = numpy.asarray(x0, dtype=numpy.float64)
+    min_loss = objective(min_log_gains[None, :])[0]
     step_size = 1 - 1./(min_loss + 1)
-    min_parameters =  parameters
-    changes = 0
-    for i in range(20000):
-        g_step = step_size * 2 * (random.random() - 0.5)
-        local_parameters = [(f_c, 10**(math.log10(g) + g_step))
-                            for f_c,g in min_parameters]
-        loss = get_loss_from_parameters(local_parameters, target_m, target_b)
-        if loss < min_loss:
-            min_loss = loss
-            min_parameters = local_parameters
+    evaluations = 1
+    stalled = 0
+    converged = False
+    for iteration in range(1, max_iterations + 1):
+        g_steps = step_size * 2 * (
+            random_state.random_sample((population, 1)) - 0.5)
+        log_gains = min_log_gains + g_steps
+        losses = objective(log_gains)
+        evaluations += population
+        best = losses.argmin()
+        if min_loss - losses[best] > tolerance:
+            stalled = 0
+        else:
+            stalled += 1
+        if losses[best] < min_loss:
+            min_loss = losses[best]
+            min_log_gains = log_gains[best]
             step_size = 1 - 1./(min_loss/10. + 1)
-            changes += 1
-    print 'Changed {} times'.format(changes)
-    return min_loss, min_parameters
+        if patience is not None and stalled >= patience:
+            converged = True
+            break
+        if time_budget is not None and time.time() - start_time > time_budget:
+            break
+    return OptimizeResult(min_log_gains, min_loss, iteration, evaluations,
+                          converged, time.time() - start_time)
+
+SIMPLEX_STEP = 0.1
+
+def nelder_mead(objective, loss_and_gradient, x0, tolerance=TOLERANCE,
+                time_budget=None, max_iterations=MAX_ITERATIONS,
+                step=SIMPLEX_STEP):
+    '''Derivative-free Nelder-Mead simplex search.
+
+    Converged once the losses across the simplex differ by less than
+    tolerance.
+    '''
+    start_time = time.time()
+    x0 = numpy.asarray(x0, dtype=numpy.float64)
+    dimensions = len(x0)
+    simplex = numpy.vstack([x0, x0 + step * numpy.eye(dimensions)])
+    losses = objective(simplex)
+    evaluations = len(simplex)
+    converged = False
+    for iteration in range(1, max_iterations + 1):
+        order = numpy.argsort(losses)
+        simplex, losses = simplex[order], losses[order]
+        if losses[-1] - losses[0] < tolerance:
+            converged = True
+            break
+        if time_budget is not None and time.time() - start_time > time_budget:
+            break
+
+        centroid = simplex[:-1].mean(axis=0)
+        worst = simplex[-1]
+        # Try the reflection and expansion together.
+        reflected, expanded = (centroid + (centroid - worst),
+                               centroid + 2 * (centroid - worst))
+        reflected_loss, expanded_loss = objective(
+            numpy.vstack([reflected, expanded]))
+        evaluations += 2
+        if reflected_loss < losses[0] and expanded_loss < reflected_loss:
+            simplex[-1], losses[-1] = expanded, expanded_loss
+        elif reflected_loss < losses[-2]:
+            simplex[-1], losses[-1] = reflected, reflected_loss
+        else:
+            if reflected_loss < losses[-1]:
+                contracted = centroid + 0.5 * (reflected - centroid)
+            else:
+                contracted = centroid + 0.5 * (worst - centroid)
+            contracted_loss = objective(contracted[None, :])[0]
+            evaluations += 1
+            if contracted_loss < min(reflected_loss, losses[-1]):
+                simplex[-1], losses[-1] = contracted, contracted_loss
+            else:
+                # Shrink everything toward the best point.
+                simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
+                losses[1:] = objective(simplex[1:])
+                evaluations += dimensions
+    best = losses.argmin()
+    return OptimizeResult(simplex[best], losses[best], iteration, evaluations,
+                          converged, time.time() - start_time)
+
+# Smoothings to minimize over in turn, each starting where the last
+# one stopped, down to the real loss.
+SMOOTHINGS = [1.0, 0.1, 0.01, 0.001, 0]
+
+def bfgs(objective, loss_and_gradient, x0, tolerance=TOLERANCE,
+         time_budget=None, max_iterations=MAX_ITERATIONS,
+         smoothings=SMOOTHINGS):
+    '''Quasi-Newton BFGS on the analytic gradient.
+
+    Every iteration tries a backtracking ladder of steps along the
+    search direction at once, and takes the first one satisfying the
+    Armijo condition. Each smoothing is done once an iteration improves
+    its loss by less than tolerance; converged once the last one is.
+    '''
+    start_time = time.time()
+    x = numpy.asarray(x0, dtype=numpy.float64)
+    dimensions = len(x)
+    # Step fractions from 1 down to 2**-20.
+    scales = 0.5**numpy.arange(21)
+    evaluations = 0
+    iteration = 0
+    converged = False
+    out_of_time = False
+    for smoothing in smoothings:
+        loss, gradient = [v[0] for v in loss_and_gradient(x[None, :],
+                                                          smoothing)]
+        evaluations += 1
+        inverse_hessian = numpy.eye(dimensions)
+        converged = False
+        while iteration < max_iterations:
+            iteration += 1
+            direction = -numpy.dot(inverse_hessian, gradient)
+            slope = numpy.dot(gradient, direction)
+            if slope >= 0:
+                # Not a descent direction: start over from the gradient.
+                inverse_hessian = numpy.eye(dimensions)
+                direction, slope = -gradient, -numpy.dot(gradient, gradient)
+            # Never move more than a decade at once.
+            direction *= min(1, 1 / numpy.abs(direction).max())
+            slope = numpy.dot(gradient, direction)
+            candidates = x + scales[:, None] * direction
+            losses, gradients = loss_and_gradient(candidates, smoothing)
+            evaluations += len(candidates)
+            accepted = numpy.nonzero(
+                losses <= loss + 1e-4 * scales * slope)[0]
+            if not len(accepted):
+                converged = True
+                break
+            best = accepted[0]
+            s = candidates[best] - x
+            y = gradients[best] - gradient
+            improvement = loss - losses[best]
+            x, loss, gradient = candidates[best], losses[best], gradients[best]
+            if numpy.dot(s, y) > 1e-12:
+                rho = 1 / numpy.dot(s, y)
+                v = numpy.eye(dimensions) - rho * numpy.outer(s, y)
+                inverse_hessian = (numpy.dot(v, numpy.dot(inverse_hessian, v.T))
+                                   + rho * numpy.outer(s, s))
+            if improvement < tolerance:
+                converged = True
+                break
+            if time_budget is not None and \
+               time.time() - start_time > time_budget:
+                out_of_time = True
+                break
+        if out_of_time:
+            break
+    loss = objective(x[None, :])[0]
+    return OptimizeResult(x, loss, iteration, evaluations + 1, converged,
+                          time.time() - start_time)
+
+OPTIMIZERS = {
+    'hill_climb': hill_climb,
+    'simplex': nelder_mead,
+    'bfgs': bfgs,
+}
+
+def explore(parameters, target_m, target_b, optimizer='bfgs',
+            tolerance=TOLERANCE, time_budget=None, seed=None, patience=None):
+    '''Fit the gains of parameters to the target line.
+
+    Returns (loss, parameters, result), with result the optimizer's
+    OptimizeResult. Random optimizers draw from a RandomState(seed);
+    patience only applies to the hill climb.
+    '''
+    optimizer_args = {'tolerance': tolerance, 'time_budget': time_budget}
+    if optimizer == 'hill_climb':
+        optimizer_args['random_state'] = numpy.random.RandomState(seed)
+        optimizer_args['patience'] = patience
+    cutoffs = [f_c for f_c,_ in parameters]
+    responses = response_basis(cutoffs)
+    objective = lambda log_gains: get_batch_loss_from_gains(
+        10**log_gains, target_m, target_b, responses)
+    loss_and_gradient = lambda log_gains, smoothing: \
+        get_batch_loss_and_gradient(log_gains, target_m, target_b, responses,
+                                    smoothing)
+    result = OPTIMIZERS[optimizer](
+        objective, loss_and_gradient, numpy.log10([g for _,g in parameters]),
+        **optimizer_args)
+    min_parameters = [(f_c, float(10**g))
+                      for f_c,g in zip(cutoffs, result.log_gains)]
+    return float(result.loss), min_parameters, result
 
-def interval_explore(start_parameters, stop_parameters, m_interval, b_interval, n=11):
-    all_parameters = []
+def interval_targets(start_parameters, stop_parameters, m_interval, b_interval,
+                     n=11):
+    '''Returns the (m, b, starting parameters) of n targets along the line.
+
+    The starting gains are interpolated in log space between the start
+    and stop parameters.
+    '''
+    targets = []
     gain_parameters = list(zip([g for _,g in start_parameters],
                                [g for _,g in stop_parameters]))
     for i in range(n):
@@ -121,70 +404,331 @@ def interval_explore(start_parameters, stop_parameters, m_interval, b_interval,
                                    for lower, upper in gain_parameters]
         combined_parameters = [(s[0], g) for s,g in zip(start_parameters,
                                                         interpolated_parameters)]
+        targets.append((m, b, combined_parameters))
+    return targets
+
+def target_seed(seed, m, b):
+    '''Derive a target's seed from the master seed and the target itself,
+    so it does not depend on which worker solves it, or when.'''
+    return zlib.crc32('{} {!r} {!r}'.format(seed, m, b).encode()) & 0x7fffffff
 
-        loss, parameters = explore(combined_parameters, m, b)
-        all_parameters.append( ((m, b), parameters) )
-        print m, b, loss
-    return all_parameters
+def explore_target(task):
+    m, b, parameters, seed, explore_args = task
+    loss, parameters, result = explore(parameters, m, b,
+                                       seed=target_seed(seed, m, b),
+                                       **explore_args)
+    return (m, b), loss, parameters, result
 
 ################################################################################
-# Main
+# Checkpoints.
+#
+# Each fit gets appended to a checkpoint CSV as soon as it is done,
+# keyed by everything the fit depends on, so a rerun (or a run with
+# more targets, or new endpoint presets) only fits what is missing.
+# Rows are key,m,b,loss,gains...,end; a row cut short by a crash is
+# missing the end marker, and gets refit.
+
+CHECKPOINT = 'gains_checkpoint.csv'
+
+def checkpoint_key(m, b, parameters, seed, explore_args):
+    description = json.dumps([m, b, parameters, seed,
+                              sorted(explore_args.items())])
+    return hashlib.sha1(description.encode()).hexdigest()
+
+def read_checkpoint(path=CHECKPOINT):
+    '''Returns {key: (loss, gains)} of the fits saved at path.'''
+    fits = {}
+    if not os.path.exists(path):
+        return fits
+    with open(path) as file:
+        for row in csv.reader(file, delimiter=','):
+            if len(row) < 5 or row[-1] != 'end':
+                continue
+            try:
+                values = [float(v) for v in row[1:-1]]
+            except ValueError:
+                continue
+            fits[row[0]] = (values[2], values[3:])
+    return fits
+
+def open_checkpoint(path=CHECKPOINT):
+    file = open(path, 'a+')
+    # Start on a fresh line after an interrupted write.
+    file.seek(0, os.SEEK_END)
+    if file.tell() > 0:
+        file.seek(file.tell() - 1)
+        if file.read(1) != '\n':
+            file.write('\n')
+    return file
+
+def append_checkpoint(file, key, m, b, loss, parameters):
+    row = [key, repr(m), repr(b), repr(loss)] + \
+        [repr(g) for _,g in parameters] + ['end']
+    file.write(','.join(row) + '\n')
+    file.flush()
+    os.fsync(file.fileno())
 
-N = 31
+################################################################################
+# Sweeps.
+
+def target_keys(targets, seed=0, **explore_args):
+    '''The distinct checkpoint keys of the targets; the endpoint the
+    legs share only counts once, like it only gets fit once.'''
+    return set(checkpoint_key(m, b, parameters, seed, explore_args)
+               for m, b, parameters in targets)
 
-white_pink_parameters = interval_explore(PINK_PARAMS, WHITE_PARAMS, (-10, 0), (15, 0), n = N)
-pink_red_parameters = interval_explore(PINK_PARAMS, RED_PARAMS, (-10, -20), (15, 20), n = N)
+def explore_targets(targets, seed=0, processes=1, checkpoint=None,
+                    **explore_args):
+    '''Fit every (m, b, starting parameters) target, in a process pool
+    unless processes is 1 (0 uses every core).
 
-# for i,ps in enumerate(white_pink_parameters):
-#     lines, parameters = ps
-#     gains = [gain_function(f_c, g, FREQUENCIES) for f_c,g in parameters]
-#     decibel_gains = [10*math.log10(sum(gs)**2) for gs in zip(*gains)]
-#     plt.semilogx(FREQUENCIES, decibel_gains, color=(0, float(i)/N, float(N-i)/N))
-# for i,ps in enumerate(pink_red_parameters):
-#     lines, parameters = ps
-#     gains = [gain_function(f_c, g, FREQUENCIES) for f_c,g in parameters]
-#     decibel_gains = [10*math.log10(sum(gs)**2) for gs in zip(*gains)]
-#     plt.semilogx(FREQUENCIES, decibel_gains, color=(0, float(i)/N, float(N-i)/N))
+    Returns [((m, b), parameters)] in target order; the fits come out
+    the same whatever the number of processes. With a checkpoint path,
+    targets already solved there are reused, and new fits get saved
+    there as they finish.
+    '''
+    keys = [checkpoint_key(m, b, parameters, seed, explore_args)
+            for m, b, parameters in targets]
+    solved = {}
+    if checkpoint is not None:
+        saved = read_checkpoint(checkpoint)
+        for key, (m, b, parameters) in zip(keys, targets):
+            if key in saved:
+                loss, gains = saved[key]
+                solved[key] = [(f_c, g) for (f_c, _), g
+                               in zip(parameters, gains)]
+        print('Resuming: {} of {} targets already solved'.format(
+            sum(key in solved for key in keys), len(targets)))
 
-# plt.grid(True)
-# plt.ylim([-40, 20])
-# plt.show()
+    # The legs share their endpoints; fit those once.
+    tasks, task_keys = [], []
+    for key, (m, b, parameters) in zip(keys, targets):
+        if key not in solved and key not in task_keys:
+            tasks.append((m, b, parameters, seed, explore_args))
+            task_keys.append(key)
+    pool = None
+    if processes == 1:
+        results = map(explore_target, tasks)
+    else:
+        pool = multiprocessing.Pool(processes or None)
+        results = pool.imap(explore_target, tasks)
+    checkpoint_file = None
+    if checkpoint is not None:
+        checkpoint_file = open_checkpoint(checkpoint)
+    try:
+        for key, ((m, b), loss, parameters, result) in zip(task_keys, results):
+            solved[key] = parameters
+            if checkpoint_file is not None:
+                append_checkpoint(checkpoint_file, key, m, b, loss, parameters)
+            print('{} {} {} ({} iterations, {}converged, {:.3f}s)'.format(
+                m, b, loss, result.iterations,
+                '' if result.converged else 'not ', result.elapsed))
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+    return [((m, b), solved[key]) for key, (m, b, _) in zip(keys, targets)]
+
+def interval_explore(start_parameters, stop_parameters, m_interval, b_interval, n=11,
+                     seed=0, processes=1, checkpoint=None, **explore_args):
+    targets = interval_targets(start_parameters, stop_parameters,
+                               m_interval, b_interval, n)
+    return explore_targets(targets, seed, processes, checkpoint,
+                           **explore_args)
 
 ################################################################################
+# Adaptive sweeps.
+#
+# Fit a coarse subset of each leg's targets, then keep bisecting the
+# intervals where the gains interpolated from the ends mispredict a
+# fit of the midpoint. The knees get every target; the straight parts
+# only the coarse ones.
+
+COARSE_STEP = 8
+GAIN_TOLERANCE = 0.01
+
+def interpolation_error(low, middle, high, weight, scales):
+    '''Largest error, relative to each filter's scale, of predicting
+    the middle gains by interpolating weight of the way from low to high.'''
+    errors = [abs(l + (h - l) * weight - g) / scale
+              for (_, l), (_, g), (_, h), scale
+              in zip(low, middle, high, scales)]
+    return max(errors)
+
+def adaptive_explore(legs, coarse_step=COARSE_STEP,
+                     gain_tolerance=GAIN_TOLERANCE, seed=0, processes=1,
+                     checkpoint=None, **explore_args):
+    '''Fit a subset of each leg's (m, b, starting parameters) targets.
+
+    Starts from every coarse_step-th target (and the last), and bisects
+    an interval until interpolating its ends predicts the midpoint's
+    gains within gain_tolerance of each filter's largest coarse gain.
+    Every round of midpoints goes through explore_targets at once.
+
+    Returns ([[((m, b), parameters)] per leg], number of distinct
+    targets fit).
+    '''
+    solved = [{} for _ in legs]
+    fitted = set()
+    def fit(indexes):
+        tasks = [(leg, i) for leg, leg_indexes in enumerate(indexes)
+                 for i in leg_indexes]
+        targets = [legs[leg][i] for leg, i in tasks]
+        all_parameters = explore_targets(targets, seed, processes, checkpoint,
+                                         **explore_args)
+        for (leg, i), (_, parameters) in zip(tasks, all_parameters):
+            solved[leg][i] = parameters
+        fitted.update(target_keys(targets, seed, **explore_args))
 
-freq_map = defaultdict(list)
-for line_params,gen_params in white_pink_parameters:
-    m = line_params[0]
-    for freq, gain in gen_params:
-        freq_map[freq].append((m, gain))
-for line_params,gen_params in pink_red_parameters:
-    m = line_params[0]
-    for freq, gain in gen_params:
-        freq_map[freq].append((m, gain))
-for i, entry in enumerate(freq_map.iteritems()):
-    freq, values = entry
-    sorted_values =  sorted(values, key=lambda x: x[0])
-    m_values = [m for m,_ in sorted_values]
-    g_values = [g for _,g in sorted_values]
-    # g_values = [10*math.log10(g**2) for _,g in sorted_values]
-    plt.plot(m_values, g_values,
-             color=(0, float(len(freq_map)-i)/len(freq_map), float(i)/len(freq_map)),
-             label=str(freq))
-    plt.legend()
-
-plt.grid(True)
-plt.show()
-
-# Write it out to a CSV
-m_map = defaultdict(dict)
-for freq, values in freq_map.iteritems():
-    for m, g in values:
+    coarse = [sorted(set(range(0, len(targets), coarse_step)) |
+                     set([len(targets) - 1]))
+              for targets in legs]
+    fit(coarse)
+    scales = [max(abs(parameters[f][1])
+                  for leg_solved in solved
+                  for parameters in leg_solved.values()) or 1.0
+              for f in range(len(legs[0][0][2]))]
+
+    intervals = [list(zip(indexes[:-1], indexes[1:])) for indexes in coarse]
+    while any(intervals):
+        intervals = [[(low, high) for low, high in leg_intervals
+                      if high - low > 1]
+                     for leg_intervals in intervals]
+        fit([[(low + high) // 2 for low, high in leg_intervals]
+                     for leg_intervals in intervals])
+        refine = []
+        for leg, leg_intervals in enumerate(intervals):
+            refine.append([])
+            for low, high in leg_intervals:
+                middle = (low + high) // 2
+                weight = float(middle - low) / (high - low)
+                error = interpolation_error(solved[leg][low],
+                                            solved[leg][middle],
+                                            solved[leg][high], weight, scales)
+                if error > gain_tolerance:
+                    refine[-1] += [(low, middle), (middle, high)]
+        intervals = refine
+
+    results = [[((legs[leg][i][0], legs[leg][i][1]), solved[leg][i])
+                for i in sorted(solved[leg])]
+               for leg in range(len(legs))]
+    return results, len(fitted)
+
+def write_gains(all_parameters, path='gains.csv'):
+    '''Write [((m, b), parameters)] out as a slope,<cutoff>... CSV.'''
+    m_map = defaultdict(dict)
+    for (m, _), parameters in all_parameters:
         m_map[m]['slope'] = str(m)
-        m_map[m][str(freq)] = str(g)
-
-csv_file = open('gains.csv', 'w')
-columns = ['slope'] + sorted(str(k) for k in freq_map.keys())
-csv_file.write(','.join(columns) +  '\n')
-for m,inner_dict in m_map.iteritems():
-    csv_file.write(','.join([inner_dict[c] for c in columns]) + '\n')
-csv_file.close()
+        for freq, gain in parameters:
+            m_map[m][str(freq)] = str(gain)
+
+    columns = ['slope'] + sorted(str(f_c) for f_c,_ in all_parameters[0][1])
+    with open(path, 'w') as csv_file:
+        csv_file.write(','.join(columns) +  '\n')
+        for m in sorted(m_map):
+            csv_file.write(','.join([m_map[m][c] for c in columns]) + '\n')
+
+################################################################################
+# Main
+
+if __name__ == '__main__':
+    N = 31
+
+    parser = argparse.ArgumentParser(
+        description='Fit the filter gains for a range of slopes; writes gains.csv.')
+    parser.add_argument('--optimizer', choices=sorted(OPTIMIZERS),
+                        default='bfgs')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='stop once an iteration improves the loss by less')
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help='seconds of wall time allowed per slope target')
+    parser.add_argument('--patience', type=int, default=None,
+                        help='stop the hill climb after this many '
+                        'generations in a row without an improvement of '
+                        '--tolerance, instead of running its whole budget')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='master seed the per-target seeds derive from')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='fit the targets in parallel; 0 uses every core')
+    parser.add_argument('--checkpoint', default=CHECKPOINT,
+                        help='CSV saving each fit as it finishes; reruns '
+                        'skip the targets already in it')
+    parser.add_argument('--no-plot', action='store_true',
+                        help='skip plotting the gain curves')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='only fit the targets the gain curves need')
+    parser.add_argument('--coarse-step', type=int, default=COARSE_STEP,
+                        help='adaptive sweeps start from every nth target')
+    parser.add_argument('--gain-tolerance', type=float, default=GAIN_TOLERANCE,
+                        help='adaptive sweeps refine where interpolated gains '
+                        'are off by more than this fraction of the largest')
+    args = parser.parse_args()
+    explore_args = {'optimizer': args.optimizer, 'tolerance': args.tolerance,
+                    'time_budget': args.time_budget}
+    if args.patience is not None:
+        explore_args['patience'] = args.patience
+
+    # Both legs go through the pool together.
+    start_time = time.time()
+    white_pink_targets = interval_targets(PINK_PARAMS, WHITE_PARAMS, (-10, 0), (15, 0), n = N)
+    pink_red_targets = interval_targets(PINK_PARAMS, RED_PARAMS, (-10, -20), (15, 20), n = N)
+    uniform_fits = len(target_keys(white_pink_targets + pink_red_targets,
+                                   args.seed, **explore_args))
+    if args.adaptive:
+        (white_pink_parameters, pink_red_parameters), fits = adaptive_explore(
+            [white_pink_targets, pink_red_targets], args.coarse_step,
+            args.gain_tolerance, args.seed, args.processes, args.checkpoint,
+            **explore_args)
+        all_parameters = white_pink_parameters + pink_red_parameters
+        print('Adaptive sweep: fit {} targets, saving {} of the {} on the '
+              'uniform grid'.format(fits, uniform_fits - fits, uniform_fits))
+    else:
+        all_parameters = explore_targets(white_pink_targets + pink_red_targets,
+                                         args.seed, args.processes,
+                                         args.checkpoint, **explore_args)
+        white_pink_parameters = all_parameters[:N]
+        pink_red_parameters = all_parameters[N:]
+        fits = uniform_fits
+    print('Fit {} targets in {:.2f}s'.format(fits, time.time() - start_time))
+
+    # for i,ps in enumerate(white_pink_parameters):
+    #     lines, parameters = ps
+    #     gains = [gain_function(f_c, g, FREQUENCIES) for f_c,g in parameters]
+    #     decibel_gains = [10*math.log10(sum(gs)**2) for gs in zip(*gains)]
+    #     plt.semilogx(FREQUENCIES, decibel_gains, color=(0, float(i)/N, float(N-i)/N))
+    # for i,ps in enumerate(pink_red_parameters):
+    #     lines, parameters = ps
+    #     gains = [gain_function(f_c, g, FREQUENCIES) for f_c,g in parameters]
+    #     decibel_gains = [10*math.log10(sum(gs)**2) for gs in zip(*gains)]
+    #     plt.semilogx(FREQUENCIES, decibel_gains, color=(0, float(i)/N, float(N-i)/N))
+
+    # plt.grid(True)
+    # plt.ylim([-40, 20])
+    # plt.show()
+
+    # Write it out to a CSV before plotting, which blocks.
+    write_gains(all_parameters)
+    if args.no_plot:
+        sys.exit()
+
+    import matplotlib.pyplot as plt
+
+    freq_map = defaultdict(list)
+    for line_params,gen_params in all_parameters:
+        m = line_params[0]
+        for freq, gain in gen_params:
+            freq_map[freq].append((m, gain))
+    for i, entry in enumerate(freq_map.items()):
+        freq, values = entry
+        sorted_values =  sorted(values, key=lambda x: x[0])
+        m_values = [m for m,_ in sorted_values]
+        g_values = [g for _,g in sorted_values]
+        # g_values = [10*math.log10(g**2) for _,g in sorted_values]
+        plt.plot(m_values, g_values,
+                 color=(0, float(len(freq_map)-i)/len(freq_map), float(i)/len(freq_map)),
+                 label=str(freq))
+        plt.legend()
+
+    plt.grid(True)
+    plt.show()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Piecewise linear approximations of the gain curves in gains.csv.
+#
+# Fits each filter's slope => gain curve with a continuous piecewise
+# linear function with 6 breakpoints between -20 and 0, and writes the
+# 8 points of each out to linear_parameters.csv. Deterministic:
+#
+# 1. Dynamic programming over the sample points finds the segmentation
+#    with the least squared error, fitting each segment with its own
+#    line (cumulative sums make every segment's error O(1)).
+# 2. That seeds the breakpoints of the continuous fit, which then get
+#    moved one at a time to whichever candidate position (a sample
+#    point or a midpoint between two) gives the least squared error,
+#    until none of them move.
+
+import argparse
+import csv
+
+import numpy
+
+from coefficient_table import CUTOFFS, FILTER_NAMES, MIN_SLOPE
+
+BREAKPOINTS = 6
+MAX_SLOPE = 0.0
+MAX_REFINE_PASSES = 20
+
+ROW_NAMES = {
+    'constant': 'Constant (2.000.000hz)',
+    'low': 'Low (16.5hz)',
+    'medium': 'Medium (270hz)',
+    'high': 'High (5300hz)',
+}
+
+################################################################################
+# Read in the gains.
+
+def read_gains(path='gains.csv'):
+    '''Returns (slopes, {filter name: gains}), sorted by slope.'''
+    with open(path) as file:
+        rows = list(csv.reader(file, delimiter=','))
+    header, data = rows[0], numpy.array([[float(v) for v in row]
+                                          for row in rows[1:] if row])
+    data = data[numpy.argsort(data[:, 0])]
+    gains = {}
+    for column, cutoff in enumerate(header[1:], 1):
+        name = FILTER_NAMES[CUTOFFS.index(float(cutoff))]
+        gains[name] = data[:, column]
+    return data[:, 0], gains
+
+################################################################################
+# Segment.
+
+def segment_errors(x, y):
+    '''(n x n) squared error of the least squares line through points
+    i..j (inclusive), for every i <= j.'''
+    def sums(values):
+        return numpy.concatenate([[0], numpy.cumsum(values)])
+    count = numpy.arange(len(x) + 1)
+    s_x, s_y = sums(x), sums(y)
+    s_xx, s_xy, s_yy = sums(x * x), sums(x * y), sums(y * y)
+    # Sums over i..j are prefix[j + 1] - prefix[i].
+    start, stop = numpy.arange(len(x))[:, None], numpy.arange(1, len(x) + 1)
+    n = numpy.maximum(count[stop] - count[start], 1)
+    sx, sy = s_x[stop] - s_x[start], s_y[stop] - s_y[start]
+    var_x = (s_xx[stop] - s_xx[start]) - sx * sx / n
+    cov_xy = (s_xy[stop] - s_xy[start]) - sx * sy / n
+    var_y = (s_yy[stop] - s_yy[start]) - sy * sy / n
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        errors = var_y - numpy.where(var_x > 0, cov_xy**2 / var_x, 0)
+    errors = numpy.maximum(errors, 0)
+    errors[start > stop - 1] = numpy.inf
+    return errors
+
+def optimal_segments(x, y, segments):
+    '''Split the points into segments with the least total squared error.
+
+    Returns the index of the last point of every segment but the last.
+    '''
+    errors = segment_errors(x, y)
+    n = len(x)
+    # best[j]: least error of the points 0..j in s segments.
+    best = errors[0].copy()
+    splits = []
+    for _ in range(segments - 1):
+        # Candidates ending the previous segment at i, then i+1..j.
+        totals = best[:-1, None] + errors[1:, :]
+        split = numpy.argmin(totals, axis=0)
+        best = numpy.concatenate([[numpy.inf], totals[split, numpy.arange(n)][1:]])
+        splits.append(split)
+    ends = []
+    j = n - 1
+    for split in reversed(splits):
+        j = split[j]
+        ends.append(j)
+    return ends[::-1]
+
+################################################################################
+# Fit continuous piecewise linear functions.
+
+def hat_basis(x, knots):
+    '''(... x points x knots) linear interpolation weights of each knot.
+
+    knots may have leading dimensions; the ends have to cover x.
+    '''
+    knots = numpy.asarray(knots, dtype=numpy.float64)[..., None, :]
+    x = numpy.asarray(x, dtype=numpy.float64)[:, None]
+    previous = numpy.concatenate([knots[..., :1], knots[..., :-1]], axis=-1)
+    following = numpy.concatenate([knots[..., 1:], knots[..., -1:]], axis=-1)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        rising = numpy.where(knots > previous,
+                             (x - previous) / (knots - previous), 1)
+        falling = numpy.where(following > knots,
+                              (following - x) / (following - knots), 1)
+    return numpy.clip(numpy.minimum(rising, falling), 0, 1)
+
+def fit_knots(x, y, knots):
+    '''Least squares knot values of continuous piecewise linear functions.
+
+    knots is (... x knots); returns (knot values, squared errors), with
+    the same leading dimensions.
+    '''
+    basis = hat_basis(x, knots)
+    gram = numpy.einsum('...ik,...il->...kl', basis, basis)
+    moments = numpy.einsum('...ik,i->...k', basis, y)
+    # A tiny ridge keeps empty segments solvable.
+    gram = gram + 1e-12 * numpy.eye(gram.shape[-1])
+    values = numpy.linalg.solve(gram, moments[..., None])[..., 0]
+    residuals = numpy.einsum('...ik,...k->...i', basis, values) - y
+    return values, (residuals**2).sum(axis=-1)
+
+def piecewise_linear_fit(x, y, breakpoints=BREAKPOINTS, low=MIN_SLOPE,
+                         high=MAX_SLOPE):
+    '''Returns the (xs, ys) knots of the fit, from low to high.'''
+    x = numpy.asarray(x, dtype=numpy.float64)
+    y = numpy.asarray(y, dtype=numpy.float64)
+    # Seed the breakpoints between the best discontinuous segments.
+    ends = optimal_segments(x, y, breakpoints + 1)
+    inner = [(x[i] + x[i + 1]) / 2 for i in ends]
+    knots = numpy.array([low] + inner + [high])
+
+    candidates = numpy.unique(numpy.concatenate([x, (x[:-1] + x[1:]) / 2]))
+    candidates = candidates[(candidates > low) & (candidates < high)]
+    _, error = fit_knots(x, y, knots)
+    for _ in range(MAX_REFINE_PASSES):
+        moved = False
+        for k in range(1, len(knots) - 1):
+            options = candidates[(candidates > knots[k - 1]) &
+                                 (candidates < knots[k + 1])]
+            if not len(options):
+                continue
+            trials = numpy.repeat(knots[None, :], len(options), axis=0)
+            trials[:, k] = options
+            _, errors = fit_knots(x, y, trials)
+            best = errors.argmin()
+            if errors[best] < error * (1 - 1e-12):
+                knots, error, moved = trials[best], errors[best], True
+        if not moved:
+            break
+    values, _ = fit_knots(x, y, knots)
+    # Like the firmware, gains can't go negative.
+    return knots, numpy.maximum(values, 0)
+
+################################################################################
+# Write out the parameters.
+
+def write_linear_parameters(fits, path='linear_parameters.csv'):
+    '''Write {filter name: (xs, ys)} in the Constant, Low, Medium, High
+    row order generate_audio.py and generate_hardware_parameter.py read.'''
+    points = len(fits[FILTER_NAMES[0]][0])
+    header = [''] + ['x{}'.format(i + 1) for i in range(points)] + \
+        ['y{}'.format(i + 1) for i in range(points)]
+    with open(path, 'w') as file:
+        file.write(','.join(header) + '\n')
+        for name in FILTER_NAMES:
+            xs, ys = fits[name]
+            file.write(','.join([ROW_NAMES[name]] +
+                                [repr(float(v)) for v in xs] +
+                                [repr(float(v)) for v in ys]) + '\n')
+
+def plot_fit(name, x, y, xs, ys):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    figure = plt.figure(figsize=(3, 3))
+    plt.plot(x, y, color='red')
+    plt.plot(xs, ys, color='blue')
+    plt.title('{} filter gain'.format(name))
+    plt.xlabel('Slope (db/decade)')
+    plt.ylabel('Gain')
+    figure.savefig('linear_plot_{}.png'.format(name), bbox_inches='tight')
+    plt.close(figure)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Fit piecewise linear functions to the gains in gains.csv.')
+    parser.add_argument('--input', default='gains.csv')
+    parser.add_argument('--output', default='linear_parameters.csv')
+    parser.add_argument('--breakpoints', type=int, default=BREAKPOINTS,
+                        help='inner breakpoints; the firmware tables hold '
+                        'these plus the 2 endpoints (FILTER_POINTS in '
+                        'noisEE.c)')
+    parser.add_argument('--plot', action='store_true',
+                        help='save linear_plot_<filter>.png for each fit')
+    args = parser.parse_args()
+
+    slopes, gains = read_gains(args.input)
+    fits = {}
+    for name in FILTER_NAMES:
+        fits[name] = piecewise_linear_fit(slopes, gains[name],
+                                          args.breakpoints)
+        xs, ys = fits[name]
+        print('{:>8}: x {}'.format(name, ', '.join('{:.3f}'.format(v)
+                                                   for v in xs)))
+        print('{:>8}  y {}'.format('', ', '.join('{:.4g}'.format(v)
+                                                 for v in ys)))
+        if args.plot:
+            plot_fit(name, slopes, gains[name], xs, ys)
+    write_linear_parameters(fits, args.output)
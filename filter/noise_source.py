@@ -0,0 +1,84 @@
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Generate seeded white noise, a chunk at a time.
+#
+# The stream is made of fixed blocks of NOISE_BLOCK_SIZE samples, each
+# drawn from its own RandomState, seeded with the block's child of the
+# seed's SeedSequence. Any block can be drawn directly, so a segment of
+# a long render starts at its offset without generating what comes
+# before it, and the same seed gives bit-identical noise no matter how
+# it is chunked. RandomState's streams are fixed across numpy versions.
+
+import numpy
+
+CHUNK_SIZE = 65536
+NOISE_BLOCK_SIZE = 65536
+
+# Fraction of full scale; leaves headroom for the filter gains.
+AMPLITUDE = 0.25
+
+DISTRIBUTIONS = ['uniform', 'gaussian']
+SAMPLE_FORMATS = ['int16', 'float32', 'float64']
+
+def draw(random_state, distribution, amplitude, size):
+    if distribution == 'uniform':
+        return random_state.uniform(-amplitude, amplitude, size)
+    return random_state.normal(0, amplitude, size)
+
+def block_random_state(seed, block):
+    '''The RandomState drawing the block'th NOISE_BLOCK_SIZE samples.'''
+    return numpy.random.RandomState(numpy.random.MT19937(
+        numpy.random.SeedSequence(seed, spawn_key=(block,))))
+
+def white_noise_chunks(n=None, seed=0, distribution='uniform',
+                       sample_format='int16', amplitude=AMPLITUDE,
+                       chunk_size=CHUNK_SIZE, offset=0):
+    '''Yields chunks of white noise, n samples in total (forever if None).
+
+    Uniform noise spans +-amplitude of full scale, and gaussian noise
+    has a standard deviation of amplitude (clipped to full scale). int16
+    samples are scaled to 16 bit full scale, float samples to +-1.
+
+    The stream starts offset samples in, so a segment of a long render
+    can be generated on its own.
+    '''
+    assert distribution in DISTRIBUTIONS, 'Unknown distribution'
+    assert sample_format in SAMPLE_FORMATS, 'Unknown sample format'
+
+    block, skip = divmod(offset, NOISE_BLOCK_SIZE)
+    pending = numpy.zeros(0)
+    produced = 0
+    while n is None or produced < n:
+        size = chunk_size if n is None else min(chunk_size, n - produced)
+        pieces = [pending]
+        available = len(pending)
+        while available < size:
+            samples = draw(block_random_state(seed, block), distribution,
+                           amplitude, NOISE_BLOCK_SIZE)[skip:]
+            pieces.append(samples)
+            available += len(samples)
+            block, skip = block + 1, 0
+        samples = numpy.concatenate(pieces)
+        chunk, pending = samples[:size], samples[size:]
+        chunk = numpy.clip(chunk, -1.0, 1.0)
+        if sample_format == 'int16':
+            chunk = numpy.clip(numpy.round(chunk * 2**15), -2**15, 2**15 - 1)
+        produced += size
+        yield chunk.astype(sample_format)
+
+def white_noise(n, **kwargs):
+    return numpy.concatenate(list(white_noise_chunks(n, **kwargs)))
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Run the whole filter pipeline, from presets to firmware tables:
+#
+#   ideal_parameters.py => gains.csv
+#   linear_approximation.py => linear_parameters.csv
+#   generate_hardware_parameter.py => hardware_parameters.txt,
+#                                     filter_tables.h
+#   generate_audio.py => filtered_noise.wav
+#
+# Each stage runs in its own directory under the cache, named after a
+# hash of the stage's code (the script and the local modules it
+# imports), its arguments, and the contents of its input files. A stage
+# whose hash already has outputs in the cache is not rerun. Stages
+# whose inputs are all ready run concurrently, and the outputs get
+# copied into the output directory at the end.
+#
+# Extra stage arguments naming files get made absolute and the files
+# hashed too, as do the files flags in FLAG_INPUTS make a script read.
+# Arguments in UNTRACKED_ARGS change which files a stage writes, so
+# they are rejected.
+
+from collections import namedtuple
+import argparse
+import hashlib
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+
+FILTER_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIRECTORY = '.pipeline_cache'
+
+# script: in this directory. inputs: files from upstream stages.
+# outputs: files the stage writes. stdout: a file to save the stage's
+# output to, or None.
+Stage = namedtuple('Stage', ['name', 'script', 'inputs', 'outputs', 'stdout',
+                             'args'])
+
+# Files a script reads when given a flag, besides its arguments.
+FLAG_INPUTS = {
+    ('generate_audio.py', '--firmware'): [
+        os.path.join(FILTER_DIRECTORY, '..', 'avr', 'noisEE.c')],
+}
+
+# Arguments that rename or add to a script's outputs.
+UNTRACKED_ARGS = {
+    'linear_approximation.py': ['--output'],
+    'generate_hardware_parameter.py': ['--header'],
+    'generate_audio.py': ['--separate'],
+}
+
+STAGES = [
+    Stage('gains', 'ideal_parameters.py', [], ['gains.csv'], None,
+          ['--no-plot']),
+    Stage('linear', 'linear_approximation.py', ['gains.csv'],
+          ['linear_parameters.csv'], None, []),
+    Stage('hardware', 'generate_hardware_parameter.py',
+          ['linear_parameters.csv'], ['filter_tables.h'],
+          'hardware_parameters.txt', ['--header', 'filter_tables.h']),
+    Stage('audio', 'generate_audio.py', ['linear_parameters.csv'],
+          ['filtered_noise.wav'], None, []),
+]
+
+################################################################################
+# Hash the stages.
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(2**16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def local_modules(script, directory=FILTER_DIRECTORY):
+    '''Returns the script and every module in directory it imports,
+    directly or not.'''
+    found = []
+    pending = [script]
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        found.append(name)
+        with open(os.path.join(directory, name)) as file:
+            source = file.read()
+        for module in re.findall(r'^\s*(?:from|import)\s+(\w+)', source,
+                                 re.MULTILINE):
+            if os.path.exists(os.path.join(directory, module + '.py')):
+                pending.append(module + '.py')
+    return sorted(found)
+
+def flag_name(arg):
+    return arg.split('=', 1)[0]
+
+def external_files(stage):
+    '''Files outside the cache a stage reads: absolute path arguments,
+    and FLAG_INPUTS.'''
+    paths = []
+    for arg in stage.args:
+        value = arg.split('=', 1)[-1]
+        if os.path.isabs(value) and os.path.isfile(value):
+            paths.append(value)
+        paths.extend(FLAG_INPUTS.get((stage.script, flag_name(arg)), []))
+    return paths
+
+def stage_hash(stage, input_paths):
+    '''Hash everything a stage's outputs depend on.'''
+    digest = hashlib.sha1()
+    digest.update(repr((stage.name, stage.args, stage.outputs,
+                        stage.stdout)).encode())
+    for module in local_modules(stage.script):
+        digest.update(module.encode())
+        digest.update(file_hash(os.path.join(FILTER_DIRECTORY,
+                                             module)).encode())
+    for path in external_files(stage):
+        digest.update(path.encode())
+        digest.update(file_hash(path).encode())
+    for name in stage.inputs:
+        digest.update(name.encode())
+        digest.update(file_hash(input_paths[name]).encode())
+    return digest.hexdigest()
+
+################################################################################
+# Run the stages.
+
+def stage_outputs(stage):
+    return stage.outputs + ([stage.stdout] if stage.stdout else [])
+
+def run_stage(task):
+    '''Run a stage, unless the cache has it.
+
+    Returns (stage, {output name: path}, cached, seconds).
+    '''
+    stage, input_paths, cache_directory, force = task
+    directory = os.path.join(cache_directory, '{}-{}'.format(
+        stage.name, stage_hash(stage, input_paths)))
+    outputs = dict((name, os.path.join(directory, name))
+                   for name in stage_outputs(stage))
+    # The marker is written last, so a stage that died is rerun.
+    marker = os.path.join(directory, '.done')
+    if os.path.exists(marker) and not force:
+        return stage, outputs, True, 0.0
+
+    start_time = time.time()
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+    for name in stage.inputs:
+        shutil.copy(input_paths[name], os.path.join(directory, name))
+    command = [sys.executable, os.path.join(FILTER_DIRECTORY, stage.script)]
+    with open(os.path.join(directory, 'log.txt'), 'wb') as log:
+        subprocess.check_call(command + stage.args, cwd=directory,
+                              stdout=log, stderr=subprocess.STDOUT)
+    if stage.stdout:
+        shutil.copy(os.path.join(directory, 'log.txt'), outputs[stage.stdout])
+    for path in outputs.values():
+        assert os.path.exists(path), '{} did not write {}'.format(
+            stage.name, os.path.basename(path))
+    open(marker, 'w').close()
+    return stage, outputs, False, time.time() - start_time
+
+def run_pipeline(stages=STAGES, cache_directory=CACHE_DIRECTORY,
+                 output_directory='.', processes=None, force=()):
+    '''Run the stages in dependency order, with the ready ones in parallel.
+
+    force names stages to rerun even if cached. Returns {output name:
+    path} of everything the stages produced.
+    '''
+    cache_directory = os.path.abspath(cache_directory)
+    os.makedirs(output_directory, exist_ok=True)
+    produced = {}
+    remaining = list(stages)
+    pool = ThreadPool(processes or len(stages))
+    try:
+        while remaining:
+            ready = [stage for stage in remaining
+                     if all(name in produced for name in stage.inputs)]
+            assert ready, 'Unsatisfiable inputs: {}'.format(
+                ', '.join(stage.name for stage in remaining))
+            tasks = [(stage, produced, cache_directory, stage.name in force)
+                     for stage in ready]
+            for stage, outputs, cached, elapsed in pool.map(run_stage, tasks):
+                print('{:>10}: {}'.format(stage.name, 'cached' if cached else
+                                          'ran in {:.2f}s'.format(elapsed)))
+                produced.update(outputs)
+                remaining.remove(stage)
+    finally:
+        pool.terminate()
+
+    for name, path in produced.items():
+        shutil.copy(path, os.path.join(output_directory, name))
+    return produced
+
+def resolve_paths(args):
+    '''Make arguments naming existing files absolute, since stages run
+    in the cache, and so their contents get hashed.'''
+    resolved = []
+    for arg in args:
+        prefix, _, value = arg.rpartition('=')
+        if os.path.isfile(value):
+            value = os.path.abspath(value)
+        resolved.append(prefix + '=' + value if prefix else value)
+    return resolved
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Run the filter pipeline, rerunning only changed stages.')
+    parser.add_argument('--cache', default=CACHE_DIRECTORY)
+    parser.add_argument('--output', default='.',
+                        help='directory to copy the final outputs to')
+    parser.add_argument('--force', action='append', default=[],
+                        choices=[stage.name for stage in STAGES],
+                        help='rerun a stage even if it is cached')
+    for stage in STAGES:
+        parser.add_argument('--{}-args'.format(stage.name), default='',
+                            help='extra arguments for {}'.format(stage.script))
+    args = parser.parse_args()
+
+    stages = []
+    for stage in STAGES:
+        extra = shlex.split(getattr(args, '{}_args'.format(stage.name)))
+        for arg in extra:
+            if flag_name(arg) in UNTRACKED_ARGS.get(stage.script, []):
+                parser.error('{} changes the files {} writes, which the '
+                             'pipeline cannot track'.format(
+                                 flag_name(arg), stage.script))
+        stages.append(stage._replace(
+            args=stage.args + resolve_paths(extra)))
+    start_time = time.time()
+    run_pipeline(stages, args.cache, args.output, force=args.force)
+    print('Pipeline done in {:.2f}s'.format(time.time() - start_time))
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Stream filtered noise in real time, with a live slope "knob".
+#
+# Writes raw 44.1k mono signed 16 bit little endian PCM, for example:
+#
+#   python realtime_audio.py | aplay -f S16_LE -r 44100 -c 1
+#
+# and reads control lines from stdin (or a UNIX socket): either a
+# slope in dB/decade ("-10", "slope -10"), or a raw 10 bit ADC code
+# ("adc 512"), mapped the same way the AVR firmware maps its knob.
+
+import argparse
+import math
+import os
+import socket
+import sys
+import threading
+import time
+
+import numpy
+
+from coefficient_table import adc_codes_to_slopes, load_coefficient_table
+from coefficient_table import slopes_to_coefficients
+from firmware_emulator import firmware_coefficient_table, read_firmware_tables
+from generate_audio import SAMPLE_RATE, filter_block
+from noise_source import white_noise_chunks
+
+BLOCK_SIZE = 256
+LATENCY = 0.05
+
+MIN_SLOPE = -20.0
+MAX_SLOPE = 0.0
+
+################################################################################
+# Control channel.
+
+def parse_control_line(line):
+    '''Returns the slope a control line asks for, or None if unparseable.'''
+    words = line.strip().lower().split()
+    try:
+        if len(words) == 1:
+            slope = float(words[0])
+        elif len(words) == 2 and words[0] == 'slope':
+            slope = float(words[1])
+        elif len(words) == 2 and words[0] == 'adc':
+            adc_code = min(max(int(words[1]), 0), 1023)
+            slope = float(adc_codes_to_slopes(adc_code))
+        else:
+            return None
+    except ValueError:
+        return None
+    if not math.isfinite(slope):
+        return None
+    return min(max(slope, MIN_SLOPE), MAX_SLOPE)
+
+def read_control_lines(stream, control):
+    for line in iter(stream.readline, ''):
+        slope = parse_control_line(line)
+        if slope is None:
+            sys.stderr.write('Ignoring control line: {!r}\n'.format(line))
+        else:
+            control['slope'] = slope
+
+def serve_control_socket(path, control):
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    while True:
+        connection, _ = server.accept()
+        read_control_lines(connection.makefile('r'), control)
+        connection.close()
+
+def start_control(path, control):
+    if path == '-':
+        target, args = read_control_lines, (sys.stdin, control)
+    else:
+        target, args = serve_control_socket, (path, control)
+    thread = threading.Thread(target=target, args=args)
+    thread.daemon = True
+    thread.start()
+
+################################################################################
+# Render.
+
+def render_blocks(table, control, block_size=BLOCK_SIZE, seed=0):
+    '''Yields int16 blocks filtered at the current control slope.
+
+    Slope changes are picked up at block boundaries, and the
+    coefficients ramp from the old slope to the new one over the block,
+    so moving the knob does not click.
+    '''
+    state = numpy.zeros(4)
+    slope = control['slope']
+    frac = (numpy.arange(block_size) / float(block_size))[:, None]
+    for noise in white_noise_chunks(seed=seed, chunk_size=block_size):
+        target_slope = control['slope']
+        if target_slope == slope:
+            coefs = slopes_to_coefficients(table, [slope])
+        else:
+            # Split the (filters x 2 x (A, B)) boundary coefficients.
+            boundary_coefs = slopes_to_coefficients(table,
+                                                    [slope, target_slope])
+            coefs = (boundary_coefs[:, 0:1] * (1 - frac) +
+                     boundary_coefs[:, 1:2] * frac)
+            slope = target_slope
+        coefs = numpy.broadcast_to(coefs, (4, block_size, 2))
+        samples, state = filter_block(coefs, noise.astype(numpy.float64),
+                                      state)
+        yield samples.astype('<i2')
+
+################################################################################
+# Output.
+
+def open_output(path):
+    if path == '-':
+        return getattr(sys.stdout, 'buffer', sys.stdout)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    sys.stderr.write('Waiting for a listener on {}\n'.format(path))
+    connection, _ = server.accept()
+    return connection.makefile('wb')
+
+def stream(blocks, output, latency=LATENCY):
+    '''Write blocks in real time, staying at most latency seconds ahead.
+
+    If rendering falls behind the audio clock the listener runs dry:
+    report the underrun and restart the clock from now. The clock also
+    (re)starts with the first block written.
+    '''
+    underruns = 0
+    total = 0
+    start_time = None
+    written = 0.0
+    try:
+        for block in blocks:
+            now = time.time()
+            if start_time is None:
+                start_time = now
+            ahead = written - (now - start_time)
+            if ahead < 0:
+                underruns += 1
+                sys.stderr.write('Underrun #{}: {:.1f}ms behind\n'.format(
+                    underruns, -ahead * 1000))
+                start_time = now
+                written = 0.0
+            elif ahead > latency:
+                time.sleep(ahead - latency)
+            output.write(block.tobytes())
+            output.flush()
+            written += len(block) / SAMPLE_RATE
+            total += len(block)
+    finally:
+        sys.stderr.write('Streamed {:.1f}s with {} underruns\n'.format(
+            total / SAMPLE_RATE, underruns))
+
+################################################################################
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Stream filtered noise as raw 16 bit PCM in real time.')
+    parser.add_argument('--output', default='-',
+                        help='- for stdout, or a UNIX socket path to serve')
+    parser.add_argument('--control', default='-',
+                        help='- for stdin, or a UNIX socket path to serve')
+    parser.add_argument('--slope', type=float, default=-10.0,
+                        help='starting slope in dB/decade')
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE)
+    parser.add_argument('--latency', type=float, default=LATENCY,
+                        help='seconds of audio to render ahead')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--firmware', action='store_true',
+                        help='use the pot values the AVR firmware computes')
+    args = parser.parse_args()
+
+    assert args.block_size / SAMPLE_RATE <= args.latency, \
+        'A block has to fit in the latency budget'
+
+    table = load_coefficient_table('linear_parameters.csv', SAMPLE_RATE)
+    if args.firmware:
+        table = firmware_coefficient_table(table, read_firmware_tables())
+    control = {'slope': min(max(args.slope, MIN_SLOPE), MAX_SLOPE)}
+    start_control(args.control, control)
+    output = open_output(args.output)
+    try:
+        stream(render_blocks(table, control, args.block_size, args.seed),
+               output, args.latency)
+    except (KeyboardInterrupt, IOError):
+        pass
+    finally:
+        for path in (args.output, args.control):
+            if path != '-' and os.path.exists(path):
+                os.remove(path)
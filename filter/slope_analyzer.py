@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Measure the slope of rendered audio.
+#
+# Streams audio chunk by chunk through a Welch power spectral density
+# estimate (Hann windowed frames with 50% overlap), averages each group
+# of frames into a segment, and fits a line to the segment's dB power
+# against log10 frequency over the same 20Hz-20kHz grid
+# ideal_parameters.py fits: the slope comes out in dB/decade, directly
+# comparable to the targets. Only the last partial frame is buffered,
+# so memory stays bounded however long the audio is.
+
+from collections import namedtuple
+import argparse
+import time
+
+import numpy
+
+from coefficient_table import load_coefficient_table
+from generate_audio import SAMPLE_RATE, filter_chunks, noise_chunks
+from generate_audio import read_wav_chunks, sweep_slopes, wav_length
+from generate_audio import write_wav_chunks
+from slope_automation import envelope_duration, parse_envelope
+from spectrum import even_log_frequencies
+
+FRAME_SIZE = 16384
+HOP_SIZE = FRAME_SIZE // 2
+# Frames averaged into each slope measurement; ~1s of audio.
+SEGMENT_FRAMES = 4
+
+# start, stop: the samples the segment's frames cover.
+SlopeMeasurement = namedtuple('SlopeMeasurement',
+                              ['start', 'stop', 'slope', 'intercept'])
+
+################################################################################
+# Welch power spectral density.
+
+def frame_spectra(chunks, frame_size=FRAME_SIZE, hop_size=HOP_SIZE,
+                  sample_rate=SAMPLE_RATE):
+    '''Yields (frame starts, (frames x bins) one-sided PSDs) per chunk.
+
+    Every whole frame the chunks so far complete gets transformed in
+    one batch; the leftover samples wait for the next chunk.
+    '''
+    window = numpy.hanning(frame_size)
+    scale = 2 / (sample_rate * (window**2).sum())
+    buffer = numpy.zeros(0)
+    position = 0
+    for chunk in chunks:
+        buffer = numpy.concatenate([buffer, numpy.asarray(chunk,
+                                                          dtype=numpy.float64)])
+        if len(buffer) < frame_size:
+            continue
+        count = (len(buffer) - frame_size) // hop_size + 1
+        frames = numpy.lib.stride_tricks.as_strided(
+            buffer, (count, frame_size),
+            (hop_size * buffer.strides[0], buffer.strides[0]))
+        spectra = numpy.abs(numpy.fft.rfft(frames * window))**2 * scale
+        yield position + hop_size * numpy.arange(count), spectra
+        buffer = buffer[count * hop_size:]
+        position += count * hop_size
+
+def welch_segments(chunks, frame_size=FRAME_SIZE, hop_size=HOP_SIZE,
+                   segment_frames=SEGMENT_FRAMES):
+    '''Yields (start, stop, PSD) averaged over each segment_frames frames.'''
+    pending_starts = []
+    pending = []
+    for starts, spectra in frame_spectra(chunks, frame_size, hop_size):
+        pending_starts.extend(starts)
+        pending.extend(spectra)
+        while len(pending) >= segment_frames:
+            yield (pending_starts[0],
+                   pending_starts[segment_frames - 1] + frame_size,
+                   numpy.mean(pending[:segment_frames], axis=0))
+            del pending_starts[:segment_frames]
+            del pending[:segment_frames]
+
+################################################################################
+# Fit slopes.
+
+# (grid frequencies x bins) matrix, grid frequencies, and the number of
+# bins each band averages.
+Bands = namedtuple('Bands', ['matrix', 'frequencies', 'bins'])
+
+def band_matrix(frame_size=FRAME_SIZE, sample_rate=SAMPLE_RATE,
+                frequencies=None):
+    '''Averages the FFT bins into log bands around the grid frequencies.
+
+    Each grid frequency averages the bins between its geometric
+    midpoints with its neighbours; bands too narrow to hold a bin
+    interpolate between the two nearest bins instead.
+    '''
+    if frequencies is None:
+        frequencies = even_log_frequencies()
+    frequencies = numpy.asarray(frequencies)
+    bins = numpy.fft.rfftfreq(frame_size, 1 / sample_rate)
+    log_frequencies = numpy.log10(frequencies)
+    step = log_frequencies[1] - log_frequencies[0]
+    edges = 10**numpy.concatenate([
+        [log_frequencies[0] - step / 2],
+        (log_frequencies[:-1] + log_frequencies[1:]) / 2,
+        [log_frequencies[-1] + step / 2]])
+    band = numpy.searchsorted(edges, bins, 'right') - 1
+    matrix = numpy.zeros((len(frequencies), len(bins)))
+    inside = (band >= 0) & (band < len(frequencies))
+    matrix[band[inside], numpy.nonzero(inside)[0]] = 1
+    counts = matrix.sum(axis=1)
+    for i in numpy.nonzero(counts == 0)[0]:
+        j = numpy.searchsorted(bins, frequencies[i])
+        weight = (frequencies[i] - bins[j - 1]) / (bins[j] - bins[j - 1])
+        matrix[i, j - 1], matrix[i, j] = 1 - weight, weight
+    return Bands(matrix / matrix.sum(axis=1)[:, None], frequencies,
+                 numpy.maximum(counts, 1))
+
+def fit_slope(psd, bands, frames=1):
+    '''Returns (slope in dB/decade, intercept) of a PSD averaged over
+    frames frames.
+
+    The log of an average of few noisy bins comes out low: a band
+    averaging k bins over the frames is a chi-squared with 2k degrees
+    of freedom, whose mean natural log is off by about
+    -1/(2k) - 1/(12k**2).
+    The low bands hold only a bin or two, so left alone that bias would
+    tilt the slope up; take it back out.
+    '''
+    k = bands.bins * frames
+    bias = 10 / numpy.log(10) * (-1 / (2 * k) - 1 / (12 * k**2))
+    decibels = 10 * numpy.log10(numpy.dot(bands.matrix, psd) + 1e-30) - bias
+    slope, intercept = numpy.polyfit(numpy.log10(bands.frequencies),
+                                     decibels, 1)
+    return slope, intercept
+
+def measure_slopes(chunks, frame_size=FRAME_SIZE, hop_size=HOP_SIZE,
+                   segment_frames=SEGMENT_FRAMES):
+    '''Yields a SlopeMeasurement for every segment of the chunks.'''
+    bands = band_matrix(frame_size)
+    for start, stop, psd in welch_segments(chunks, frame_size, hop_size,
+                                           segment_frames):
+        slope, intercept = fit_slope(psd, bands, segment_frames)
+        yield SlopeMeasurement(start, stop, slope, intercept)
+
+def target_slope(slope_spec, measurement, n):
+    '''The mean target slope over a measurement's samples.'''
+    indexes = numpy.arange(measurement.start, measurement.stop, 64)
+    return float(sweep_slopes(slope_spec, indexes, n).mean())
+
+################################################################################
+# Run alongside a render.
+
+def tee_chunks(chunks, measurements, **kwargs):
+    '''Yields the chunks unchanged, while appending the SlopeMeasurements
+    of the audio so far to measurements.'''
+    def passthrough(queue):
+        for chunk in chunks:
+            queue.append(chunk)
+            yield chunk
+    queue = []
+    measuring = measure_slopes(passthrough(queue), **kwargs)
+    for measurement in measuring:
+        measurements.append(measurement)
+        for chunk in queue:
+            yield chunk
+        del queue[:]
+    for chunk in queue:
+        yield chunk
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure the slope of a render over time, and compare '
+        'it with the target slope.')
+    parser.add_argument('input', nargs='?', default=None,
+                        help='WAV to analyze; without one, render the sweep '
+                        'and analyze it as it is produced')
+    parser.add_argument('--output', default=None,
+                        help='also write the render to this WAV')
+    parser.add_argument('--duration', type=float, default=20.0,
+                        help='seconds to render')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--envelope', default=None,
+                        help='the slope envelope the audio follows, instead '
+                        'of the white to red sweep')
+    parser.add_argument('--frame-size', type=int, default=FRAME_SIZE)
+    parser.add_argument('--segment-frames', type=int, default=SEGMENT_FRAMES)
+    args = parser.parse_args()
+
+    slope_spec = [-20, 0]
+    if args.envelope:
+        slope_spec = parse_envelope(args.envelope)
+        args.duration = envelope_duration(slope_spec)
+    options = {'frame_size': args.frame_size,
+               'hop_size': args.frame_size // 2,
+               'segment_frames': args.segment_frames}
+
+    start_time = time.time()
+    if args.input:
+        n = wav_length(args.input)
+        measurements = list(measure_slopes(read_wav_chunks(args.input),
+                                           **options))
+    else:
+        n = int(args.duration * SAMPLE_RATE)
+        table = load_coefficient_table('linear_parameters.csv')
+        chunks = filter_chunks(table, slope_spec,
+                               noise_chunks({'seed': args.seed}, 0, n), n)
+        measurements = []
+        chunks = tee_chunks(chunks, measurements, **options)
+        if args.output:
+            write_wav_chunks(args.output, chunks)
+        else:
+            for _ in chunks:
+                pass
+    elapsed = time.time() - start_time
+
+    print('    time  target  measured   error (dB/decade)')
+    errors = []
+    for measurement in measurements:
+        target = target_slope(slope_spec, measurement, n)
+        errors.append(measurement.slope - target)
+        print('{:7.2f}s {:7.2f} {:9.2f} {:+7.2f}'.format(
+            (measurement.start + measurement.stop) / 2 / SAMPLE_RATE,
+            target, measurement.slope, errors[-1]))
+    errors = numpy.array(errors)
+    print('RMS error {:.2f}, max |error| {:.2f} dB/decade over {} '
+          'segments'.format(numpy.sqrt((errors**2).mean()),
+                            numpy.abs(errors).max(), len(errors)))
+    print('{} samples in {:.2f}s ({:.1f}x real time)'.format(
+        n, elapsed, n / SAMPLE_RATE / elapsed))
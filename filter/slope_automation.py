@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Slope automation curves.
+#
+# An envelope is a list of (time in seconds, slope, shape) breakpoints,
+# where the shape says how to get from a breakpoint to the next one:
+# 'linear', 'exponential' or 'hold'. Envelopes come from a CSV file
+# (time,slope[,shape] rows) or a "time:slope[:shape],..." string.
+#
+# Running this benchmarks the control rate: how much CPU time updating
+# the coefficients less often saves, and what it costs in accuracy.
+
+from collections import namedtuple
+import argparse
+import csv
+import math
+import os
+import time
+
+import numpy
+
+SHAPES = ['linear', 'exponential', 'hold']
+
+# How sharply exponential segments bend; the segment covers
+# (e**(k*f) - 1)/(e**k - 1) of the way at fraction f.
+EXPONENTIAL_CURVE = 4.0
+
+Envelope = namedtuple('Envelope', ['times', 'slopes', 'shapes'])
+
+################################################################################
+# Read in envelopes.
+
+def make_envelope(breakpoints):
+    '''Build an envelope out of (time, slope[, shape]) breakpoints.'''
+    breakpoints = sorted(breakpoints, key=lambda b: float(b[0]))
+    times = numpy.array([float(b[0]) for b in breakpoints])
+    slopes = numpy.array([float(b[1]) for b in breakpoints])
+    shapes = [b[2] if len(b) > 2 and b[2] else 'linear' for b in breakpoints]
+    for shape in shapes:
+        assert shape in SHAPES, 'Unknown envelope shape: {}'.format(shape)
+    return Envelope(times, slopes, numpy.array([SHAPES.index(shape)
+                                                for shape in shapes]))
+
+def read_envelope(path):
+    with open(path) as file:
+        rows = [row for row in csv.reader(file, delimiter=',')
+                if row and not row[0].startswith('#')]
+    # Skip a header row.
+    if rows and rows[0][0].strip().lower() == 'time':
+        rows = rows[1:]
+    return make_envelope([[v.strip() for v in row] for row in rows])
+
+def parse_envelope(spec):
+    '''Read an envelope from a file path, or a "time:slope[:shape],..." string.'''
+    if os.path.exists(spec):
+        return read_envelope(spec)
+    return make_envelope([point.split(':') for point in spec.split(',')])
+
+################################################################################
+# Evaluate envelopes.
+
+def evaluate_envelope(envelope, times):
+    '''Returns the envelope's slope at each time, holding the end values.'''
+    times = numpy.asarray(times, dtype=numpy.float64)
+    if len(envelope.times) == 1:
+        return numpy.full(times.shape, envelope.slopes[0])
+    segment = numpy.clip(numpy.searchsorted(envelope.times, times, 'right') - 1,
+                         0, len(envelope.times) - 2)
+    start_time = envelope.times[segment]
+    duration = envelope.times[segment + 1] - start_time
+    frac = numpy.clip((times - start_time) / numpy.maximum(duration, 1e-12),
+                      0, 1)
+
+    shape = envelope.shapes[segment]
+    curve = (numpy.exp(EXPONENTIAL_CURVE * frac) - 1) / \
+        (math.exp(EXPONENTIAL_CURVE) - 1)
+    frac = numpy.where(shape == SHAPES.index('exponential'), curve, frac)
+    frac = numpy.where(shape == SHAPES.index('hold'), 0, frac)
+    # Past the last breakpoint, stay on its slope.
+    frac = numpy.where(times >= envelope.times[-1], 1, frac)
+
+    start_slope = envelope.slopes[segment]
+    end_slope = envelope.slopes[segment + 1]
+    return start_slope + (end_slope - start_slope) * frac
+
+def envelope_duration(envelope):
+    return float(envelope.times[-1])
+
+################################################################################
+# Benchmark the control rate.
+
+CONTROL_RATES = [None, 4410, 1378, 441, 100, 20]
+
+def log_spectral_distance(reference, data, frame_size=4096):
+    '''Mean dB distance between the frames' magnitude spectra.'''
+    frames = len(reference) // frame_size
+    window = numpy.hanning(frame_size)
+    def spectra(x):
+        x = numpy.asarray(x[:frames * frame_size], dtype=numpy.float64)
+        x = x.reshape(frames, frame_size) * window
+        return 10 * numpy.log10(numpy.abs(numpy.fft.rfft(x))**2 + 1e-9)
+    # Only look at the audible 20Hz-20kHz band.
+    frequencies = numpy.fft.rfftfreq(frame_size, 1 / 44100.0)
+    band = (frequencies >= 20) & (frequencies <= 20000)
+    difference = spectra(reference) - spectra(data)
+    return numpy.abs(difference[:, band]).mean()
+
+def benchmark(table, envelope, noise_spec, control_rates=CONTROL_RATES,
+              mode='hold'):
+    '''Render the envelope at each control rate.
+
+    Returns (control rate, seconds, samples/sec, error to signal dB,
+    log spectral distance dB) rows; a control rate of None is the
+    per-sample reference everything is compared against.
+    '''
+    from generate_audio import SAMPLE_RATE, filter_chunks, noise_chunks
+    n = int(envelope_duration(envelope) * SAMPLE_RATE)
+    reference = None
+    results = []
+    for control_rate in control_rates:
+        if control_rate is None:
+            kwargs = {'mode': 'sample'}
+        else:
+            kwargs = {'mode': mode,
+                      'control_size': int(round(SAMPLE_RATE / control_rate))}
+        start_time = time.time()
+        output_data = numpy.concatenate(list(filter_chunks(
+            table, envelope, noise_chunks(noise_spec, 0, n), n, **kwargs)))
+        elapsed = time.time() - start_time
+        if reference is None:
+            reference = output_data
+        error = (output_data.astype(numpy.float64) - reference)
+        signal_power = (reference.astype(numpy.float64)**2).mean()
+        error_db = 10 * math.log10((error**2).mean() / signal_power + 1e-20)
+        results.append((control_rate, elapsed, n / elapsed, error_db,
+                        log_spectral_distance(reference, output_data)))
+    return results
+
+if __name__ == '__main__':
+    from coefficient_table import load_coefficient_table
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark the control rate of a slope envelope.')
+    parser.add_argument('--envelope', default='0:0,10:-20:exponential,20:-5',
+                        help='CSV file, or "time:slope[:shape],..."')
+    parser.add_argument('--mode', choices=['hold', 'ramp'], default='hold')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    table = load_coefficient_table('linear_parameters.csv')
+    results = benchmark(table, parse_envelope(args.envelope),
+                        {'seed': args.seed}, mode=args.mode)
+    print('control rate    time  samples/sec  error/signal  spectral distance')
+    for control_rate, elapsed, rate, error_db, distance in results:
+        if control_rate is None:
+            print('{:>12} {:6.2f}s {:12.0f} {:>12} {:>17}'.format(
+                'per sample', elapsed, rate, 'reference', 'reference'))
+            continue
+        print('{:>12} {:6.2f}s {:12.0f} {:10.1f}dB {:15.3f}dB'.format(
+            '{}Hz'.format(control_rate), elapsed, rate, error_db, distance))
@@ -0,0 +1,113 @@
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Frequency grids and filter responses, shared by the scripts.
+#
+# There are two gain functions, and they disagree on purpose:
+#
+# - magnitude_gain, gain/(f/f_c + 1), is what ideal_parameters.py fits
+#   the slopes with, in 20*log10 dB. It is not the exact magnitude of a
+#   one pole filter, 1/sqrt((f/f_c)**2 + 1), but has the same -20dB
+#   per decade asymptote, and all the fitted gains are in its terms.
+# - power_gain, gain/((f/f_c)**2 + 1), is the exact power response of
+#   a one pole low pass, used in 10*log10 dB for the blog figures.
+#
+# Everything takes and returns numpy arrays, and frequency grids and
+# response matrices are cached, so summing a set of filters is a
+# single matrix-vector product even on grids with 10**5+ points.
+
+import numpy
+
+SAMPLING_FREQUENCY = 44100.0
+SAMPLING_PERIOD = 1.0/SAMPLING_FREQUENCY
+
+################################################################################
+# Frequency grids.
+
+_GRID_CACHE = {}
+
+def even_log_frequencies(n=200, low_frequency=20, high_frequency=20000):
+    '''n frequencies evenly spaced on a log scale, from low_frequency up
+    to (not including) high_frequency.
+
+    Cached by (n, low_frequency, high_frequency); the array is read-only
+    since it is shared.
+    '''
+    key = (n, low_frequency, high_frequency)
+    if key not in _GRID_CACHE:
+        logs = numpy.log10(low_frequency) + \
+            (numpy.log10(high_frequency) - numpy.log10(low_frequency)) * \
+            numpy.arange(n) / float(n)
+        frequencies = 10**logs
+        frequencies.flags.writeable = False
+        _GRID_CACHE[key] = frequencies
+    return _GRID_CACHE[key]
+
+################################################################################
+# Responses.
+
+def transfer_function(f_c, gain, frequencies, sampling_period=SAMPLING_PERIOD):
+    p = 2 * numpy.pi * sampling_period * f_c
+    previous_output_coefficient = 1/(p + 1)
+    input_coefficient = gain - 1/p
+    frequency_response = numpy.exp(-2j * numpy.pi *
+                                   numpy.asarray(frequencies) * sampling_period)
+    return numpy.abs(input_coefficient * frequency_response) / \
+        numpy.abs(1 + previous_output_coefficient * frequency_response)
+
+def magnitude_gain(f_c, gain, frequencies):
+    return gain/(numpy.asarray(frequencies)/f_c + 1)
+
+def power_gain(f_c, gain, frequencies):
+    '''Returns the power gain for a frequency'''
+    # A = 1/(1+f/f_c), power is |A|^2 = 1/sqrt(1+(f/f_c)^2)^2
+    return gain/((numpy.asarray(frequencies)/f_c)**2 + 1)
+
+GAIN_FUNCTIONS = {
+    'magnitude': magnitude_gain,
+    'power': power_gain,
+}
+
+def response_matrix(cutoffs, frequencies, kind='magnitude'):
+    '''(filters x frequencies) response of each unit gain filter.
+
+    cutoffs may have leading dimensions, e.g. (trials x filters).
+    '''
+    cutoffs = numpy.asarray(cutoffs, dtype=numpy.float64)
+    return GAIN_FUNCTIONS[kind](cutoffs[..., None], 1.0,
+                                numpy.asarray(frequencies))
+
+_BASIS_CACHE = {}
+
+def response_basis(cutoffs, n=200, low_frequency=20, high_frequency=20000,
+                   kind='magnitude'):
+    '''response_matrix over an even_log_frequencies grid, cached.'''
+    key = (tuple(float(f_c) for f_c in cutoffs), n, low_frequency,
+           high_frequency, kind)
+    if key not in _BASIS_CACHE:
+        frequencies = even_log_frequencies(n, low_frequency, high_frequency)
+        basis = response_matrix(cutoffs, frequencies, kind)
+        basis.flags.writeable = False
+        _BASIS_CACHE[key] = basis
+    return _BASIS_CACHE[key]
+
+def total_response(gains, basis):
+    '''Summed response of (... x filters) gains over a response basis.'''
+    return numpy.dot(gains, basis)
+
+def sum_gains_power(gains):
+    '''10*log10 dB of the summed (filters x frequencies) power gains.'''
+    return 10*numpy.log10(numpy.sum(gains, axis=0))
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Make sure the fixed-point tables in avr/noisEE.c work for every input.
+#
+# Every ADC code goes through all four tables at once, as (filters x
+# codes) arrays, parsed straight out of noisEE.c. Checks that:
+#
+# - the binary search terminates, on a segment containing the input,
+# - no intermediate in interpolatePiecewiseLinearFunction overflows its
+#   C type (recomputed exactly, and compared with the emulation),
+# - calculateFilterParameters clamps every out of range input and output,
+# - filter_tables.h holds exactly the interpolated values,
+# - fixed_point_optimizer.py scores disordered candidates as invalid,
+#   without disturbing the other candidates scored with them,
+# - and, given a linear_parameters.csv, that the generator would write
+#   the same tables (or fixed_point_optimizer.py improved on them), and
+#   how far the generated tables are from the float curves.
+#
+# Run it with pytest, or as a script for a report.
+
+import argparse
+import os
+import re
+
+import numpy
+
+from coefficient_table import ADC_CODES, FILTER_NAMES, load_coefficient_table
+from coefficient_table import read_linear_parameters
+from firmware_emulator import FIRMWARE_SOURCE, FIRMWARE_TABLES, as_uint16
+from firmware_emulator import binary_search_segments, c_divide
+from firmware_emulator import calculate_filter_parameters, compare_to_float_model
+from firmware_emulator import gather, interpolate_piecewise_linear
+from firmware_emulator import read_firmware_tables
+from fixed_point_optimizer import SlopeScorer, pot_values, stack_tables
+from generate_hardware_parameter import fixed_point_parameters, pot_tables
+from generate_hardware_parameter import unpack_pot_table
+
+POT_TABLE_HEADER = os.path.join(os.path.dirname(FIRMWARE_SOURCE),
+                                'filter_tables.h')
+PARAMETERS = 'linear_parameters.csv'
+
+# The C type of each intermediate, as (low, high) bounds.
+C_TYPES = {
+    'x': (0, 2**16 - 1),         # uint16_t x = (unpaddedX << 5)
+    't': (0, 2**16 - 1),         # uint16_t t = x - xs[maxIndex]
+    'dx': (1, 2**15 - 1),        # int16_t dx, and a divisor
+    'dy': (-2**15, 2**15 - 1),   # int16_t dy
+    'product': (-2**31, 2**31 - 1),  # (int32_t) dy * t
+    'delta': (-2**15, 2**15 - 1),    # int16_t delta
+    'sum': (0, 2**16 - 1),       # ys[maxIndex] + delta, unsigned
+}
+
+# Pot steps the fixed-point tables may be off from the float curves:
+# rounding both axes to 15 bits, truncating the interpolation, and
+# the >> 5 flooring can each lose about a step.
+MAX_STEP_ERROR = 2
+
+################################################################################
+# Evaluate.
+
+def all_codes(tables, codes=None):
+    '''The (filters x codes) array of ADC codes.'''
+    if codes is None:
+        codes = numpy.arange(ADC_CODES)
+    return numpy.broadcast_to(codes, (len(tables), len(codes)))
+
+def exact_intermediates(codes, xs, ys):
+    '''Returns (segment, valid, {name: intermediate}) for every code and
+    table, in int64 arithmetic: nothing wraps, so anything outside its
+    C_TYPES bounds overflows in the firmware.'''
+    x = numpy.asarray(codes, dtype=numpy.int64) << 5
+    segment, valid = binary_search_segments(as_uint16(x), xs)
+    lower, upper = gather(xs, segment), gather(xs, segment + 1)
+    values = {'x': x, 't': x - lower, 'dx': upper - lower,
+              'dy': gather(ys, segment + 1) - gather(ys, segment)}
+    values['product'] = values['dy'] * values['t']
+    values['delta'] = c_divide(values['product'],
+                               numpy.where(values['dx'] != 0, values['dx'], 1))
+    values['sum'] = gather(ys, segment) + values['delta']
+    return segment, valid, values
+
+def overflows(values):
+    '''Returns {name: (filters x codes) mask of out of range values}.'''
+    return dict((name, (values[name] < low) | (values[name] > high))
+                for name, (low, high) in C_TYPES.items())
+
+def read_pot_table_header(path=None):
+    '''Returns {name: pot values} unpacked from filter_tables.h.'''
+    with open(path or POT_TABLE_HEADER) as file:
+        source = file.read()
+    arrays = dict((c_name, numpy.array([int(v) for v in values.split(',')],
+                                       dtype=numpy.uint8))
+                  for c_name, values in re.findall(
+                      r'uint8_t\s+(\w+)\s*\[\d+\]\s*PROGMEM\s*=\s*\{([^}]*)\}',
+                      source))
+    return dict((name, unpack_pot_table(arrays[c_name + 'Low'],
+                                        arrays[c_name + 'High']))
+                for name, c_name in FIRMWARE_TABLES)
+
+################################################################################
+# Tests.
+
+def firmware_tables():
+    return read_firmware_tables(FIRMWARE_SOURCE)
+
+def require_parameters():
+    if not os.path.exists(PARAMETERS):
+        import pytest
+        pytest.skip('no {} here'.format(PARAMETERS))
+    return PARAMETERS
+
+def test_search_terminates_in_segment():
+    tables = firmware_tables()
+    xs, ys = stack_tables(tables)
+    codes = all_codes(tables)
+    segment, valid, values = exact_intermediates(codes, xs, ys)
+    assert valid.all(), 'search runs off the table for {} codes'.format(
+        (~valid).sum())
+    x = values['x']
+    inside = (gather(xs, segment) <= x) & (x <= gather(xs, segment + 1))
+    assert inside.all(), 'ADC codes {} land outside their segment'.format(
+        numpy.nonzero(~inside))
+
+def test_no_overflow():
+    tables = firmware_tables()
+    xs, ys = stack_tables(tables)
+    codes = all_codes(tables)
+    _, _, values = exact_intermediates(codes, xs, ys)
+    for name, mask in overflows(values).items():
+        assert not mask.any(), '{} overflows for {} (filter, code)s'.format(
+            name, mask.sum())
+    # With nothing overflowing, the emulation must agree with exact math.
+    emulated, _ = interpolate_piecewise_linear(codes, xs, ys)
+    numpy.testing.assert_array_equal(emulated, values['sum'] >> 5)
+
+def test_multiply_is_widened():
+    # Almost every product needs more than 16 bits, so without the cast
+    # almost every output would wrap.
+    with open(FIRMWARE_SOURCE) as file:
+        source = file.read()
+    assert re.search(r'\(\s*int32_t\s*\)\s*dy\s*\*\s*t\b', source), \
+        'dy * t in noisEE.c has to be widened to int32_t first'
+
+def test_clamping():
+    tables = firmware_tables()
+    # Every uint16_t input, including the ones past 10 bits.
+    values, valid = calculate_filter_parameters(numpy.arange(2**16), tables)
+    assert valid.all()
+    for name, _ in FIRMWARE_TABLES:
+        assert values[name].min() >= 0 and values[name].max() <= 1023
+        assert (values[name][ADC_CODES:] == values[name][ADC_CODES - 1]).all()
+
+def test_pot_table_header():
+    expected = pot_tables(firmware_tables())
+    found = read_pot_table_header()
+    for name, _ in FIRMWARE_TABLES:
+        numpy.testing.assert_array_equal(
+            found[name], expected[name],
+            'filter_tables.h is stale; regenerate it with '
+            'generate_hardware_parameter.py --firmware --header')
+
+def test_scorer_rejects_disordered_tables():
+    xs, ys = stack_tables(firmware_tables())
+    scorer = SlopeScorer(numpy.ones(len(FIRMWARE_TABLES)))
+    valid_error = scorer(xs[None], ys[None])[0]
+    # A negative inner x in the first table, and unsorted inner xs in
+    # the last, of candidates scored together with a valid one.
+    negative, unsorted = xs.copy(), xs.copy()
+    negative[0, 1] = -1000
+    unsorted[-1, 1:3] = unsorted[-1, 2:0:-1]
+    errors = scorer(numpy.array([negative, xs, unsorted]),
+                    numpy.array([ys, ys, ys]))
+    assert numpy.isinf(errors[0]) and numpy.isinf(errors[2])
+    assert errors[1] == valid_error
+    values, valid = pot_values(numpy.array([negative, xs]),
+                               numpy.array([ys, ys]))
+    assert not valid[0, 0] and valid[1].all()
+    numpy.testing.assert_array_equal(values[1], pot_values(xs, ys)[0])
+
+def test_generator_matches_firmware():
+    path = require_parameters()
+    generated = fixed_point_parameters(read_linear_parameters(path))
+    tables = firmware_tables()
+    if all((list(xs), list(ys)) == generated[name]
+           for name, (xs, ys) in tables.items()):
+        return
+    # Otherwise they have to be fixed_point_optimizer.py's improvement
+    # on the generated tables.
+    order = [FILTER_NAMES.index(name) for name, _ in FIRMWARE_TABLES]
+    scorer = SlopeScorer(load_coefficient_table(path).max_gains[order])
+    firmware_error = scorer(*[v[None] for v in stack_tables(tables)])[0]
+    generated_error = scorer(*[v[None] for v in stack_tables(generated)])[0]
+    assert firmware_error <= generated_error + 1e-6, \
+        'noisEE.c differs from {}, and has a worse slope error: {:.3f} vs ' \
+        '{:.3f} dB/decade'.format(PARAMETERS, firmware_error, generated_error)
+
+def test_error_against_float_curves():
+    path = require_parameters()
+    # Interpolate the CSV's own fixed-point tables, so the fit is the same.
+    tables = fixed_point_parameters(read_linear_parameters(path))
+    errors = compare_to_float_model(load_coefficient_table(path), tables)
+    for name in FILTER_NAMES:
+        assert numpy.abs(errors[name]).max() <= MAX_STEP_ERROR, \
+            '{} is up to {} steps off'.format(name,
+                                              numpy.abs(errors[name]).max())
+
+################################################################################
+# Report.
+
+def report(tables):
+    xs, ys = stack_tables(tables)
+    codes = all_codes(tables)
+    segment, valid, values = exact_intermediates(codes, xs, ys)
+    emulated, _ = interpolate_piecewise_linear(codes, xs, ys)
+    masks = overflows(values)
+    clamped = numpy.minimum(emulated, 1023)
+    for i, (name, _) in enumerate(FIRMWARE_TABLES):
+        overflowing = sorted(key for key, mask in masks.items() if mask[i].any())
+        wide = (values['product'][i] < -2**15) | \
+            (values['product'][i] >= 2**16)
+        print('{:>8}: {} codes searched validly, segments used {}, '
+              'overflows: {}, {} products need 32 bits, {} outputs '
+              'clamped, {} differ from exact math'.format(
+                  name, valid[i].sum(), numpy.unique(segment[i]).tolist(),
+                  ', '.join(overflowing) or 'none', wide.sum(),
+                  (clamped[i] != emulated[i]).sum(),
+                  (emulated[i] != values['sum'][i] >> 5).sum()))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Check the fixed-point tables in noisEE.c for every ADC '
+        'code.')
+    parser.add_argument('--firmware', default=FIRMWARE_SOURCE)
+    args = parser.parse_args()
+
+    FIRMWARE_SOURCE = args.firmware
+    POT_TABLE_HEADER = os.path.join(os.path.dirname(FIRMWARE_SOURCE),
+                                    'filter_tables.h')
+    report(firmware_tables())
+    failures = 0
+    for name, test in sorted(globals().items()):
+        if not name.startswith('test_'):
+            continue
+        try:
+            test()
+            print('{}: ok'.format(name))
+        except AssertionError as error:
+            failures += 1
+            print('{}: FAILED {}'.format(name, error))
+        except BaseException as error:
+            # pytest.skip's exception isn't an Exception.
+            if type(error).__name__ != 'Skipped':
+                raise
+            print('{}: skipped, {}'.format(name, error))
+    exit(1 if failures else 0)
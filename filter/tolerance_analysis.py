@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+################################################################################
+## Copyright 2017 "Nathan Hwang" <thenoviceoof>
+##
+## Licensed under the Apache License, Version 2.0 (the "License");
+## you may not use this file except in compliance with the License.
+## You may obtain a copy of the License at
+##
+##     http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing, software
+## distributed under the License is distributed on an "AS IS" BASIS,
+## WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+## See the License for the specific language governing permissions and
+## limitations under the License.
+################################################################################
+
+# Monte Carlo tolerance analysis of the analog filter bank.
+#
+# Each trial is one board: every filter's cutoff, 1/(2*pi*R*C), and
+# gain, through the pot's end to end resistance and a summing resistor,
+# get their own random component errors. Every trial then gets swept
+# over all 1024 knob positions with the pot steps the tables give, on
+# the same response model ideal_parameters.py fits with, as (trials x
+# filters x frequencies) responses. Reports how the achieved slope (in
+# dB/decade, like the targets) and the linearity of the spectrum about
+# its fitted line spread across boards.
+
+from collections import namedtuple
+import argparse
+import multiprocessing
+import time
+
+import numpy
+
+from coefficient_table import ADC_CODES, CUTOFFS, FILTER_NAMES
+from coefficient_table import adc_codes_to_slopes, load_coefficient_table
+from coefficient_table import slopes_to_gains
+from firmware_emulator import firmware_coefficient_table, read_firmware_tables
+from spectrum import even_log_frequencies, response_matrix
+
+TRIALS = 1000
+# Trials per chunk of work: (trials x codes x frequencies) float32
+# responses, ~13MB at 16.
+CHUNK_TRIALS = 16
+
+# Relative tolerances: the bounds of a uniform spread, or 3 sigma of a
+# normal one. The AD5292 has a 1% end to end resistance tolerance.
+Tolerances = namedtuple('Tolerances', ['resistor', 'capacitor', 'pot'])
+DEFAULT_TOLERANCES = Tolerances(resistor=0.01, capacitor=0.05, pot=0.01)
+
+# Knob positions to break the report down by.
+REPORT_CODES = [0, 128, 256, 384, 512, 640, 768, 896, 1023]
+PERCENTILES = [5, 50, 95]
+
+################################################################################
+# Sample boards.
+
+def spread(tolerance, shape, random_state, distribution='uniform'):
+    '''Multipliers of components with a relative tolerance.'''
+    if distribution == 'normal':
+        return 1 + random_state.normal(0, tolerance / 3., shape)
+    return 1 + random_state.uniform(-tolerance, tolerance, shape)
+
+def sample_boards(trials, tolerances=DEFAULT_TOLERANCES,
+                  random_state=numpy.random, distribution='uniform'):
+    '''Returns (trials x filters) cutoff and gain multipliers.'''
+    shape = (trials, len(FILTER_NAMES))
+    def sample(tolerance):
+        return spread(tolerance, shape, random_state, distribution)
+    # f_c = 1/(2*pi*R*C)
+    cutoffs = 1 / (sample(tolerances.resistor) * sample(tolerances.capacitor))
+    gains = sample(tolerances.pot) * sample(tolerances.resistor)
+    return cutoffs, gains
+
+################################################################################
+# Sweep the knob.
+
+def fit_lines(decibels, log_frequencies):
+    '''Returns (slopes, RMS residuals) of lines fit to the last axis.'''
+    centered = log_frequencies - log_frequencies.mean()
+    slopes = numpy.matmul(decibels, centered / (centered**2).sum())
+    residuals = decibels - decibels.mean(axis=-1)[..., None]
+    residuals -= slopes[..., None] * centered
+    squares = numpy.einsum('...i,...i->...', residuals, residuals)
+    return slopes, numpy.sqrt(squares / decibels.shape[-1])
+
+def board_slopes(task):
+    '''Returns the (trials x codes) slopes and linearity of boards.
+
+    task is ((trials x filters) cutoff and gain multipliers, (filters x
+    codes) nominal gains, frequency points, response kind).
+    '''
+    cutoff_scales, gain_scales, gains, points, kind = task
+    frequencies = even_log_frequencies(points)
+    # (trials x filters x frequencies)
+    basis = response_matrix(numpy.asarray(CUTOFFS) * cutoff_scales,
+                            frequencies, kind).astype(numpy.float32)
+    # (trials x codes x filters)
+    board_gains = (gains.T[None, :, :] *
+                   gain_scales[:, None, :]).astype(numpy.float32)
+    responses = numpy.matmul(board_gains, basis)
+    # Keep the response positive, to be able to take the log.
+    decibels = (20 if kind == 'magnitude' else 10) * numpy.log10(
+        numpy.maximum(responses, 1e-10))
+    return fit_lines(decibels,
+                     numpy.log10(frequencies).astype(numpy.float32))
+
+def monte_carlo(gains, cutoff_scales, gain_scales, points=200,
+                kind='magnitude', processes=1):
+    '''board_slopes for every trial, in chunks over a process pool.'''
+    bounds = list(range(0, len(cutoff_scales), CHUNK_TRIALS)) + \
+        [len(cutoff_scales)]
+    tasks = [(cutoff_scales[start:stop], gain_scales[start:stop], gains,
+              points, kind) for start, stop in zip(bounds[:-1], bounds[1:])]
+    if processes == 1:
+        results = [board_slopes(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(processes or multiprocessing.cpu_count())
+        try:
+            results = pool.map(board_slopes, tasks)
+        finally:
+            pool.terminate()
+    slopes, linearity = zip(*results)
+    return numpy.concatenate(slopes), numpy.concatenate(linearity)
+
+################################################################################
+# Report.
+
+def summarize(values):
+    return '/'.join('{:.2f}'.format(v)
+                    for v in numpy.percentile(values, PERCENTILES))
+
+def report(targets, nominal, slopes, linearity, limit):
+    '''Print the spread across boards; nominal is (slopes, linearity) of
+    the board with no errors.'''
+    errors = slopes - targets
+    nominal_errors = nominal[0][0] - targets
+    print('  knob  target  nominal  slope error p{}/p{}/p{}  '
+          'linearity dB p{}/p{}/p{}'.format(*(PERCENTILES + PERCENTILES)))
+    for code in REPORT_CODES:
+        print('{:6d} {:7.2f} {:+8.2f}  {:>24}  {:>24}'.format(
+            code, targets[code], nominal_errors[code],
+            summarize(errors[:, code]), summarize(linearity[:, code])))
+    rms = numpy.sqrt((errors**2).mean(axis=1))
+    print('RMS slope error over the knob: nominal {:.3f}, p{}/p{}/p{} {} '
+          'dB/decade, worst board {:.3f}'.format(
+              numpy.sqrt((nominal_errors**2).mean()),
+              *(PERCENTILES + [summarize(rms), rms.max()])))
+    deviations = numpy.abs(slopes - nominal[0]).max(axis=1)
+    print('Max slope deviation from nominal: p{}/p{}/p{} {} dB/decade'.format(
+        *(PERCENTILES + [summarize(deviations)])))
+    print('Mean linearity: nominal {:.3f}, p{}/p{}/p{} {} dB'.format(
+        nominal[1].mean(), *(PERCENTILES +
+                             [summarize(linearity.mean(axis=1))])))
+    print('{:.1f}% of boards stay within {} dB/decade of the nominal slope '
+          'everywhere'.format(100. * (deviations <= limit).mean(), limit))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Monte Carlo the filter bank\'s component tolerances.')
+    parser.add_argument('--parameters', default='linear_parameters.csv')
+    parser.add_argument('--firmware', action='store_true',
+                        help='use the pot values the AVR firmware computes')
+    parser.add_argument('--trials', type=int, default=TRIALS)
+    parser.add_argument('--resistor', type=float,
+                        default=DEFAULT_TOLERANCES.resistor)
+    parser.add_argument('--capacitor', type=float,
+                        default=DEFAULT_TOLERANCES.capacitor)
+    parser.add_argument('--pot', type=float, default=DEFAULT_TOLERANCES.pot,
+                        help='digital pot end to end resistance tolerance')
+    parser.add_argument('--distribution', choices=['uniform', 'normal'],
+                        default='uniform',
+                        help='uniform within the tolerance, or normal with '
+                        'the tolerance as 3 sigma')
+    parser.add_argument('--kind', choices=['magnitude', 'power'],
+                        default='magnitude')
+    parser.add_argument('--points', type=int, default=200,
+                        help='frequencies per spectrum')
+    parser.add_argument('--limit', type=float, default=0.5,
+                        help='slope deviation from nominal a board may have '
+                        'to count as good')
+    parser.add_argument('--sensitivity', action='store_true',
+                        help='also run each tolerance on its own')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=1,
+                        help='0 uses every core')
+    args = parser.parse_args()
+
+    table = load_coefficient_table(args.parameters)
+    if args.firmware:
+        table = firmware_coefficient_table(table, read_firmware_tables())
+    codes = numpy.arange(ADC_CODES)
+    targets = adc_codes_to_slopes(codes)
+    gains = slopes_to_gains(table, targets)
+    tolerances = Tolerances(args.resistor, args.capacitor, args.pot)
+
+    runs = [('all', tolerances)]
+    if args.sensitivity:
+        for name in Tolerances._fields:
+            alone = Tolerances(*[0.0] * len(Tolerances._fields))
+            runs.append((name, alone._replace(**{name: getattr(tolerances,
+                                                               name)})))
+    nominal = board_slopes((numpy.ones((1, len(FILTER_NAMES))),
+                            numpy.ones((1, len(FILTER_NAMES))), gains,
+                            args.points, args.kind))
+    for name, run_tolerances in runs:
+        random_state = numpy.random.RandomState(args.seed)
+        start_time = time.time()
+        cutoff_scales, gain_scales = sample_boards(
+            args.trials, run_tolerances, random_state, args.distribution)
+        slopes, linearity = monte_carlo(gains, cutoff_scales, gain_scales,
+                                        args.points, args.kind,
+                                        args.processes)
+        elapsed = time.time() - start_time
+        print('')
+        print('{} boards, {} ({}): {} in {:.2f}s ({:.0f} boards/sec)'.format(
+            args.trials, name, args.distribution, ', '.join(
+                '{} {:g}%'.format(field, 100 * value)
+                for field, value in zip(Tolerances._fields, run_tolerances)),
+            elapsed, args.trials / elapsed))
+        report(targets, nominal, slopes, linearity, args.limit)
@@ -14,115 +14,243 @@
 ## limitations under the License.
 ################################################################################
 
-import csv
-import math
-import matplotlib
-import matplotlib.pyplot as plt
+import argparse
+import multiprocessing
+import os
+import subprocess
+import time
 
-# Draw the spectrum gif used in the blog.
+import numpy
 
-SAMPLING_FREQUENCY = 44100
-SAMPLING_PERIOD = 1.0/SAMPLING_FREQUENCY
+from coefficient_table import CUTOFFS, load_coefficient_table, slopes_to_gains
+from spectrum import even_log_frequencies, response_basis
 
-def even_log_frequencies(n=200, low_frequency=20, high_frequency=20000):
-    high_log = math.log(high_frequency, 10)
-    low_log = math.log(low_frequency, 10)
-    logs = [(high_log - low_log)*(float(i)/n)+low_log for i in range(n)]
-    return [10**l for l in logs]
+# Draw the spectrum gif used in the blog.
+#
+# Every frame's curves get computed up front as one (frames x filters
+# x frequencies) array, and frames are drawn by updating the lines of a
+# single figure. Each image goes to the writer as soon as it is drawn,
+# so only a few frames are ever in memory: an animated GIF, an MP4
+# (piped through ffmpeg), or the original filter_fn_<slope>.png frames.
 
-def transfer_function(f_c, gain, frequencies, sampling_period=SAMPLING_PERIOD):
-    p = 2 * math.pi * sampling_period * f_c
-    previous_output_coefficient = 1/(p + 1)
-    input_coefficient = gain - 1/p
-    frequency_response = [math.e**(-2*math.pi*f*sampling_period*1j) for f in frequencies]
-    gains = [abs(input_coefficient * fr) / abs(1 + previous_output_coefficient * fr)
-             for fr in frequency_response]
-    return gains
+FRAMES = 41
+FPS = 10
+# Frames each worker draws per task, amortizing the figure setup.
+FRAMES_PER_TASK = 8
+FIGURE_SIZE = (6.4, 4.8)
+DPI = 100
 
-def gain_function(f_c, gain, frequencies, sampling_period=SAMPLING_PERIOD):
-    '''Returns the power gain for a frequency'''
-    # A = 1/(1+f/f_c), power is |A|^2 = 1/sqrt(1+(f/f_c)^2)^2
-    gains = [gain/((f/f_c)**2 + 1) for f in frequencies]
-    return gains
+################################################################################
+# Generate (gain/f_c)s for a given slope.
 
-def sum_gains_power(gains):
-    return [10*math.log(sum(gs)/1.0, 10) for gs in zip(*gains)]
+def slope_to_parameters(table, slope):
+    gains = slopes_to_gains(table, [slope])[:, 0]
+    # Keep the gains positive, to be able to take the log.
+    gains = numpy.maximum(gains, 0.0000000001)
+    return [[fc, gain] for fc, gain in zip(CUTOFFS, gains)]
 
-# Generate evenly spaced frequencies on a log scale.
-frequencies = even_log_frequencies(n=200)
+def frame_slopes(frames=FRAMES, min_slope=-20, max_slope=0):
+    return numpy.linspace(min_slope, max_slope, frames)
 
-# Use a white figure background.
-matplotlib.rcParams['figure.facecolor'] = 'white'
+def frame_curves(table, slopes, n=200):
+    '''Returns (frames x filters x frequencies) dB power curves of each
+    filter, and the (frames x frequencies) dB power of their sum.'''
+    # Keep the gains positive, to be able to take the log.
+    gains = numpy.maximum(slopes_to_gains(table, slopes).T, 0.0000000001)
+    basis = response_basis(CUTOFFS, n, kind='power')
+    powers = gains[:, :, None] * basis[None, :, :]
+    return 10*numpy.log10(powers), 10*numpy.log10(powers.sum(axis=1))
 
 ################################################################################
-# Read in the functions.
-params = {}
-with open('linear_parameters.csv') as file:
-    csv_file = csv.reader(file, delimiter=',')
-    for row in csv_file:
-        if row[0] == '':
-            continue
-        name = row[0].split(' ')[0].lower()
-        values = [float(v) for v in row[1:]]
-        paired_values = zip(values[:8], values[8:])
-        params[name] = paired_values
+# Draw.
 
-################################################################################
-# Generate (gain/f_c)s for a given slope.
+def frame_label(slope):
+    return 'Slope %0.1f dB/decade' % slope
+
+def setup_figure(frequencies, filters):
+    '''Returns (figure, filter lines, total line, legend text), with the
+    lines and legend text animated: left out of the figure's own draw.'''
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
 
-def slope_to_parameters(params, slope):
-    fc_gain = [[2000000, None], [16.5, None], [270.0, None], [5300.0, None]]
-    index_dict = {
-        'constant': 0,
-        'low': 1,
-        'medium': 2,
-        'high': 3,
-    }
-
-    # Convert the slope to a target gain.
-    for name, linear_fn in params.iteritems():
-        max_gain = max([g for _,g in linear_fn])
-        gain = None
-        for i in range(len(linear_fn)-1):
-            if linear_fn[i][0] <= slope < linear_fn[i+1][0]:
-                frac = (slope - linear_fn[i][0])/(linear_fn[i+1][0] - linear_fn[i][0])
-                gain = linear_fn[i][1] * (1 - frac) + linear_fn[i+1][1] * frac
-                break
-        if gain is None:
-            gain = linear_fn[-1][1]
-        # Snap to the nearest potentiometer step.
-        if gain < 0:
-            gain = 0
-        steps = 1024
-        gain = math.floor(steps*gain/max_gain)/steps * max_gain
-        gain = max(gain, 0.0000000001)
-        fc_gain[index_dict[name]][1] = gain
-
-    return fc_gain
-
-max_slope = 0
-min_slope = -20
-
-points = 40
-for i in range(points+1):
-    slope = float(max_slope - min_slope)*(float(i)/(points)) + min_slope
-    parameters = slope_to_parameters(params, slope)
-    print slope
-
-    all_filters = []
-    for fc,gain in parameters:
-        transfer_fn = gain_function(fc, gain, frequencies)
-        plt.semilogx(frequencies, sum_gains_power([transfer_fn]), color='grey')
-        all_filters.append(transfer_fn)
-    plt.semilogx(frequencies, sum_gains_power(all_filters),
-                 label='Slope %0.1fdb/octave' % slope)
-    axes = plt.gca()
+    figure = plt.figure(figsize=FIGURE_SIZE, dpi=DPI, facecolor='white')
+    axes = figure.gca()
+    empty = numpy.full(len(frequencies), numpy.nan)
+    filter_lines = [axes.semilogx(frequencies, empty, color='grey')[0]
+                    for _ in range(filters)]
+    total_line, = axes.semilogx(frequencies, empty, label=frame_label(0))
     axes.set_xlabel('Log Frequency (Hz)')
     axes.set_ylabel('Aural Power (dB)')
+    axes.grid(True)
+    axes.set_xlim([frequencies[0], frequencies[-1]])
+    axes.set_ylim([-40, 10])
+    legend = axes.legend()
+    for artist in filter_lines + [total_line, legend]:
+        artist.set_animated(True)
+    return figure, filter_lines, total_line, legend
+
+def draw_frames(frequencies, slopes, parts, totals):
+    '''Yields the (height x width x 3) uint8 image of each frame.
+
+    The static parts of the figure (axes, grid, labels) get drawn once;
+    each frame restores them and only draws the lines and the legend.
+    '''
+    figure, filter_lines, total_line, legend = setup_figure(frequencies,
+                                                            parts.shape[1])
+    axes = figure.gca()
+    canvas = figure.canvas
+    canvas.draw()
+    background = canvas.copy_from_bbox(figure.bbox)
+    label = legend.get_texts()[0]
+    try:
+        for slope, part, total in zip(slopes, parts, totals):
+            canvas.restore_region(background)
+            for line, curve in zip(filter_lines, part):
+                line.set_ydata(curve)
+                axes.draw_artist(line)
+            total_line.set_ydata(total)
+            axes.draw_artist(total_line)
+            label.set_text(frame_label(slope))
+            axes.draw_artist(legend)
+            # buffer_rgba is a view of the canvas, so copy it out.
+            yield numpy.array(canvas.buffer_rgba())[:, :, :3]
+    finally:
+        import matplotlib.pyplot as plt
+        plt.close(figure)
+
+def render_frames(task):
+    '''Returns the images of a range of frames; task is (frequencies,
+    slopes, parts, totals).'''
+    return list(draw_frames(*task))
+
+def render_animation(table, slopes, n=200, processes=1):
+    '''Yields the (height x width x 3) image of each slope, in order.
+
+    In parallel, workers draw FRAMES_PER_TASK frames at a time, and the
+    images are yielded as the tasks come back.
+    '''
+    frequencies = even_log_frequencies(n)
+    parts, totals = frame_curves(table, slopes, n)
+    if processes == 1:
+        for image in draw_frames(frequencies, slopes, parts, totals):
+            yield image
+        return
+    tasks = [(frequencies, slopes[start:start + FRAMES_PER_TASK],
+              parts[start:start + FRAMES_PER_TASK],
+              totals[start:start + FRAMES_PER_TASK])
+             for start in range(0, len(slopes), FRAMES_PER_TASK)]
+    pool = multiprocessing.Pool(processes or None)
+    try:
+        for images in pool.imap(render_frames, tasks):
+            for image in images:
+                yield image
+    finally:
+        pool.terminate()
+
+################################################################################
+# Write out the animation.
+
+def write_gif(images, path, fps=FPS):
+    '''Write an animated GIF, a frame at a time. The plots only have a
+    handful of colors, so every frame shares the first frame's palette,
+    without dithering. Like PIL's own writer, each frame only stores
+    the box that changed, with the unchanged pixels in it transparent,
+    and repeated frames extend the one before.'''
+    from PIL import GifImagePlugin, Image
+    duration = int(round(1000. / fps))
+    palette = None
+    # The last frame that changed, as (image, offset, encoder params),
+    # written once the next one is known not to repeat it.
+    pending = None
+    with open(path, 'wb') as file:
+        for image in images:
+            if palette is None:
+                palette = Image.fromarray(image).quantize()
+            frame = Image.fromarray(image).quantize(palette=palette,
+                                                    dither=Image.Dither.NONE)
+            current = numpy.asarray(frame)
+            if pending is None:
+                header, _ = GifImagePlugin.getheader(
+                    frame, info={'loop': 0, 'duration': duration})
+                file.write(b''.join(header))
+                pending = (frame, (0, 0), {'duration': duration})
+                previous = current
+                continue
+            changed = current != previous
+            rows = numpy.flatnonzero(changed.any(axis=1))
+            if not len(rows):
+                pending[2]['duration'] += duration
+                continue
+            columns = numpy.flatnonzero(changed.any(axis=0))
+            box = (slice(rows[0], rows[-1] + 1),
+                   slice(columns[0], columns[-1] + 1))
+            delta = current[box].copy()
+            params = {'duration': duration}
+            unused = numpy.setdiff1d(numpy.arange(256), delta)
+            if len(unused):
+                delta[~changed[box]] = params['transparency'] = unused[0]
+            delta = Image.fromarray(delta)
+            delta.putpalette(palette.getpalette())
+            file.write(b''.join(GifImagePlugin.getdata(*pending[:2],
+                                                       **pending[2])))
+            pending = (delta, (columns[0], rows[0]), params)
+            previous = current
+        if pending is not None:
+            file.write(b''.join(GifImagePlugin.getdata(*pending[:2],
+                                                       **pending[2])))
+        file.write(b';')
+
+def write_mp4(images, path, fps=FPS):
+    '''Pipe the raw frames through ffmpeg into an H.264 MP4.'''
+    process = None
+    for image in images:
+        if process is None:
+            height, width = image.shape[:2]
+            command = ['ffmpeg', '-y', '-loglevel', 'error',
+                       '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                       '-s', '{}x{}'.format(width, height), '-r', str(fps),
+                       '-i', '-',
+                       # H.264 wants even dimensions.
+                       '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+                       '-c:v', 'libx264', '-pix_fmt', 'yuv420p', path]
+            process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        process.stdin.write(numpy.ascontiguousarray(image).tobytes())
+    process.stdin.close()
+    assert process.wait() == 0, 'ffmpeg failed'
+
+def write_pngs(images, slopes):
+    from PIL import Image
+    for image, slope in zip(images, slopes):
+        Image.fromarray(image).save('filter_fn_{:04.1f}.png'.format(abs(slope)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Animate the filter spectrum across the slopes.')
+    parser.add_argument('--output', default='filter_spectrum.gif',
+                        help='.gif or .mp4 to write, or "png" for '
+                        'filter_fn_<slope>.png frames')
+    parser.add_argument('--frames', type=int, default=FRAMES)
+    parser.add_argument('--fps', type=float, default=FPS)
+    parser.add_argument('--points', type=int, default=200,
+                        help='frequencies per curve')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='draw frames in parallel; 0 uses every core')
+    args = parser.parse_args()
 
-    plt.grid(True)
-    plt.legend()
-    plt.ylim([-40, 10])
-    plt.savefig('filter_fn_{:04.1f}.png'.format(abs(slope)), bbox_inches='tight')
+    table = load_coefficient_table('linear_parameters.csv')
+    slopes = frame_slopes(args.frames)
 
-    plt.close()
+    start_time = time.time()
+    images = render_animation(table, slopes, args.points, args.processes)
+    extension = os.path.splitext(args.output)[1].lower()
+    if args.output == 'png':
+        write_pngs(images, slopes)
+    elif extension == '.mp4':
+        write_mp4(images, args.output, args.fps)
+    else:
+        write_gif(images, args.output, args.fps)
+    elapsed = time.time() - start_time
+    print('Drew and wrote {} frames to {} in {:.2f}s ({:.1f} '
+          'frames/sec)'.format(len(slopes), args.output, elapsed,
+                               len(slopes) / elapsed))